@@ -1,18 +1,169 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Blueprint, current_app, has_app_context, has_request_context, render_template, request, jsonify, session, redirect, url_for, Response, stream_with_context, copy_current_request_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as FlaskSQLAlchemySession
+from sqlalchemy.schema import CreateTable
 from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
-from functools import wraps
+from functools import wraps, cache
+from decimal import Decimal, ROUND_HALF_UP
+from collections import Counter, deque
 import csv
 import io
 import re
 import os
+import json
+import gzip
+import base64
+import threading
+import queue
+from concurrent.futures import Future
+import time
+import html
+import sqlite3
+import click
+import importlib.util
+import hashlib
+import logging
+from sqlalchemy.engine import Engine
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///expenses.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
-db = SQLAlchemy(app)
+# ==========================================
+# SQLite Storage Engine
+# ==========================================
+# WAL lets dashboard reads run while a CSV import holds the write lock; the busy timeout
+# makes a second writer wait its turn instead of failing with "database is locked".
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 15000))
+SQLITE_PRAGMAS = (
+    ('journal_mode', os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')),
+    ('synchronous', 'NORMAL'),         # fsync at checkpoints only; safe with WAL
+    ('cache_size', -32000),            # 32 MB page cache per connection
+    ('mmap_size', 256 * 1024 * 1024),  # read pages through the OS page cache
+    ('temp_store', 'MEMORY'),          # sorts and temp indexes off disk
+    ('busy_timeout', SQLITE_BUSY_TIMEOUT_MS),
+)
+WAL_CHECKPOINT_INTERVAL = int(os.environ.get('WAL_CHECKPOINT_INTERVAL', 60))  # seconds
+WAL_TRUNCATE_BYTES = 64 * 1024 * 1024  # reset the -wal file once it grows past this
+
+# Defaults for create_app(); any key can be overridden by its `config` argument
+DEFAULT_CONFIG = {
+    'SQLALCHEMY_DATABASE_URI': os.environ.get('DATABASE_URL', 'sqlite:///expenses.db'),
+    'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+    'SQLALCHEMY_ENGINE_OPTIONS': {
+        # One connection per request thread; overflow covers bursts from the threaded dev server
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': 30,
+        'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000, 'check_same_thread': False},
+    },
+    'SECRET_KEY': os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production'),
+    'WRITE_QUEUE': os.environ.get('WRITE_QUEUE', '1') != '0',
+    'WAL_CHECKPOINT_INTERVAL': WAL_CHECKPOINT_INTERVAL,
+    'PROFILING': os.environ.get('PROFILING') == '1',
+    'PROFILING_REPEAT_THRESHOLD': int(os.environ.get('PROFILING_REPEAT_THRESHOLD', 10)),
+    'SLOW_QUERY_MS': float(os.environ.get('SLOW_QUERY_MS', 100)),  # 0 turns the slow-query log off
+    'SLOW_QUERY_LOG': os.environ.get('SLOW_QUERY_LOG', os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'balance-sheet', 'slow_queries.log')),
+    'PDF_CACHE_MB': float(os.environ.get('PDF_CACHE_MB', 32)),  # finished reports kept per process; 0 disables
+    # Reports whose ledger has more rows than this render as a background job
+    'PDF_LEDGER_BACKGROUND_ROWS': int(os.environ.get('PDF_LEDGER_BACKGROUND_ROWS', 5000)),
+    'PDF_JOB_DIR': os.environ.get('PDF_JOB_DIR', os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'balance-sheet', 'reports')),
+}
+
+class GroupCommitSession(FlaskSQLAlchemySession):
+    """Session that defers commits while the write queue runs a group of jobs.
+
+    Inside a group, commit() only flushes; WriteQueue commits once for the whole group.
+    A rollback() marks the group failed, and the queue reruns each job on its own.
+    """
+
+    def commit(self):
+        if self.info.get('group_commit'):
+            self.flush()
+            self.info['group_committed_changes'] = self.total_changes()
+            return
+        super().commit()
+
+    def total_changes(self):
+        """Rows written so far on this session's SQLite connection (sqlite3 total_changes)"""
+        return self.connection().connection.dbapi_connection.total_changes
+
+    def has_uncommitted_changes(self):
+        """True when work since the last group commit() would ride along with the group"""
+        return bool(self.new or self.deleted or any(self.is_modified(obj) for obj in self.dirty)
+                    or self.total_changes() != self.info['group_committed_changes'])
+
+    def rollback(self):
+        if self.info.get('group_commit'):
+            self.info['group_failed'] = True
+        super().rollback()
+
+db = SQLAlchemy(session_options={'class_': GroupCommitSession})
+bp = Blueprint('balance_sheet', __name__, cli_group=None)
+
+@db.event.listens_for(Engine, 'connect')
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    """Apply SQLITE_PRAGMAS to every new pooled connection"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS:
+        cursor.execute(f'PRAGMA {name} = {value}')
+    cursor.close()
+
+def checkpoint_wal(mode='PASSIVE'):
+    """Copy committed WAL pages back into the database file.
+
+    PASSIVE never waits for readers; TRUNCATE also resets the -wal file to zero bytes
+    but waits (up to the busy timeout) for readers to finish. Returns
+    (busy, wal_pages, checkpointed_pages).
+    """
+    with db.engine.connect() as connection:
+        return tuple(connection.exec_driver_sql(f'PRAGMA wal_checkpoint({mode})').first())
+
+def wal_size_bytes():
+    path = db.engine.url.database
+    try:
+        return os.path.getsize(f'{path}-wal') if path else 0
+    except OSError:
+        return 0
+
+class WalCheckpointer(threading.Thread):
+    """Background thread that keeps the WAL short between SQLite's own auto-checkpoints.
+
+    The auto-checkpoint only runs on commit and cannot finish while readers hold old
+    snapshots, so after a big import the -wal file can keep growing; this retries
+    on a timer and truncates it once readers have moved on.
+    """
+
+    def __init__(self, flask_app, interval):
+        super().__init__(name='wal-checkpointer', daemon=True)
+        self.flask_app = flask_app
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            with self.flask_app.app_context():
+                try:
+                    checkpoint_wal('TRUNCATE' if wal_size_bytes() > WAL_TRUNCATE_BYTES else 'PASSIVE')
+                except Exception as e:
+                    print(f"WARNING: WAL checkpoint failed: {e}")
+
+@bp.before_app_request
+def start_wal_checkpointer():
+    """Start the app's checkpointer on its first request, once the database is in use"""
+    state = current_app.extensions['balance_sheet']
+    if state['wal_checkpointer'] is not None:
+        return
+    with state['lock']:
+        if state['wal_checkpointer'] is not None:
+            return
+        interval = current_app.config['WAL_CHECKPOINT_INTERVAL']
+        journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+        state['wal_checkpointer'] = False  # checked; nothing to run
+        if journal_mode == 'wal' and interval > 0:
+            state['wal_checkpointer'] = WalCheckpointer(current_app._get_current_object(), interval)
+            state['wal_checkpointer'].start()
 
 # Simple password (in production, use environment variable)
 APP_PASSWORD = os.environ.get('APP_PASSWORD', 'Sebastian0727Gold!')
@@ -22,10 +173,430 @@ def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if not session.get('logged_in'):
-            return redirect(url_for('login'))
+            return redirect(url_for('balance_sheet.login'))
         return f(*args, **kwargs)
     return decorated_function
 
+# Single-flight request coalescing
+class SingleFlight:
+    """Coalesces concurrent identical computations into one in-flight call.
+
+    The first caller for a key runs the computation; callers that arrive while
+    it is still running wait for it and share its result (or its exception).
+    Nothing is cached once the call finishes - the next caller recomputes.
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """Run fn() for key, or wait for the identical call already in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = self._Call()
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+def single_flight():
+    """This app's coalescer; keys never match a computation in another app or database"""
+    return current_app.extensions['balance_sheet']['single_flight']
+
+# ==========================================
+# Single-writer Queue
+# ==========================================
+# SQLite allows one writer at a time. Instead of request threads racing for the lock,
+# mutating views run on one writer thread; small writes that arrive together share a
+# single commit.
+
+WRITE_GROUP_MAX = 32          # jobs per group commit
+WRITE_GROUP_WINDOW = 0.002    # seconds to wait for more jobs after the first
+WRITE_TIMEOUT = 600           # seconds a request waits for its write (imports can be long)
+
+class WriteQueue:
+    """Runs submitted write jobs one at a time on a dedicated thread.
+
+    submit() returns a concurrent.futures.Future. Jobs queued close together are run
+    as a group in one transaction with one commit; a job marked solo (imports, bulk
+    operations) always runs and commits on its own. If any job in a group raises, rolls
+    back or returns with changes it never committed, the group is rolled back and each
+    job is rerun with its own commit, so one job's failure or half-finished writes never
+    leak into another request's result.
+    """
+
+    class _Job:
+        def __init__(self, fn, solo):
+            self.fn = fn
+            self.solo = solo
+            self.future = Future()
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._held = None  # solo job pulled off the queue while gathering a group
+        self.stats = {'jobs': 0, 'groups': 0, 'commits': 0, 'reruns': 0}
+
+    def submit(self, fn, solo=False):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+                self._thread.start()
+        job = self._Job(fn, solo)
+        self._jobs.put(job)
+        return job.future
+
+    def _next_batch(self):
+        first, self._held = self._held or self._jobs.get(), None
+        batch = [first]
+        if first.solo:
+            return batch
+        deadline = time.monotonic() + WRITE_GROUP_WINDOW
+        while len(batch) < WRITE_GROUP_MAX:
+            try:
+                job = self._jobs.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if job.solo:
+                self._held = job
+                break
+            batch.append(job)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            with self.flask_app.app_context():
+                if len(batch) == 1:
+                    self._run_alone(batch[0])
+                else:
+                    self._run_group(batch)
+
+    def _run_alone(self, job):
+        self.stats['jobs'] += 1
+        self.stats['commits'] += 1
+        if not job.future.set_running_or_notify_cancel():
+            return
+        try:
+            result = job.fn()
+        except BaseException as e:
+            db.session.rollback()
+            job.future.set_exception(e)
+        else:
+            db.session.rollback()  # anything the job left uncommitted is discarded
+            job.future.set_result(result)
+
+    def _run_group(self, batch):
+        session = db.session()
+        session.info['group_commit'] = True
+        try:
+            results = []
+            for job in batch:
+                session.info['group_committed_changes'] = session.total_changes()
+                results.append(job.fn())
+                if session.info.get('group_failed'):
+                    raise RuntimeError('write group rolled back')
+                if session.has_uncommitted_changes():
+                    raise RuntimeError('write job returned without committing')
+            session.info.pop('group_commit')
+            session.info.pop('group_committed_changes')
+            session.commit()
+        except BaseException:
+            session.info.pop('group_commit', None)
+            session.info.pop('group_failed', None)
+            session.info.pop('group_committed_changes', None)
+            session.rollback()
+            self.stats['reruns'] += 1
+            for job in batch:
+                self._run_alone(job)
+            return
+        self.stats['jobs'] += len(batch)
+        self.stats['groups'] += 1
+        self.stats['commits'] += 1
+        for job, result in zip(batch, results):
+            if job.future.set_running_or_notify_cancel():
+                job.future.set_result(result)
+
+def serialized_write(solo=False):
+    """Run a mutating view on the writer thread and wait for its response.
+
+    The view runs in a copy of the request context, so it reads request data as usual.
+    GET/HEAD requests to the same route run inline.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method in ('GET', 'HEAD') or not current_app.config['WRITE_QUEUE']:
+                return f(*args, **kwargs)
+            job = copy_current_request_context(lambda: f(*args, **kwargs))
+            write_queue = current_app.extensions['balance_sheet']['write_queue']
+            return write_queue.submit(job, solo=solo).result(timeout=WRITE_TIMEOUT)
+        return decorated_function
+    return decorator
+
+def single_flight_key(name, *parts):
+    """Build a stable coalescing key from an endpoint name and its inputs."""
+    return name + ':' + json.dumps(parts, sort_keys=True, default=str)
+
+# ==========================================
+# Request Profiling
+# ==========================================
+# Opt-in (PROFILING=1). Each request records wall time, SQL statements, SQL time, rows
+# fetched and the Python time left over. It returns them in a Server-Timing header and
+# adds them to per-endpoint aggregates served by /api/_metrics. The profile lives in
+# request.environ, so statements a view runs on the writer thread count towards it.
+
+PROFILE_ENVIRON_KEY = 'balance_sheet.profile'
+METRICS_WINDOW = 1024                # recent requests per endpoint kept for quantiles
+METRICS_QUANTILES = (0.5, 0.9, 0.99)
+
+class RequestProfile:
+    """SQL accounting for one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = Counter()  # statement text -> executions
+        self.sql_seconds = 0.0
+        self.rows = 0
+
+    @property
+    def queries(self):
+        return sum(self.statements.values())
+
+    def repeated(self, threshold):
+        """Statements executed more than `threshold` times, the usual sign of an N+1 loop"""
+        return [(statement, count) for statement, count in self.statements.most_common() if count > threshold]
+
+def current_profile():
+    return request.environ.get(PROFILE_ENVIRON_KEY) if has_request_context() else None
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Counts fetched rows into the profile of the statement that produced them"""
+    profile = None
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None and self.profile is not None:
+            self.profile.rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        if self.profile is not None:
+            self.profile.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        if self.profile is not None:
+            self.profile.rows += len(rows)
+        return rows
+
+class ProfiledConnection(sqlite3.Connection):
+    """sqlite3 connection factory used while profiling, so row counts are exact"""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+@db.event.listens_for(Engine, 'before_cursor_execute')
+def statement_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info['statement_started'] = time.perf_counter()
+
+@db.event.listens_for(Engine, 'after_cursor_execute')
+def statement_finished(conn, cursor, statement, parameters, context, executemany):
+    """Feed each statement's execution time to the request profile and the slow-query log"""
+    started = conn.info.pop('statement_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    profile = current_profile()
+    if profile is not None:
+        profile.sql_seconds += elapsed
+        profile.statements[statement] += 1
+        if isinstance(cursor, ProfiledCursor):
+            cursor.profile = profile
+    if has_app_context():
+        threshold_ms = current_app.config['SLOW_QUERY_MS']
+        if 0 < threshold_ms <= elapsed * 1000:
+            log_slow_query(cursor.connection, statement, parameters, executemany, elapsed)
+
+def quantile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0
+
+class RequestMetrics:
+    """Per-endpoint request aggregates for /api/_metrics, kept per process"""
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def observe(self, endpoint, method, wall, sql, queries, rows, repeated):
+        with self.lock:
+            entry = self.endpoints.get((endpoint, method))
+            if entry is None:
+                entry = self.endpoints[(endpoint, method)] = {
+                    'count': 0, 'wall_sum': 0.0, 'sql_sum': 0.0, 'queries_sum': 0, 'rows': 0, 'repeated': 0,
+                    'wall': deque(maxlen=self.window), 'sql': deque(maxlen=self.window),
+                    'queries': deque(maxlen=self.window),
+                }
+            entry['count'] += 1
+            entry['wall_sum'] += wall
+            entry['sql_sum'] += sql
+            entry['queries_sum'] += queries
+            entry['rows'] += rows
+            entry['repeated'] += bool(repeated)
+            entry['wall'].append(wall)
+            entry['sql'].append(sql)
+            entry['queries'].append(queries)
+
+    def render(self):
+        """Prometheus text exposition format"""
+        with self.lock:
+            entries = {key: dict(entry, wall=list(entry['wall']), sql=list(entry['sql']),
+                                 queries=list(entry['queries']))
+                       for key, entry in sorted(self.endpoints.items())}
+        lines = []
+
+        def summary(name, help_text, samples, total):
+            lines.extend([f'# HELP {name} {help_text}', f'# TYPE {name} summary'])
+            for (endpoint, method), entry in entries.items():
+                labels = f'endpoint="{endpoint}",method="{method}"'
+                for fraction in METRICS_QUANTILES:
+                    lines.append(f'{name}{{{labels},quantile="{fraction}"}} {quantile(entry[samples], fraction):.6g}')
+                lines.append(f'{name}_sum{{{labels}}} {entry[total]:.6g}')
+                lines.append(f'{name}_count{{{labels}}} {entry["count"]}')
+
+        def counter(name, help_text, field):
+            lines.extend([f'# HELP {name} {help_text}', f'# TYPE {name} counter'])
+            for (endpoint, method), entry in entries.items():
+                lines.append(f'{name}{{endpoint="{endpoint}",method="{method}"}} {entry[field]:.6g}')
+
+        summary('balance_sheet_request_duration_seconds', 'Request wall time.', 'wall', 'wall_sum')
+        summary('balance_sheet_request_sql_duration_seconds', 'Time spent executing SQL per request.', 'sql', 'sql_sum')
+        summary('balance_sheet_request_sql_statements', 'SQL statements executed per request.', 'queries', 'queries_sum')
+        counter('balance_sheet_request_rows_fetched_total', 'Rows fetched from SQLite.', 'rows')
+        counter('balance_sheet_request_repeated_statements_total',
+                'Requests that repeated one statement more than PROFILING_REPEAT_THRESHOLD times.', 'repeated')
+        return '\n'.join(lines) + '\n'
+
+@bp.before_app_request
+def start_request_profile():
+    if current_app.config['PROFILING'] and request.endpoint != 'balance_sheet.metrics':
+        request.environ[PROFILE_ENVIRON_KEY] = RequestProfile()
+
+@bp.after_app_request
+def finish_request_profile(response):
+    profile = request.environ.pop(PROFILE_ENVIRON_KEY, None)
+    if profile is None:
+        return response
+    wall = time.perf_counter() - profile.started
+    python = max(wall - profile.sql_seconds, 0.0)
+    endpoint = (request.endpoint or 'unmatched').removeprefix('balance_sheet.')
+    repeated = profile.repeated(current_app.config['PROFILING_REPEAT_THRESHOLD'])
+    for statement, count in repeated:
+        current_app.logger.warning('Possible N+1 in %s %s: statement ran %d times: %s',
+                                   request.method, endpoint, count, ' '.join(statement.split())[:300])
+
+    timings = [f'db;dur={profile.sql_seconds * 1000:.1f};desc="{profile.queries} queries, {profile.rows} rows"',
+               f'app;dur={python * 1000:.1f}', f'total;dur={wall * 1000:.1f}']
+    if repeated:
+        timings.append(f'repeated;desc="{len(repeated)} statements ran more than '
+                       f'{current_app.config["PROFILING_REPEAT_THRESHOLD"]} times"')
+    response.headers['Server-Timing'] = ', '.join(timings)
+    current_app.extensions['balance_sheet']['metrics'].observe(
+        endpoint, request.method, wall, profile.sql_seconds, profile.queries, profile.rows, repeated)
+    return response
+
+@bp.route('/api/_metrics')
+@login_required
+def metrics():
+    """Per-endpoint request metrics in Prometheus text format (empty unless PROFILING is on)"""
+    body = current_app.extensions['balance_sheet']['metrics'].render()
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+# ==========================================
+# Slow-query Log
+# ==========================================
+# Statements slower than SLOW_QUERY_MS are written to balance-sheet/slow_queries.log with
+# their route, redacted parameters and EXPLAIN QUERY PLAN, so a missing index shows
+# up in the log of the install that hit it.
+
+slow_query_logger = logging.getLogger('balance_sheet.slow_queries')
+
+def configure_slow_query_log(path):
+    """Attach one file handler per log path; the file is only opened on the first slow query"""
+    path = os.path.abspath(path)
+    if any(getattr(handler, 'baseFilename', None) == path for handler in slow_query_logger.handlers):
+        return
+    handler = logging.FileHandler(path, delay=True, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s pid %(process)d: %(message)s'))
+    slow_query_logger.addHandler(handler)
+    slow_query_logger.setLevel(logging.WARNING)
+
+def redact_parameter(value):
+    """Keep a parameter's type and size but never its value (descriptions, amounts, notes)"""
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, (str, bytes)):
+        return f'<{type(value).__name__}:{len(value)}>'
+    return f'<{type(value).__name__}>'
+
+def redact_parameters(parameters, executemany):
+    if executemany:
+        return f'{len(parameters)} parameter sets, first: {redact_parameters(parameters[0], False)}' if parameters else '[]'
+    if isinstance(parameters, dict):
+        return {key: redact_parameter(value) for key, value in parameters.items()}
+    return tuple(redact_parameter(value) for value in parameters or ())
+
+def explain_query_plan(dbapi_connection, statement, parameters):
+    """SQLite's plan for the statement as an indented tree, like the sqlite3 shell prints it"""
+    rows = dbapi_connection.execute(f'EXPLAIN QUERY PLAN {statement}', parameters or ()).fetchall()
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append('  ' * (depth[node_id] + 1) + detail)
+    return '\n'.join(lines) or '  (no plan)'
+
+def log_slow_query(dbapi_connection, statement, parameters, executemany, elapsed):
+    if has_request_context():
+        caller = f'{request.method} {request.path} ({request.endpoint})'
+    else:
+        caller = f'thread {threading.current_thread().name}'
+    try:
+        plan = explain_query_plan(dbapi_connection, statement, parameters[0] if executemany else parameters)
+    except Exception as e:
+        plan = f'  (plan unavailable: {e})'
+    slow_query_logger.warning('Slow query %.1f ms in %s\nSQL: %s\nParameters: %s\nPlan:\n%s',
+                              elapsed * 1000, caller, ' '.join(statement.split()),
+                              redact_parameters(parameters, executemany), plan)
+
 # Smart Categorization Rules
 CATEGORIZATION_RULES = {
     'Food & Dining': {
@@ -186,6 +757,38 @@ CATEGORIZATION_RULES = {
     }
 }
 
+def relativedelta(*args, **kwargs):
+    """dateutil's relativedelta, imported on first use to keep startup light"""
+    from dateutil.relativedelta import relativedelta as _relativedelta
+    return _relativedelta(*args, **kwargs)
+
+# Money is stored as integer cents so sums and equality checks are exact
+def to_cents(value):
+    """Dollars (number or numeric string) -> integer cents, rounding half away from zero"""
+    return int(Decimal(str(value)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP).scaleb(2))
+
+def cents_to_dollars(cents):
+    return (cents or 0) / 100
+
+def parse_amount(value):
+    """Amount from a request or CSV row, rounded to the cent"""
+    return cents_to_dollars(to_cents(value))
+
+class Cents(db.TypeDecorator):
+    """INTEGER column of cents that reads and writes dollars.
+
+    Comparisons bind through it as well, so `Expense.amount == 12.5` is an integer
+    match on 1250 and `func.sum(Expense.amount)` is an integer sum converted once.
+    """
+    impl = db.Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else to_cents(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else value / 100
+
 # Database Models
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -205,7 +808,7 @@ expense_tags = db.Table('expense_tags',
 class Expense(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.String(200), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column(Cents, nullable=False)
     date = db.Column(db.Date, nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=True)
     is_recurring = db.Column(db.Boolean, default=False)
@@ -218,11 +821,25 @@ class Expense(db.Model):
     tags = db.relationship('Tag', secondary=expense_tags, lazy='subquery',
         backref=db.backref('expenses', lazy=True))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    row_version = db.Column(db.Integer, default=0)  # SyncState.version of the last change to this row
+    transfer_pair_id = db.Column(db.Integer, nullable=True)  # opposite leg of an internal transfer; 0 = not a transfer
+
+    # Composite indexes backing the keyset-paginated listing and its filters
+    __table_args__ = (
+        db.Index('ix_expense_date_id', 'date', 'id'),
+        db.Index('ix_expense_amount_id', 'amount', 'id'),
+        db.Index('ix_expense_type_date', 'transaction_type', 'date'),
+        db.Index('ix_expense_category_date', 'category_id', 'date'),
+        db.Index('ix_expense_row_version', 'row_version'),
+        db.Index('ix_expense_description_date', 'description', 'date'),
+        db.Index('ix_expense_bpay_biller_code', 'bpay_biller_code'),
+    )
 
 class CashPosition(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column(Cents, nullable=False)
     notes = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -249,31 +866,471 @@ class LearnedRule(db.Model):
 
     category = db.relationship('Category', backref='learned_rules')
 
-def apply_learned_rules(description, bpay_code=None):
+class SchemaMigration(db.Model):
+    """One row per applied schema migration (see MIGRATIONS)"""
+    version = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+    duration_ms = db.Column(db.Float)
+    details = db.Column(db.Text)  # JSON, e.g. probe query timings before/after
+
+class SyncState(db.Model):
+    """Single-row counter that versions every change to the expense table.
+    version is bumped once per write transaction; reset_version records the last
+    time history was truncated (delete-all), older clients must reload in full.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    reset_version = db.Column(db.Integer, nullable=False, default=0)
+
+class ExpenseTombstone(db.Model):
+    """Records a deleted expense so delta-sync clients can drop it from their cache"""
+    id = db.Column(db.Integer, primary_key=True)
+    expense_id = db.Column(db.Integer, nullable=False)
+    version = db.Column(db.Integer, nullable=False, index=True)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class DuplicatePair(db.Model):
+    """Two expenses with the same amount a few days apart and similar descriptions"""
+    expense_id = db.Column(db.Integer, primary_key=True)  # lower id of the pair
+    other_id = db.Column(db.Integer, primary_key=True, index=True)
+    day_gap = db.Column(db.Integer, nullable=False)
+    similarity = db.Column(db.Float, nullable=False)  # token Jaccard of normalized descriptions
+
+# ==========================================
+# Change Tracking for Delta Sync
+# ==========================================
+
+def sync_version(session=None):
+    """Version stamped on every expense change in the current transaction.
+
+    Allocated on first use by incrementing SyncState, which takes SQLite's write
+    lock - so versions become visible in the same order transactions commit.
+    """
+    session = session or db.session
+    version = session.info.get('sync_version')
+    if version is None:
+        connection = session.connection()
+        connection.execute(db.text('UPDATE sync_state SET version = version + 1 WHERE id = 1'))
+        version = connection.execute(db.text('SELECT version FROM sync_state WHERE id = 1')).scalar()
+        session.info['sync_version'] = version
+    return version
+
+def current_sync_version():
+    state = SyncState.query.get(1)
+    return state.version if state else 0
+
+@db.event.listens_for(db.session, 'before_flush')
+def stamp_expense_changes(session, flush_context, instances):
+    changed = [obj for obj in session.new if isinstance(obj, Expense)]
+    changed += [obj for obj in session.dirty if isinstance(obj, Expense) and session.is_modified(obj)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, Expense)]
+    if not changed and not deleted:
+        return
+
+    version = sync_version(session)
+    for obj in changed:
+        obj.row_version = version
+    for obj in deleted:
+        session.add(ExpenseTombstone(expense_id=obj.id, version=version))
+
+@db.event.listens_for(db.session, 'after_commit')
+@db.event.listens_for(db.session, 'after_rollback')
+def clear_sync_version(session):
+    session.info.pop('sync_version', None)
+
+# ==========================================
+# Lightweight Read Layer
+# ==========================================
+# Read-only endpoints select just the columns they need and get plain Row tuples
+# back, skipping ORM instance construction, identity-map bookkeeping and lazy loads.
+
+EXPENSE_COLUMNS = (
+    Expense.id, Expense.description, Expense.amount, Expense.date, Expense.category_id,
+    Expense.is_recurring, Expense.recurring_frequency, Expense.is_essential,
+    Expense.transaction_type, Expense.notes, Expense.source_account,
+    Expense.bpay_biller_code, Expense.row_version, Expense.transfer_pair_id
+)
+
+# Above this many rows, reading the whole tag table beats an IN (...) lookup
+TAG_LOOKUP_IN_LIMIT = 500
+
+# Rows per executemany() when inserting generated rows
+BATCH_CHUNK_SIZE = 500
+
+def json_values(values):
+    """SELECT value FROM json_each(?) over `values`, bound as a single JSON parameter.
+
+    `column.in_(json_values(ids))` is one statement however many ids there are, where
+    a literal IN (...) needs a chunk per few hundred to stay under SQLite's
+    bound-parameter limit.
+    """
+    return db.select(db.column('value')).select_from(db.func.json_each(json.dumps(list(values))))
+
+def category_lookup():
+    """{category_id: (name, color)} including None for uncategorized rows"""
+    lookup = {c.id: (c.name, c.color) for c in db.session.query(Category.id, Category.name, Category.color)}
+    lookup[None] = ('Uncategorized', '#95a5a6')
+    return lookup
+
+def tag_names_by_expense(expense_ids=None):
+    """{expense_id: [tag names]} for the given expenses (or all of them)"""
+    query = db.session.query(expense_tags.c.expense_id, Tag.name) \
+        .join(Tag, expense_tags.c.tag_id == Tag.id)
+    if expense_ids is not None:
+        query = query.filter(expense_tags.c.expense_id.in_(expense_ids))
+    tags = {}
+    for expense_id, name in query:
+        tags.setdefault(expense_id, []).append(name)
+    return tags
+
+def transaction_query(*columns, start_date=None, end_date=None, transaction_type=None):
+    """Query over expense columns within [start_date, end_date).
+
+    Linked internal transfers are left out, since they would count once as an expense
+    and once as income.
+    """
+    query = db.session.query(*columns).filter(counted_in_totals())
+    if start_date:
+        query = query.filter(Expense.date >= start_date)
+    if end_date:
+        query = query.filter(Expense.date < end_date)
+    if transaction_type:
+        query = query.filter(Expense.transaction_type == transaction_type)
+    return query
+
+def sum_cents():
+    """SUM(amount) as raw integer cents, so totals combine without float drift"""
+    return db.func.coalesce(db.func.sum(db.type_coerce(Expense.amount, db.Integer)), 0)
+
+def transaction_totals(*group_by, **filters):
+    """Integer-cent `cents` and `count` per group, aggregated in SQL.
+
+    Takes the same date/type filters as transaction_query().
+    """
+    columns = group_by + (sum_cents().label('cents'), db.func.count(Expense.id).label('count'))
+    return transaction_query(*columns, **filters).group_by(*group_by).all()
+
+def expense_records(rows):
+    """Serialize EXPENSE_COLUMNS rows into the API's expense dicts"""
+    categories = category_lookup()
+    ids = [r.id for r in rows]
+    tags = tag_names_by_expense(ids if len(ids) <= TAG_LOOKUP_IN_LIMIT else None)
+    return [{
+        'id': r.id,
+        'description': r.description,
+        'amount': r.amount,
+        'date': r.date.isoformat(),
+        'category': categories.get(r.category_id, categories[None])[0],
+        'category_id': r.category_id,
+        'is_recurring': r.is_recurring,
+        'recurring_frequency': r.recurring_frequency,
+        'is_essential': r.is_essential,
+        'transaction_type': r.transaction_type or 'expense',
+        'notes': r.notes,
+        'source_account': r.source_account,
+        'bpay_biller_code': r.bpay_biller_code,
+        'tags': tags.get(r.id, []),
+        'row_version': r.row_version or 0,
+        'transfer_pair_id': r.transfer_pair_id or None
+    } for r in rows]
+
+# ==========================================
+# Duplicate Candidate Index
+# ==========================================
+
+# Widest tolerance /api/duplicates can be asked for; pairs outside it are never stored
+DUPLICATE_WINDOW_DAYS = 7
+DUPLICATE_MIN_SIMILARITY = 0.5
+
+# Changing any of these re-pairs an expense; transfer legs are never duplicate candidates
+DUPLICATE_KEY_FIELDS = ('amount', 'date', 'description', 'transaction_type', 'transfer_pair_id')
+
+def normalize_description(description):
+    """
+    Normalize a transaction description for comparison.
+    Removes variable parts like dates, reference numbers, amounts, etc.
+    """
+    desc = description.lower().strip()
+
+    # Remove dates in various formats
+    desc = re.sub(r'\d{1,2}[-/]\d{1,2}[-/]\d{2,4}', '', desc)
+    desc = re.sub(r'\d{1,2}\s+(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\w*\s*\d{0,4}', '', desc, flags=re.IGNORECASE)
+
+    # Remove reference numbers, receipt numbers, transaction IDs
+    desc = re.sub(r'(ref|rcpt|receipt|txn|transaction|id|no|#)[\s:]*[a-z0-9]+', '', desc, flags=re.IGNORECASE)
+    desc = re.sub(r'\b[a-z]{2,4}\d{6,}\b', '', desc)  # Letter prefix + numbers
+    desc = re.sub(r'\b\d{6,}\b', '', desc)  # Long number sequences (6+ digits)
+
+    # Remove card numbers (last 4 digits pattern)
+    desc = re.sub(r'card\s*\d{4}', '', desc, flags=re.IGNORECASE)
+    desc = re.sub(r'x{2,}\d{4}', '', desc, flags=re.IGNORECASE)
+
+    # Remove currency amounts
+    desc = re.sub(r'\$[\d,]+\.?\d*', '', desc)
+    desc = re.sub(r'aud\s*[\d,]+\.?\d*', '', desc, flags=re.IGNORECASE)
+
+    # Remove common suffixes that vary
+    desc = re.sub(r'\s+(aus|australia|au|vic|nsw|qld|sa|wa|nt|tas|act)\s*$', '', desc, flags=re.IGNORECASE)
+    desc = re.sub(r'\s+\d{4}\s*$', '', desc)  # Trailing 4-digit numbers
+
+    # Remove extra whitespace
+    desc = re.sub(r'\s+', ' ', desc).strip()
+
+    return desc
+
+def duplicate_tokens(description):
+    normalized = normalize_description(description or '')
+    return frozenset(normalized.split()) or frozenset([(description or '').lower()])
+
+def description_similarity(tokens_a, tokens_b):
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+def is_transfer_leg(row):
+    return (row.transfer_pair_id or NOT_A_TRANSFER) > 0
+
+def duplicate_pairs_between(rows, candidates):
+    """Pairs of (row, candidate) inside the blocking window: the same transaction_type,
+    exactly equal amounts (same cents, no tolerance), dates within DUPLICATE_WINDOW_DAYS,
+    description similarity above the floor. Linked transfer legs are skipped."""
+    by_key = {}
+    for candidate in candidates:
+        if not is_transfer_leg(candidate):
+            by_key.setdefault((candidate.transaction_type, candidate.amount), []).append(
+                (candidate, duplicate_tokens(candidate.description)))
+
+    pairs = {}
+    for row in rows:
+        if is_transfer_leg(row):
+            continue
+        tokens = duplicate_tokens(row.description)
+        for candidate, candidate_tokens in by_key.get((row.transaction_type, row.amount), ()):
+            if candidate.id == row.id:
+                continue
+            day_gap = abs((candidate.date - row.date).days)
+            if day_gap > DUPLICATE_WINDOW_DAYS:
+                continue
+            similarity = description_similarity(tokens, candidate_tokens)
+            if similarity >= DUPLICATE_MIN_SIMILARITY:
+                key = (min(row.id, candidate.id), max(row.id, candidate.id))
+                pairs[key] = {'expense_id': key[0], 'other_id': key[1],
+                              'day_gap': day_gap, 'similarity': round(similarity, 4)}
+    return list(pairs.values())
+
+def forget_duplicate_pairs(connection, expense_ids):
+    table = DuplicatePair.__table__
+    ids = json_values(expense_ids)
+    connection.execute(table.delete().where(db.or_(table.c.expense_id.in_(ids), table.c.other_id.in_(ids))))
+
+def duplicate_columns(expense):
+    """Columns duplicate pairing reads, from the Expense table or model"""
+    return (expense.id, expense.amount, expense.date, expense.description,
+            expense.transaction_type, expense.transfer_pair_id)
+
+def index_duplicate_candidates(connection, rows):
+    """Re-pair the given rows (see duplicate_columns()) against the table.
+
+    One indexed lookup per call: amount IN (...) over the rows' date span widened by
+    the window, rather than a scan of every expense.
+    """
+    if not rows:
+        return
+    forget_duplicate_pairs(connection, [row.id for row in rows])
+    window = timedelta(days=DUPLICATE_WINDOW_DAYS)
+    expense = Expense.__table__
+    amounts = sorted({to_cents(row.amount) for row in rows})
+    candidates = connection.execute(
+        db.select(*duplicate_columns(expense.c))
+        .where(expense.c.amount.in_(json_values(amounts)),
+               expense.c.date >= min(row.date for row in rows) - window,
+               expense.c.date <= max(row.date for row in rows) + window)
+    ).all()
+    pairs = duplicate_pairs_between(rows, candidates)
+    if pairs:
+        connection.execute(DuplicatePair.__table__.insert(), pairs)
+
+def reindex_duplicate_candidates(connection, expense_ids):
+    """Re-pair expenses whose pairing columns a bulk UPDATE changed (it skips the flush hook)"""
+    expense = Expense.__table__
+    index_duplicate_candidates(connection, connection.execute(
+        db.select(*duplicate_columns(expense.c)).where(expense.c.id.in_(json_values(expense_ids)))
+    ).all())
+
+def rebuild_duplicate_index():
+    """Build every pair from scratch with a sort-merge over (transaction_type, amount, date)."""
+    db.session.execute(DuplicatePair.__table__.delete())
+    rows = db.session.query(*duplicate_columns(Expense)).filter(counted_in_totals()) \
+        .order_by(Expense.transaction_type, Expense.amount, Expense.date).all()
+
+    tokens = {}
+    pairs = []
+    for start, row in enumerate(rows):
+        # Rows sharing this type and amount within the window follow it directly in sort order
+        end = start + 1
+        while (end < len(rows) and rows[end].transaction_type == row.transaction_type
+               and rows[end].amount == row.amount
+               and (rows[end].date - row.date).days <= DUPLICATE_WINDOW_DAYS):
+            end += 1
+        if end == start + 1:
+            continue
+        row_tokens = tokens.setdefault(row.id, duplicate_tokens(row.description))
+        for other in rows[start + 1:end]:
+            other_tokens = tokens.setdefault(other.id, duplicate_tokens(other.description))
+            similarity = description_similarity(row_tokens, other_tokens)
+            if similarity >= DUPLICATE_MIN_SIMILARITY:
+                pairs.append({'expense_id': min(row.id, other.id), 'other_id': max(row.id, other.id),
+                              'day_gap': (other.date - row.date).days,
+                              'similarity': round(similarity, 4)})
+    for start in range(0, len(pairs), BATCH_CHUNK_SIZE):
+        db.session.execute(DuplicatePair.__table__.insert(), pairs[start:start + BATCH_CHUNK_SIZE])
+    db.session.commit()
+    return len(pairs)
+
+@db.event.listens_for(db.session, 'after_flush')
+def maintain_duplicate_index(session, flush_context):
+    changed = [obj for obj in session.new if isinstance(obj, Expense)]
+    for obj in session.dirty:
+        if isinstance(obj, Expense):
+            state = db.inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in DUPLICATE_KEY_FIELDS):
+                changed.append(obj)
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Expense)]
+    if not changed and not deleted:
+        return
+
+    connection = session.connection()
+    if deleted:
+        forget_duplicate_pairs(connection, deleted)
+    index_duplicate_candidates(connection, changed)
+
+# ==========================================
+# Cross-account Transfer Matching
+# ==========================================
+# Money moved between our own accounts shows up as an expense in one account and as
+# income in another. The matcher links those legs (transfer_pair_id) so totals skip them.
+
+TRANSFER_WINDOW_DAYS = 3
+NOT_A_TRANSFER = 0  # transfer_pair_id after the user unlinks a pair; never re-matched
+
+def counted_in_totals():
+    """Filter for rows that belong in income/expense totals (not a linked transfer leg)"""
+    return db.func.coalesce(Expense.transfer_pair_id, NOT_A_TRANSFER) == NOT_A_TRANSFER
+
+def match_transfers(start_date=None, end_date=None):
+    """Link equal-amount, opposite-direction transactions from different accounts.
+
+    Unlinked rows are read once, sorted by (amount, date), and each equal-amount run
+    is split into date-ordered expense and income legs. A sliding date window pairs
+    each expense only with the income rows within TRANSFER_WINDOW_DAYS; pairs from
+    different accounts are candidates, and the closest dates are linked first.
+    Caller commits.
+    """
+    window = timedelta(days=TRANSFER_WINDOW_DAYS)
+    query = db.session.query(
+        Expense.id, Expense.amount, Expense.date, Expense.transaction_type, Expense.source_account
+    ).filter(
+        Expense.transfer_pair_id.is_(None),
+        Expense.source_account.isnot(None),
+        Expense.transaction_type.in_(('income', 'expense'))
+    )
+    if start_date:
+        query = query.filter(Expense.date >= start_date - window)
+    if end_date:
+        query = query.filter(Expense.date <= end_date + window)
+    rows = query.order_by(Expense.amount, Expense.date).all()
+
+    links = []
+    start = 0
+    while start < len(rows):
+        end = start
+        while end < len(rows) and rows[end].amount == rows[start].amount:
+            end += 1
+        run = rows[start:end]
+        start = end
+
+        outgoing = [r for r in run if r.transaction_type == 'expense']
+        incoming = [r for r in run if r.transaction_type == 'income']
+        if not outgoing or not incoming:
+            continue
+
+        # Both legs are date-ordered, so the incoming rows within the window of each
+        # outgoing row are a slice that only moves forward
+        candidates = []
+        first = 0
+        for out in outgoing:
+            while first < len(incoming) and incoming[first].date < out.date - window:
+                first += 1
+            i = first
+            while i < len(incoming) and incoming[i].date <= out.date + window:
+                inc = incoming[i]
+                if inc.source_account != out.source_account:
+                    candidates.append((abs((inc.date - out.date).days), out.date, out.id, inc.id))
+                i += 1
+        linked = set()
+        for gap, _, out_id, inc_id in sorted(candidates):
+            if out_id not in linked and inc_id not in linked:
+                linked.update((out_id, inc_id))
+                links.append((out_id, inc_id))
+
+    if links:
+        version = sync_version()
+        db.session.execute(db.update(Expense), [
+            {'id': a, 'transfer_pair_id': b, 'row_version': version}
+            for pair in links for a, b in (pair, pair[::-1])
+        ])
+        # Transfer legs are never duplicates of anything
+        forget_duplicate_pairs(db.session.connection(), [expense_id for pair in links for expense_id in pair])
+    return len(links)
+
+def release_transfer_partners(connection, expense_ids, version):
+    """Unlink the surviving leg of any transfer whose other leg is being deleted; the
+    survivor becomes a duplicate candidate again"""
+    expense = Expense.__table__
+    survivors = connection.execute(
+        expense.update().where(expense.c.transfer_pair_id.in_(json_values(expense_ids)))
+        .values(transfer_pair_id=None, row_version=version).returning(expense.c.id)
+    ).scalars().all()
+    if survivors:
+        reindex_duplicate_candidates(connection, survivors)
+
+@db.event.listens_for(db.session, 'after_flush')
+def release_deleted_transfers(session, flush_context):
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Expense) and obj.transfer_pair_id]
+    if deleted:
+        release_transfer_partners(session.connection(), deleted, sync_version(session))
+
+def load_learned_rules():
+    """Every learned rule in one query, indexed for apply_learned_rules():
+    (first rule per BPAY code, first exact rule per description, contains rules by priority)
+    """
+    by_bpay, exact, contains = {}, {}, []
+    for rule in LearnedRule.query.order_by(LearnedRule.id):
+        if rule.bpay_biller_code:
+            by_bpay.setdefault(rule.bpay_biller_code, rule)
+        if rule.match_type == 'exact':
+            exact.setdefault(rule.description_pattern, rule)
+        elif rule.match_type == 'contains' and rule.description_pattern:
+            contains.append(rule)
+    contains.sort(key=lambda rule: -(rule.priority or 0))
+    return by_bpay, exact, contains
+
+def apply_learned_rules(description, bpay_code=None, rules=None):
     """
     Check if we have a learned rule for this transaction.
     Returns: (category_id, is_essential, transaction_type) or None if no rule matches.
     Priority order: BPAY code > exact description > contains description
+    Pass `rules` from load_learned_rules() when checking many descriptions.
     """
-    # First check BPAY code (highest priority)
-    if bpay_code:
-        rule = LearnedRule.query.filter_by(bpay_biller_code=bpay_code).first()
-        if rule:
-            return (rule.category_id, rule.is_essential, rule.transaction_type)
-
-    # Then check exact description match
-    rule = LearnedRule.query.filter_by(
-        description_pattern=description,
-        match_type='exact'
-    ).first()
+    by_bpay, exact, contains = rules or load_learned_rules()
+    # First check BPAY code (highest priority), then exact description match
+    rule = (bpay_code and by_bpay.get(bpay_code)) or exact.get(description)
     if rule:
         return (rule.category_id, rule.is_essential, rule.transaction_type)
 
     # Finally check "contains" rules (lower priority)
     desc_lower = description.lower()
-    contains_rules = LearnedRule.query.filter_by(match_type='contains').order_by(LearnedRule.priority.desc()).all()
-    for rule in contains_rules:
-        if rule.description_pattern and rule.description_pattern.lower() in desc_lower:
+    for rule in contains:
+        if rule.description_pattern.lower() in desc_lower:
             return (rule.category_id, rule.is_essential, rule.transaction_type)
 
     return None
@@ -317,6 +1374,16 @@ def extract_fuzzy_keywords(description):
 
     return keyword_pattern.strip()
 
+def keyword_pattern(keywords):
+    """One regex matching any of the keywords as a substring, or None for an empty list"""
+    return re.compile('|'.join(map(re.escape, keywords))) if keywords else None
+
+@cache
+def categorization_index():
+    """CATEGORIZATION_RULES compiled to (category, keyword pattern, essential pattern, rules), in rule order"""
+    return [(category_name, keyword_pattern(rules['keywords']), keyword_pattern(rules['essential_keywords']), rules)
+            for category_name, rules in CATEGORIZATION_RULES.items() if rules['keywords']]
+
 # Smart Categorization Function
 def smart_categorize(description):
     """
@@ -325,39 +1392,321 @@ def smart_categorize(description):
     """
     desc_lower = description.lower()
 
-    # Check against each category
-    for category_name, rules in CATEGORIZATION_RULES.items():
-        for keyword in rules['keywords']:
-            if keyword in desc_lower:
-                # Determine if essential based on keyword match
-                is_essential = False
-
-                # First check if it matches essential keywords (supermarkets, necessities)
-                if any(kw in desc_lower for kw in rules['essential_keywords']):
-                    is_essential = True
-                # Otherwise, use category default (for categories without essential keywords)
-                elif not rules['essential_keywords']:
-                    is_essential = rules['essential']
-
-                # Generate tags
-                tags = []
-                if is_essential:
-                    tags.append('essential')
-                else:
-                    tags.append('optional')
+    # Check against each category; the first category with any keyword match wins
+    for category_name, keywords, essential_keywords, rules in categorization_index():
+        if keywords.search(desc_lower):
+            # Determine if essential based on keyword match
+            is_essential = False
+
+            # First check if it matches essential keywords (supermarkets, necessities)
+            if essential_keywords and essential_keywords.search(desc_lower):
+                is_essential = True
+            # Otherwise, use category default (for categories without essential keywords)
+            elif not essential_keywords:
+                is_essential = rules['essential']
+
+            # Generate tags
+            tags = []
+            if is_essential:
+                tags.append('essential')
+            else:
+                tags.append('optional')
 
-                # Add recurring tag for known subscriptions
-                if 'subscription' in category_name.lower() or any(sub in desc_lower for sub in ['netflix', 'spotify', 'prime', 'gym', 'kayo', 'disney']):
-                    tags.append('recurring')
+            # Add recurring tag for known subscriptions
+            if 'subscription' in category_name.lower() or any(sub in desc_lower for sub in ['netflix', 'spotify', 'prime', 'gym', 'kayo', 'disney']):
+                tags.append('recurring')
 
-                return category_name, is_essential, tags
+            return category_name, is_essential, tags
 
     # Default: uncategorized and optional
     return 'Other', False, ['optional']
 
+# ==========================================
+# Full-text Search Index
+# ==========================================
+# expense_fts is an FTS5 table keyed by expense id, kept in step with the expense and
+# category tables by triggers so every write path (ORM, bulk SQL, imports) is covered.
+
+SEARCH_INDEX_TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS expense_fts_insert AFTER INSERT ON expense BEGIN
+        INSERT INTO expense_fts(rowid, description, notes, category, source_account)
+        VALUES (new.id, new.description, coalesce(new.notes, ''),
+                coalesce((SELECT name FROM category WHERE id = new.category_id), 'Uncategorized'),
+                coalesce(new.source_account, ''));
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS expense_fts_update
+    AFTER UPDATE OF description, notes, category_id, source_account ON expense BEGIN
+        DELETE FROM expense_fts WHERE rowid = old.id;
+        INSERT INTO expense_fts(rowid, description, notes, category, source_account)
+        VALUES (new.id, new.description, coalesce(new.notes, ''),
+                coalesce((SELECT name FROM category WHERE id = new.category_id), 'Uncategorized'),
+                coalesce(new.source_account, ''));
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS expense_fts_delete AFTER DELETE ON expense BEGIN
+        DELETE FROM expense_fts WHERE rowid = old.id;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS expense_fts_category_rename AFTER UPDATE OF name ON category BEGIN
+        UPDATE expense_fts SET category = new.name
+        WHERE rowid IN (SELECT id FROM expense WHERE category_id = new.id);
+    END''',
+]
+
+def search_available():
+    """Whether the FTS5 index exists; looked up once per app"""
+    state = current_app.extensions['balance_sheet']
+    if state.get('search_available') is None:
+        state['search_available'] = search_index_ready()
+    return state['search_available']
+
+def search_index_ready():
+    return db.session.execute(db.text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'expense_fts'")).first() is not None
+
+def ensure_search_index():
+    """Create the FTS5 index and its triggers, backfilling it the first time"""
+    exists = db.session.execute(db.text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'expense_fts'")).first()
+    try:
+        if not exists:
+            db.session.execute(db.text(
+                "CREATE VIRTUAL TABLE expense_fts USING fts5("
+                "description, notes, category, source_account, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"))
+            db.session.execute(db.text('''
+                INSERT INTO expense_fts(rowid, description, notes, category, source_account)
+                SELECT e.id, e.description, coalesce(e.notes, ''), coalesce(c.name, 'Uncategorized'),
+                       coalesce(e.source_account, '')
+                FROM expense e LEFT JOIN category c ON c.id = e.category_id'''))
+        for trigger in SEARCH_INDEX_TRIGGERS:
+            db.session.execute(db.text(trigger))
+        db.session.commit()
+    except Exception as e:
+        # SQLite built without FTS5 - search falls back to LIKE matching
+        db.session.rollback()
+        print(f"WARNING: full-text search index unavailable: {e}")
+
+# ==========================================
+# Schema Migrations
+# ==========================================
+# Each migration runs once per database, in version order, and is recorded in
+# schema_migration. They are written to be idempotent so databases upgraded by the
+# earlier ad hoc startup code (columns already added, FTS table present) pass through.
+
+MIGRATIONS = []
+
+def migration(version, name):
+    def register(fn):
+        MIGRATIONS.append((version, name, fn))
+        return fn
+    return register
+
+def add_missing_columns(table, columns):
+    existing = {row[1] for row in db.session.execute(db.text(f'PRAGMA table_info({table})'))}
+    added = [name for name, _ in columns if name not in existing]
+    for name, column_type in columns:
+        if name not in existing:
+            db.session.execute(db.text(f'ALTER TABLE {table} ADD COLUMN {name} {column_type}'))
+    db.session.commit()
+    return added
+
+def column_types(table):
+    return {row[1]: row[2].upper() for row in db.session.execute(db.text(f'PRAGMA table_info({table})'))}
+
+def rebuild_table(model, conversions):
+    """Recreate a table from its current model definition and copy the rows across.
+
+    SQLite cannot change a column's type in place, so this follows its documented
+    recipe: create the new table, copy, drop the old one, rename, then recreate the
+    indexes and triggers. `conversions` maps a column name to the SQL expression that
+    converts its old values. Returns the number of rows copied.
+    """
+    table = model.__table__
+    existing = column_types(table.name)
+    # Copy the whole schema so foreign keys in the new table resolve
+    scratch = db.MetaData()
+    for other in db.metadata.tables.values():
+        if other is not table:
+            other.to_metadata(scratch)
+    rebuilt = table.to_metadata(scratch, name=f'{table.name}_rebuild')
+    columns = [c.name for c in table.columns if c.name in existing]
+    column_list = ', '.join(f'"{name}"' for name in columns)
+    select_list = ', '.join(conversions.get(name, f'"{name}"') for name in columns)
+
+    db.session.commit()
+    with db.engine.connect() as connection:
+        # Must be off outside a transaction, or DROP TABLE cascades into expense_tags
+        foreign_keys = connection.execute(db.text('PRAGMA foreign_keys')).scalar()
+        connection.execute(db.text('PRAGMA foreign_keys = OFF'))
+        triggers = connection.execute(db.text(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND sql IS NOT NULL")).all()
+        for trigger in triggers:
+            connection.execute(db.text(f'DROP TRIGGER "{trigger.name}"'))
+        connection.execute(db.text(f'DROP TABLE IF EXISTS {rebuilt.name}'))  # left by an interrupted run
+        connection.execute(CreateTable(rebuilt))
+        copied = connection.execute(db.text(
+            f'INSERT INTO {rebuilt.name} ({column_list}) SELECT {select_list} FROM {table.name}')).rowcount
+        connection.execute(db.text(f'DROP TABLE {table.name}'))
+        connection.execute(db.text(f'ALTER TABLE {rebuilt.name} RENAME TO {table.name}'))
+        for index in table.indexes:
+            index.create(connection)
+        for trigger in triggers:
+            connection.execute(db.text(trigger.sql))
+        connection.commit()
+        if foreign_keys:
+            connection.execute(db.text('PRAGMA foreign_keys = ON'))
+    return copied
+
+# Representative hot-path queries, timed around the index migration
+MIGRATION_PROBE_QUERIES = {
+    'month_expense_total': "SELECT sum(amount) FROM expense WHERE date >= :month_start "
+                           "AND date < :month_end AND transaction_type = 'expense'",
+    'category_year': "SELECT count(*), sum(amount) FROM expense WHERE category_id = :category_id "
+                     "AND date >= :year_start AND date < :year_end",
+    'import_dedupe': "SELECT id FROM expense WHERE description = :description AND amount = :amount "
+                     "AND date = :date LIMIT 1",
+    'bpay_lookup': "SELECT count(*) FROM expense WHERE bpay_biller_code = :bpay_biller_code",
+}
+MIGRATION_PROBE_RUNS = 20
+
+def time_probe_queries():
+    """Median milliseconds per probe query, parameterised from the newest expense"""
+    sample = db.session.execute(db.text(
+        'SELECT description, amount, date, category_id FROM expense ORDER BY date DESC LIMIT 1')).first()
+    if not sample:
+        return {}
+    day = datetime.strptime(str(sample.date)[:10], '%Y-%m-%d').date()
+    params = {
+        'month_start': day.replace(day=1), 'month_end': day.replace(day=1) + relativedelta(months=1),
+        'year_start': day.replace(month=1, day=1), 'year_end': day.replace(month=12, day=31),
+        'category_id': sample.category_id, 'description': sample.description,
+        'amount': sample.amount, 'date': sample.date, 'bpay_biller_code': '0000',
+    }
+    timings = {}
+    for name, sql in MIGRATION_PROBE_QUERIES.items():
+        runs = []
+        for _ in range(MIGRATION_PROBE_RUNS):
+            started = time.perf_counter()
+            db.session.execute(db.text(sql), params).all()
+            runs.append((time.perf_counter() - started) * 1000)
+        timings[name] = round(sorted(runs)[len(runs) // 2], 3)
+    return timings
+
+@migration(1, 'legacy expense columns')
+def migrate_legacy_expense_columns():
+    return {'added': add_missing_columns('expense', [
+        ('is_essential', 'BOOLEAN DEFAULT 0'),
+        ('transaction_type', "VARCHAR(10) DEFAULT 'expense'"),
+        ('notes', 'TEXT'),
+        ('source_account', 'VARCHAR(100)'),
+        ('bpay_biller_code', 'VARCHAR(20)'),
+    ])}
+
+@migration(2, 'delta sync change tracking')
+def migrate_change_tracking():
+    added = add_missing_columns('expense', [('updated_at', 'DATETIME'), ('row_version', 'INTEGER DEFAULT 0')])
+    if not db.session.get(SyncState, 1):
+        db.session.add(SyncState(id=1, version=0, reset_version=0))
+        db.session.commit()
+    return {'added': added}
+
+@migration(3, 'full-text search index')
+def migrate_search_index():
+    ensure_search_index()
+    return {'fts5': search_index_ready()}
+
+@migration(4, 'duplicate candidate index')
+def migrate_duplicate_index():
+    # create_all() makes the table; migration 8 fills it once transfer links exist
+    return {}
+
+@migration(5, 'cross-account transfer links')
+def migrate_transfer_links():
+    added = add_missing_columns('expense', [('transfer_pair_id', 'INTEGER')])
+    linked = match_transfers()
+    db.session.commit()
+    return {'added': added, 'linked': linked}
+
+@migration(6, 'query indexes')
+def migrate_query_indexes():
+    before = time_probe_queries()
+    # create_all() only creates indexes along with new tables; add any an existing table lacks
+    for index in Expense.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+    return {'timings_ms': {'before': before, 'after': time_probe_queries()}}
+
+@migration(7, 'integer cents amounts')
+def migrate_integer_cents():
+    # Float dollars -> INTEGER cents (see Cents), so SUM() and equality matches are exact
+    converted = {}
+    for model in (Expense, CashPosition):
+        if column_types(model.__tablename__).get('amount') != 'INTEGER':
+            converted[model.__tablename__] = rebuild_table(
+                model, {'amount': 'CAST(round(amount * 100) AS INTEGER)'})
+    if converted:
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+    return {'converted': converted}
+
+@migration(8, 'duplicate pairs by transaction type')
+def migrate_duplicate_pairs_by_type():
+    # Pairs used to ignore transaction_type and transfer links; rebuild without them
+    return {'pairs': rebuild_duplicate_index()}
+
+def schema_version():
+    return db.session.query(db.func.max(SchemaMigration.version)).scalar() or 0
+
+def run_migrations():
+    """Apply pending migrations in order; returns the SchemaMigration rows added"""
+    applied = {version for (version,) in db.session.query(SchemaMigration.version)}
+    added = []
+    for version, name, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in applied:
+            continue
+        started = time.perf_counter()
+        details = fn() or {}
+        record = SchemaMigration(version=version, name=name,
+                                 duration_ms=round((time.perf_counter() - started) * 1000, 1),
+                                 details=json.dumps(details, default=str))
+        db.session.add(record)
+        db.session.commit()
+        print(f"Applied migration {version} ({name}) in {record.duration_ms} ms")
+        added.append(record)
+    return added
+
+@bp.cli.command('migrate')
+@click.option('--status', is_flag=True, help='List migrations without applying any.')
+def migrate_command(status):
+    """Upgrade the database schema to the latest version."""
+    if not status:
+        run_migrations()
+    applied = {m.version: m for m in SchemaMigration.query}
+    for version, name, _ in sorted(MIGRATIONS, key=lambda m: m[0]):
+        record = applied.get(version)
+        state = f'applied {record.applied_at:%Y-%m-%d %H:%M} ({record.duration_ms} ms)' if record else 'pending'
+        click.echo(f'{version:>3}  {name:<32} {state}')
+        if record and record.details:
+            timings = json.loads(record.details).get('timings_ms')
+            for query, after_ms in (timings or {}).get('after', {}).items():
+                click.echo(f'       {query:<24} {timings["before"].get(query, "-")} ms -> {after_ms} ms')
+    click.echo(f'Schema version {schema_version()}')
+
+@bp.cli.command('checkpoint')
+def checkpoint_command():
+    """Checkpoint the WAL into the database file and truncate it."""
+    before = wal_size_bytes()
+    busy, wal_pages, checkpointed = checkpoint_wal('TRUNCATE')
+    click.echo(f'journal_mode={db.session.execute(db.text("PRAGMA journal_mode")).scalar()} '
+               f'wal {before} -> {wal_size_bytes()} bytes, {checkpointed}/{wal_pages} pages'
+               f'{" (readers still active)" if busy else ""}')
+
 # Initialize database
-with app.app_context():
+def init_db():
+    """Create tables, apply migrations and seed the default categories (idempotent)"""
     db.create_all()
+    run_migrations()
+    current_app.extensions['balance_sheet']['search_available'] = search_index_ready()
 
     # Add default categories if none exist
     if Category.query.count() == 0:
@@ -393,39 +1742,47 @@ with app.app_context():
             db.session.add(Category(name=cat_name, color=cat_color))
     db.session.commit()
 
+@bp.cli.command('init-db')
+def init_db_command():
+    """Create or upgrade the database and seed default categories."""
+    started = time.perf_counter()
+    init_db()
+    click.echo(f'Database ready (schema version {schema_version()}) in {(time.perf_counter() - started) * 1000:.0f} ms')
+
 # Routes
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         password = request.form.get('password')
         if password == APP_PASSWORD:
             session['logged_in'] = True
-            return redirect(url_for('index'))
+            return redirect(url_for('balance_sheet.index'))
         else:
             return render_template('login.html', error='Incorrect password')
     return render_template('login.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
     session.pop('logged_in', None)
-    return redirect(url_for('login'))
+    return redirect(url_for('balance_sheet.login'))
 
-@app.route('/')
+@bp.route('/')
 @login_required
 def index():
     return render_template('index.html')
 
-@app.route('/test')
+@bp.route('/test')
 def test():
     return render_template('test.html')
 
-@app.route('/api/expenses', methods=['GET', 'POST'])
+@bp.route('/api/expenses', methods=['GET', 'POST'])
+@serialized_write()
 def expenses():
     if request.method == 'POST':
         data = request.json
         expense = Expense(
             description=data['description'],
-            amount=float(data['amount']),
+            amount=parse_amount(data['amount']),
             date=datetime.strptime(data['date'], '%Y-%m-%d').date(),
             category_id=data.get('category_id'),
             is_recurring=data.get('is_recurring', False),
@@ -448,26 +1805,528 @@ def expenses():
         db.session.commit()
         return jsonify({'message': 'Expense added successfully', 'id': expense.id}), 201
 
-    # GET request - return all expenses
-    expenses = Expense.query.order_by(Expense.date.desc()).all()
-    return jsonify([{
-        'id': e.id,
-        'description': e.description,
-        'amount': e.amount,
-        'date': e.date.isoformat(),
-        'category': e.category.name if e.category else 'Uncategorized',
-        'category_id': e.category_id,
-        'is_recurring': e.is_recurring,
-        'recurring_frequency': e.recurring_frequency,
-        'is_essential': e.is_essential,
-        'transaction_type': e.transaction_type if hasattr(e, 'transaction_type') else 'expense',
-        'notes': e.notes,
-        'source_account': e.source_account if hasattr(e, 'source_account') else None,
-        'bpay_biller_code': e.bpay_biller_code if hasattr(e, 'bpay_biller_code') else None,
-        'tags': [tag.name for tag in e.tags]
-    } for e in expenses])
-
-@app.route('/api/expenses/bulk-update-category', methods=['POST'])
+    # GET request - paginated when a page size or cursor is given, otherwise every expense
+    if 'limit' in request.args or 'cursor' in request.args:
+        try:
+            return jsonify(list_expenses_page(request.args))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    # Read the version before the rows: a write landing in between is re-sent by the next delta
+    version = current_sync_version()
+    if request.args.get('format') == 'columnar':
+        response = compressed_json_response(expenses_columnar())
+        response.headers['X-Data-Version'] = str(version)
+        return response
+
+    rows = db.session.query(*EXPENSE_COLUMNS).order_by(Expense.date.desc()).all()
+    response = jsonify(expense_records(rows))
+    response.headers['X-Data-Version'] = str(version)
+    return response
+
+@bp.route('/api/expenses/changes', methods=['GET'])
+@login_required
+def expense_changes():
+    """Rows inserted, updated or deleted since a data version (for client-side caches)"""
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({'error': 'since must be an integer version'}), 400
+
+    state = SyncState.query.get(1)
+    if since < state.reset_version or since > state.version:
+        # History before a delete-all is gone (or the client is from another database)
+        return jsonify({'version': state.version, 'full_reload': True, 'upserted': [], 'deleted': []})
+
+    upserted = db.session.query(*EXPENSE_COLUMNS).filter(Expense.row_version > since) \
+        .order_by(Expense.date.desc()).all()
+    upserted_ids = {e.id for e in upserted}
+    deleted_ids = {t.expense_id for t in ExpenseTombstone.query.filter(ExpenseTombstone.version > since)}
+
+    return jsonify({
+        'version': state.version,
+        'full_reload': False,
+        'upserted': expense_records(upserted),
+        # An id deleted and later reused by a new row is reported only as an upsert
+        'deleted': sorted(deleted_ids - upserted_ids)
+    })
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 200
+# Private-use markers survive html escaping, then become <mark> tags
+HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE = '\ue000', '\ue001'
+
+def fts_match_query(text):
+    """Turn free text into an FTS5 query: every word must match, last one as a prefix"""
+    words = re.findall(r'\w+', text.lower())
+    return ' AND '.join(f'"{word}"*' for word in words)
+
+def highlight_html(text):
+    return html.escape(text or '').replace(HIGHLIGHT_OPEN, '<mark>').replace(HIGHLIGHT_CLOSE, '</mark>')
+
+@bp.route('/api/expenses/search', methods=['GET'])
+@login_required
+def search_expenses():
+    """Ranked full-text search over description, notes, category and source account"""
+    started = time.perf_counter()
+    text = request.args.get('q', '').strip()
+    try:
+        limit = min(max(int(request.args.get('limit', SEARCH_DEFAULT_LIMIT)), 1), SEARCH_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    match = fts_match_query(text)
+    if not match:
+        return jsonify({'query': text, 'results': [], 'took_ms': 0})
+
+    if search_available():
+        # bm25 column weights: description, notes, category, source_account
+        hits = db.session.execute(db.text('''
+            SELECT rowid AS id,
+                   bm25(expense_fts, 10.0, 3.0, 2.0, 1.0) AS rank,
+                   highlight(expense_fts, 0, :open, :close) AS description,
+                   snippet(expense_fts, 1, :open, :close, '...', 12) AS notes
+            FROM expense_fts
+            WHERE expense_fts MATCH :match
+            ORDER BY rank
+            LIMIT :limit'''),
+            {'match': match, 'limit': limit, 'open': HIGHLIGHT_OPEN, 'close': HIGHLIGHT_CLOSE}).all()
+    else:
+        query = Expense.query
+        for word in re.findall(r'\w+', text):
+            query = query.filter(Expense.description.ilike(like_pattern(word), escape='\\'))
+        hits = [(row.id, 0.0, row.description, '') for row in
+                query.with_entities(Expense.id, Expense.description).order_by(Expense.date.desc()).limit(limit)]
+
+    rows = {r.id: r for r in db.session.query(*EXPENSE_COLUMNS).filter(Expense.id.in_([h[0] for h in hits]))}
+    records = {r['id']: r for r in expense_records(list(rows.values()))}
+
+    results = []
+    for expense_id, rank, description, notes in hits:
+        record = records.get(expense_id)
+        if not record:
+            continue
+        record['rank'] = rank
+        record['highlight'] = {
+            'description': highlight_html(description),
+            'notes': highlight_html(notes) if HIGHLIGHT_OPEN in (notes or '') else None
+        }
+        results.append(record)
+
+    return jsonify({
+        'query': text,
+        'results': results,
+        'took_ms': round((time.perf_counter() - started) * 1000, 2)
+    })
+
+# ==========================================
+# Columnar Transfer Format
+# ==========================================
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Low-cardinality string columns sent as indexes into a per-response dictionary
+COLUMNAR_DICTIONARY_FIELDS = ['source_account', 'transaction_type', 'recurring_frequency']
+# Mostly-empty columns sent as {row index: value} for the rows that have a value
+COLUMNAR_SPARSE_FIELDS = ['notes', 'bpay_biller_code', 'transfer_pair_id']
+
+def expenses_columnar():
+    """All expenses as one array per field, newest first.
+
+    Categories and low-cardinality strings are dictionary-encoded to small ints, dates
+    are day offsets from date_base, booleans are 0/1 and tags are lists of tag indexes.
+    decodeColumnarExpenses() in app.js turns this back into the row objects.
+    """
+    rows = db.session.query(*EXPENSE_COLUMNS).order_by(Expense.date.desc(), Expense.id.desc()).all()
+
+    categories = {c.id: c.name for c in Category.query.all()}
+    tag_names = {t.id: t.name for t in Tag.query.all()}
+    tags_by_expense = {}
+    for expense_id, tag_id in db.session.query(expense_tags.c.expense_id, expense_tags.c.tag_id):
+        tags_by_expense.setdefault(expense_id, []).append(tag_id)
+
+    date_base = min((r.date for r in rows), default=datetime(1970, 1, 1).date())
+
+    category_index = {}
+    category_dictionary = []
+    dictionaries = {field: [] for field in COLUMNAR_DICTIONARY_FIELDS}
+    dictionary_index = {field: {} for field in COLUMNAR_DICTIONARY_FIELDS}
+    tag_index = {}
+    tag_dictionary = []
+
+    columns = {field: [] for field in ['id', 'description', 'amount', 'date', 'category',
+                                       'is_recurring', 'is_essential', 'tags', 'row_version']
+                                      + COLUMNAR_DICTIONARY_FIELDS}
+    sparse = {field: {} for field in COLUMNAR_SPARSE_FIELDS}
+
+    for i, r in enumerate(rows):
+        columns['id'].append(r.id)
+        columns['description'].append(r.description)
+        columns['amount'].append(r.amount)
+        columns['date'].append((r.date - date_base).days)
+        columns['is_recurring'].append(1 if r.is_recurring else 0)
+        columns['is_essential'].append(1 if r.is_essential else 0)
+        columns['row_version'].append(r.row_version or 0)
+
+        if r.category_id not in category_index:
+            category_index[r.category_id] = len(category_dictionary)
+            category_dictionary.append([r.category_id, categories.get(r.category_id, 'Uncategorized')])
+        columns['category'].append(category_index[r.category_id])
+
+        for field in COLUMNAR_DICTIONARY_FIELDS:
+            value = getattr(r, field)
+            if value not in dictionary_index[field]:
+                dictionary_index[field][value] = len(dictionaries[field])
+                dictionaries[field].append(value)
+            columns[field].append(dictionary_index[field][value])
+
+        for field in COLUMNAR_SPARSE_FIELDS:
+            value = getattr(r, field)
+            if value:
+                sparse[field][i] = value
+
+        encoded_tags = []
+        for tag_id in tags_by_expense.get(r.id, ()):
+            if tag_id not in tag_index:
+                tag_index[tag_id] = len(tag_dictionary)
+                tag_dictionary.append(tag_names.get(tag_id))
+            encoded_tags.append(tag_index[tag_id])
+        columns['tags'].append(encoded_tags)
+
+    dictionaries['category'] = category_dictionary
+    dictionaries['tags'] = tag_dictionary
+
+    return {
+        'format': 'columnar',
+        'count': len(rows),
+        'date_base': date_base.isoformat(),
+        'columns': columns,
+        'sparse': sparse,
+        'dictionaries': dictionaries
+    }
+
+def compressed_json_response(payload):
+    """Compact JSON response, brotli- or gzip-compressed when the client accepts it"""
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    accepted = request.headers.get('Accept-Encoding', '')
+    encoding = None
+    if BROTLI_AVAILABLE and 'br' in accepted:
+        body, encoding = brotli.compress(body, quality=5), 'br'
+    elif 'gzip' in accepted:
+        body, encoding = gzip.compress(body, compresslevel=6), 'gzip'
+
+    response = current_app.response_class(body, mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+# ==========================================
+# Server-side Filtering & Keyset Pagination
+# ==========================================
+
+# Sort columns offered by toggleSort() in app.js, mapped to (SQL expression, cursor value parser)
+EXPENSE_SORT_COLUMNS = {
+    'date': (Expense.date, lambda v: datetime.strptime(v, '%Y-%m-%d').date()),
+    'description': (Expense.description, str),
+    'account': (db.func.coalesce(Expense.source_account, ''), str),
+    'category': (db.func.coalesce(Category.name, 'Uncategorized'), str),
+    # Same labels the client sorts by (static/js/expense-worker.js), so asc puts essential first
+    'type': (db.case((Expense.is_essential == db.true(), 'essential'), else_='optional'), str),
+    'amount': (Expense.amount, float),
+}
+
+EXPENSE_PAGE_DEFAULT = 200
+EXPENSE_PAGE_MAX = 1000
+
+def encode_cursor(sort_value, expense_id):
+    if hasattr(sort_value, 'isoformat'):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, expense_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        sort_value, expense_id = json.loads(base64.urlsafe_b64decode(padded))
+        return sort_value, int(expense_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def like_pattern(text):
+    """Escape LIKE wildcards so user input matches literally"""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+# Query parameters filter_expenses() understands
+EXPENSE_FILTER_KEYS = ('q', 'year', 'category_id', 'category', 'type', 'transaction_type', 'amount_min', 'amount_max')
+
+def expense_filter_criteria(args):
+    """The WHERE criteria for the transaction list filters in `args` (same semantics as
+    filterAndDisplayExpenses in app.js); empty when no filter applies"""
+    criteria = []
+    search = (args.get('q') or '').strip()
+    if search:
+        criteria.append(Expense.description.ilike(like_pattern(search), escape='\\'))
+
+    year = args.get('year')
+    if year:
+        year = int(year)
+        criteria += [Expense.date >= datetime(year, 1, 1).date(), Expense.date < datetime(year + 1, 1, 1).date()]
+
+    category_id = args.get('category_id')
+    category_name = args.get('category')
+    if category_id:
+        criteria.append(Expense.category_id == int(category_id))
+    elif category_name == 'Uncategorized':
+        criteria.append(Expense.category_id.is_(None))
+    elif category_name:
+        criteria.append(Expense.category_id.in_(
+            db.session.query(Category.id).filter(Category.name == category_name)))
+
+    essential = args.get('type')
+    if essential == 'essential':
+        criteria.append(Expense.is_essential.is_(True))
+    elif essential == 'optional':
+        criteria.append(db.or_(Expense.is_essential.is_(False), Expense.is_essential.is_(None)))
+
+    transaction_type = args.get('transaction_type')
+    if transaction_type:
+        criteria.append(Expense.transaction_type == transaction_type)
+
+    if args.get('amount_min'):
+        criteria.append(Expense.amount >= float(args['amount_min']))
+    if args.get('amount_max'):
+        criteria.append(Expense.amount <= float(args['amount_max']))
+
+    return criteria
+
+def filter_expenses(query, args):
+    """Apply the transaction list filters in `args` to `query`"""
+    return query.filter(*expense_filter_criteria(args))
+
+def list_expenses_page(args):
+    """One keyset page of filtered expenses plus total count and per-month subtotals.
+
+    The cursor is the (sort value, id) of the last row on the previous page, so each
+    page is an index range scan instead of an OFFSET that re-reads skipped rows.
+    """
+    sort = args.get('sort', 'date')
+    if sort not in EXPENSE_SORT_COLUMNS:
+        raise ValueError(f'Unknown sort column: {sort}')
+    direction = args.get('direction', 'desc' if sort == 'date' else 'asc')
+    if direction not in ('asc', 'desc'):
+        raise ValueError(f'Unknown sort direction: {direction}')
+    limit = min(max(int(args.get('limit', EXPENSE_PAGE_DEFAULT)), 1), EXPENSE_PAGE_MAX)
+
+    version = current_sync_version()
+    filtered = filter_expenses(Expense.query, args)
+    sort_expr, parse_value = EXPENSE_SORT_COLUMNS[sort]
+
+    page_query = filtered
+    if sort == 'category':
+        page_query = page_query.outerjoin(Category, Expense.category_id == Category.id)
+
+    cursor = args.get('cursor')
+    if cursor:
+        last_value, last_id = decode_cursor(cursor)
+        boundary = db.tuple_(sort_expr, Expense.id)
+        # Typed literal so an amount cursor binds as cents like the column it is compared to
+        last = db.tuple_(db.literal(parse_value(last_value), sort_expr.type), db.literal(last_id))
+        page_query = page_query.filter(boundary < last if direction == 'desc' else boundary > last)
+
+    order = [sort_expr.desc(), Expense.id.desc()] if direction == 'desc' else [sort_expr.asc(), Expense.id.asc()]
+    rows = page_query.with_entities(*EXPENSE_COLUMNS, sort_expr.label('sort_value')) \
+        .order_by(*order).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor(rows[-1].sort_value, rows[-1].id)
+
+    total_count = filtered.with_entities(db.func.count(Expense.id)).scalar()
+
+    month = db.func.strftime('%Y-%m', Expense.date)
+    subtotal_rows = filtered.with_entities(
+        month, Expense.transaction_type, db.func.count(Expense.id), db.func.sum(Expense.amount)
+    ).group_by(month, Expense.transaction_type).all()
+
+    monthly_subtotals = {}
+    for month_key, transaction_type, count, amount in subtotal_rows:
+        entry = monthly_subtotals.setdefault(month_key, {'income': 0, 'expenses': 0, 'count': 0})
+        entry['count'] += count
+        if transaction_type == 'income':
+            entry['income'] += amount or 0
+        elif transaction_type == 'expense':
+            entry['expenses'] += amount or 0
+
+    return {
+        'version': version,
+        'items': expense_records(rows),
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+        'total_count': total_count,
+        'monthly_subtotals': monthly_subtotals,
+        'sort': sort,
+        'direction': direction
+    }
+
+# ==========================================
+# Set-based Batch Mutations
+# ==========================================
+
+def parse_optional_int(value):
+    return int(value) if value not in (None, '') else None
+
+def parse_transaction_type(value):
+    if value not in ('income', 'expense'):
+        raise ValueError('transaction_type must be income or expense')
+    return value
+
+def parse_json_bool(value):
+    if not isinstance(value, bool):
+        raise ValueError(f'Expected true or false, got {json.dumps(value)}')
+    return value
+
+# Fields /api/expenses/batch may set, with the parser applied to each incoming value
+BATCH_UPDATE_FIELDS = {
+    'category_id': parse_optional_int,
+    'is_essential': parse_json_bool,
+    'is_recurring': parse_json_bool,
+    'recurring_frequency': lambda v: v or None,
+    'transaction_type': parse_transaction_type,
+    'notes': lambda v: v or '',
+    'source_account': lambda v: v or None,
+}
+
+def update_expenses(ids, changes):
+    """Apply `changes` to the given expense ids with one UPDATE; returns rows matched.
+
+    Bulk UPDATEs bypass the flush hooks, so the delta-sync version is stamped and the
+    duplicate index updated here. Caller commits.
+    """
+    values = dict(changes, row_version=sync_version())
+    updated = Expense.query.filter(Expense.id.in_(json_values(ids))).update(values, synchronize_session=False)
+    if set(changes) & set(DUPLICATE_KEY_FIELDS):
+        reindex_duplicate_candidates(db.session.connection(), ids)
+    return updated
+
+def delete_expenses(ids):
+    """Delete the given expense ids, leaving sync tombstones, dropping their duplicate
+    pairs and unlinking their transfer partners.
+
+    Caller commits.
+    """
+    version = sync_version()
+    release_transfer_partners(db.session.connection(), ids, version)
+    forget_duplicate_pairs(db.session.connection(), ids)
+    db.session.execute(ExpenseTombstone.__table__.insert().from_select(
+        ['expense_id', 'version', 'deleted_at'],
+        db.select(Expense.id, db.literal(version), db.literal(datetime.utcnow()))
+        .where(Expense.id.in_(json_values(ids)))
+    ))
+    db.session.execute(expense_tags.delete().where(expense_tags.c.expense_id.in_(json_values(ids))))
+    return Expense.query.filter(Expense.id.in_(json_values(ids))).delete(synchronize_session=False)
+
+def insert_expenses(rows, tag_ids):
+    """Insert expense rows (column dicts) with one executemany and link tag_ids[i] to
+    rows[i]; returns the new ids in row order.
+
+    Core INSERTs bypass the flush hooks, so the delta-sync version is stamped and the
+    duplicate index updated here. SQLite assigns consecutive rowids to the batch while
+    this transaction holds the write lock. Caller commits.
+    """
+    if not rows:
+        return []
+    version = sync_version()
+    db.session.execute(Expense.__table__.insert(), [dict(row, row_version=version) for row in rows])
+    last_id = db.session.query(db.func.max(Expense.id)).scalar()
+    ids = list(range(last_id - len(rows) + 1, last_id + 1))
+    links = [{'expense_id': expense_id, 'tag_id': tag_id} for expense_id, tags in zip(ids, tag_ids) for tag_id in tags]
+    if links:
+        db.session.execute(expense_tags.insert(), links)
+    connection = db.session.connection()
+    index_duplicate_candidates(connection, connection.execute(
+        db.select(*duplicate_columns(Expense)).where(Expense.id >= ids[0])
+    ).all())
+    return ids
+
+@bp.route('/api/expenses/batch', methods=['POST'])
+@login_required
+@serialized_write(solo=True)
+def batch_expenses():
+    """Update or delete many expenses in one transaction.
+
+    Body: {"ids": [...]} or {"filter": {<listing filters>}}, plus either
+    {"set": {field: value}} or {"delete": true}.
+    """
+    data = request.get_json() or {}
+    ids = data.get('ids')
+    filters = data.get('filter')
+    changes = data.get('set') or {}
+    delete = bool(data.get('delete'))
+
+    if (ids is None) == (filters is None):
+        return jsonify({'error': 'Provide exactly one of ids or filter'}), 400
+    if delete == bool(changes):
+        return jsonify({'error': 'Provide either set or delete'}), 400
+
+    try:
+        unknown = set(changes) - set(BATCH_UPDATE_FIELDS)
+        if unknown:
+            return jsonify({'error': f'Fields cannot be batch-updated: {", ".join(sorted(unknown))}'}), 400
+        values = {field: BATCH_UPDATE_FIELDS[field](value) for field, value in changes.items()}
+        if values.get('category_id') is not None and not db.session.get(Category, values['category_id']):
+            return jsonify({'error': 'Category not found'}), 404
+
+        if ids is not None:
+            ids = sorted({int(expense_id) for expense_id in ids})
+        else:
+            if not isinstance(filters, dict):
+                return jsonify({'error': 'filter must be an object'}), 400
+            # An unknown or empty filter would match every row, so it is refused
+            unknown = set(filters) - set(EXPENSE_FILTER_KEYS)
+            if unknown:
+                return jsonify({'error': f'Unknown filter keys: {", ".join(sorted(unknown))} '
+                                         f'(allowed: {", ".join(EXPENSE_FILTER_KEYS)})'}), 400
+            if filters.get('type') not in (None, '', 'essential', 'optional'):
+                return jsonify({'error': 'filter type must be essential or optional'}), 400
+            criteria = expense_filter_criteria(filters)
+            if not criteria:
+                return jsonify({'error': 'filter must apply at least one condition'}), 400
+            ids = [row.id for row in Expense.query.filter(*criteria).with_entities(Expense.id)]
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not ids:
+        return jsonify({'matched': 0, 'updated': 0, 'deleted': 0, 'version': current_sync_version()})
+
+    try:
+        started = time.perf_counter()
+        if delete:
+            deleted, updated = delete_expenses(ids), 0
+        else:
+            updated, deleted = update_expenses(ids, values), 0
+        version = db.session.info.get('sync_version')
+        db.session.commit()
+        return jsonify({
+            'matched': len(ids),
+            'updated': updated,
+            'deleted': deleted,
+            'version': version,
+            'took_ms': round((time.perf_counter() - started) * 1000, 1)
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Batch operation failed: {str(e)}'}), 500
+
+@bp.route('/api/expenses/bulk-update-category', methods=['POST'])
+@serialized_write()
 def bulk_update_category():
     """Update category and is_essential for all expenses with matching description or BPAY biller code.
     Also saves a learned rule so future imports get the same categorization."""
@@ -578,7 +2437,7 @@ def bulk_update_category():
         db.session.rollback()
         return jsonify({'error': f'Failed to update expenses: {str(e)}'}), 500
 
-@app.route('/api/expenses/fuzzy-match-preview', methods=['POST'])
+@bp.route('/api/expenses/fuzzy-match-preview', methods=['POST'])
 def fuzzy_match_preview():
     """Preview how many transactions would match with fuzzy keyword matching."""
     try:
@@ -609,10 +2468,11 @@ def fuzzy_match_preview():
     except Exception as e:
         return jsonify({'error': str(e), 'keywords': '', 'match_count': 0, 'sample_descriptions': []}), 500
 
-@app.route('/api/learned-rules', methods=['GET'])
+@bp.route('/api/learned-rules', methods=['GET'])
 def get_learned_rules():
     """Get all learned categorization rules"""
-    rules = LearnedRule.query.order_by(LearnedRule.priority.desc(), LearnedRule.created_at.desc()).all()
+    rules = LearnedRule.query.options(db.joinedload(LearnedRule.category)) \
+        .order_by(LearnedRule.priority.desc(), LearnedRule.created_at.desc()).all()
     return jsonify([{
         'id': r.id,
         'description_pattern': r.description_pattern,
@@ -626,7 +2486,8 @@ def get_learned_rules():
         'created_at': r.created_at.isoformat() if r.created_at else None
     } for r in rules])
 
-@app.route('/api/learned-rules/<int:rule_id>', methods=['DELETE'])
+@bp.route('/api/learned-rules/<int:rule_id>', methods=['DELETE'])
+@serialized_write()
 def delete_learned_rule(rule_id):
     """Delete a learned rule"""
     rule = LearnedRule.query.get_or_404(rule_id)
@@ -634,7 +2495,8 @@ def delete_learned_rule(rule_id):
     db.session.commit()
     return jsonify({'message': 'Rule deleted successfully'})
 
-@app.route('/api/learned-rules', methods=['POST'])
+@bp.route('/api/learned-rules', methods=['POST'])
+@serialized_write()
 def create_learned_rule():
     """Create a new learned rule manually"""
     try:
@@ -655,11 +2517,18 @@ def create_learned_rule():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/expenses/delete-all', methods=['POST'])
+@bp.route('/api/expenses/delete-all', methods=['POST'])
+@serialized_write(solo=True)
 def delete_all_expenses():
     """Delete all expenses from the database"""
     try:
         num_deleted = Expense.query.delete()
+
+        # A bulk delete bypasses the flush hooks; truncate sync history so cached clients reload
+        version = sync_version()
+        ExpenseTombstone.query.delete()
+        DuplicatePair.query.delete()
+        SyncState.query.filter_by(id=1).update({'reset_version': version})
         db.session.commit()
 
         # Clean up any orphaned tag associations (safety measure)
@@ -677,7 +2546,8 @@ def delete_all_expenses():
         db.session.rollback()
         return jsonify({'error': f'Failed to delete expenses: {str(e)}'}), 500
 
-@app.route('/api/expenses/<int:expense_id>', methods=['DELETE', 'PUT'])
+@bp.route('/api/expenses/<int:expense_id>', methods=['DELETE', 'PUT'])
+@serialized_write()
 def expense_detail(expense_id):
     expense = Expense.query.get_or_404(expense_id)
 
@@ -694,7 +2564,7 @@ def expense_detail(expense_id):
         if 'description' in data:
             expense.description = data['description']
         if 'amount' in data:
-            expense.amount = float(data['amount'])
+            expense.amount = parse_amount(data['amount'])
         if 'date' in data:
             expense.date = datetime.strptime(data['date'], '%Y-%m-%d').date()
         if 'category_id' in data:
@@ -762,7 +2632,8 @@ def expense_detail(expense_id):
         db.session.commit()
         return jsonify({'message': 'Expense updated successfully', 'rule_saved': save_rule})
 
-@app.route('/api/categories', methods=['GET', 'POST'])
+@bp.route('/api/categories', methods=['GET', 'POST'])
+@serialized_write()
 def categories():
     if request.method == 'POST':
         data = request.json
@@ -778,19 +2649,17 @@ def categories():
         'color': c.color
     } for c in categories])
 
-@app.route('/api/categories/<int:category_id>', methods=['DELETE'])
+@bp.route('/api/categories/<int:category_id>', methods=['DELETE'])
+@serialized_write()
 def delete_category(category_id):
     """Delete a category and set all associated expenses to Uncategorized"""
     try:
         category = Category.query.get_or_404(category_id)
         category_name = category.name
 
-        # Find all expenses with this category
-        expenses = Expense.query.filter_by(category_id=category_id).all()
-
-        # Set them to None (Uncategorized)
-        for expense in expenses:
-            expense.category_id = None
+        # Set its expenses to None (Uncategorized) in one statement
+        updated_count = Expense.query.filter_by(category_id=category_id).update(
+            {'category_id': None, 'row_version': sync_version()}, synchronize_session=False)
 
         # Delete the category
         db.session.delete(category)
@@ -798,24 +2667,25 @@ def delete_category(category_id):
 
         return jsonify({
             'message': f'Category "{category_name}" deleted successfully',
-            'updated_count': len(expenses)
+            'updated_count': updated_count
         })
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Failed to delete category: {str(e)}'}), 500
 
-@app.route('/api/tags', methods=['GET'])
+@bp.route('/api/tags', methods=['GET'])
 def tags():
     tags = Tag.query.all()
     return jsonify([{'id': t.id, 'name': t.name} for t in tags])
 
-@app.route('/api/cash-position', methods=['GET', 'POST'])
+@bp.route('/api/cash-position', methods=['GET', 'POST'])
+@serialized_write()
 def cash_position_list():
     if request.method == 'POST':
         data = request.json
         cash_position = CashPosition(
             date=datetime.strptime(data['date'], '%Y-%m-%d').date(),
-            amount=float(data['amount']),
+            amount=parse_amount(data['amount']),
             notes=data.get('notes', '')
         )
         db.session.add(cash_position)
@@ -834,7 +2704,8 @@ def cash_position_list():
         'notes': p.notes
     } for p in positions])
 
-@app.route('/api/cash-position/<int:position_id>', methods=['PUT', 'DELETE'])
+@bp.route('/api/cash-position/<int:position_id>', methods=['PUT', 'DELETE'])
+@serialized_write()
 def cash_position_detail(position_id):
     position = CashPosition.query.get_or_404(position_id)
 
@@ -846,12 +2717,12 @@ def cash_position_detail(position_id):
     if request.method == 'PUT':
         data = request.json
         position.date = datetime.strptime(data['date'], '%Y-%m-%d').date()
-        position.amount = float(data['amount'])
+        position.amount = parse_amount(data['amount'])
         position.notes = data.get('notes', '')
         db.session.commit()
         return jsonify({'message': 'Cash position updated successfully'})
 
-@app.route('/api/cash-position/runway', methods=['GET'])
+@bp.route('/api/cash-position/runway', methods=['GET'])
 def cash_runway():
     """Calculate cash runway based on latest cash position and average monthly burn rate"""
     # Get the latest cash position
@@ -868,18 +2739,9 @@ def cash_runway():
 
     # Calculate average monthly burn rate from last 3 months
     three_months_ago = datetime.now().date() - timedelta(days=90)
-    recent_expenses = Expense.query.filter(
-        Expense.date >= three_months_ago,
-        Expense.transaction_type == 'expense'
-    ).all()
-    recent_income = Expense.query.filter(
-        Expense.date >= three_months_ago,
-        Expense.transaction_type == 'income'
-    ).all()
-
-    total_expenses = sum(e.amount for e in recent_expenses)
-    total_income = sum(e.amount for e in recent_income)
-    monthly_burn = (total_expenses - total_income) / 3  # Average over 3 months
+    recent = {t.transaction_type: t.cents
+              for t in transaction_totals(Expense.transaction_type, start_date=three_months_ago)}
+    monthly_burn = cents_to_dollars(recent.get('expense', 0) - recent.get('income', 0)) / 3  # Average over 3 months
 
     # Calculate runway
     if monthly_burn > 0:
@@ -898,22 +2760,39 @@ def cash_runway():
         'message': 'success'
     })
 
-@app.route('/api/statistics', methods=['GET'])
+@bp.route('/api/statistics', methods=['GET'])
 def statistics():
     period = request.args.get('period', 'month')
     selected_year = request.args.get('year', None)
 
-    # Use selected year or current year
+    # Identical concurrent requests (several tabs, rapid period clicks) share one computation
+    key = single_flight_key('statistics', period, selected_year)
+    return jsonify(single_flight().do(key, lambda: compute_statistics(period, selected_year)))
+
+def statistics_base_year(selected_year):
+    """Year the dashboard is looking at: the ?year= parameter, else the current year."""
     if selected_year:
         try:
-            base_year = int(selected_year)
+            return int(selected_year)
         except:
-            base_year = datetime.now().year
-    else:
-        base_year = datetime.now().year
+            return datetime.now().year
+    return datetime.now().year
 
+def statistics_date_range(period, base_year):
+    """Map a dashboard or report period to a [start_date, end_date) pair; None means open-ended."""
+    # Custom date range from the PDF export (format: "range-YYYY-MM-DD_YYYY-MM-DD", inclusive)
+    if period.startswith('range-'):
+        range_str = period.replace('range-', '')
+        try:
+            start_str, end_str = range_str.split('_')
+            start_date = datetime.strptime(start_str, '%Y-%m-%d').date()
+            end_date = datetime.strptime(end_str, '%Y-%m-%d').date() + timedelta(days=1)
+        except:
+            # Invalid format, default to the start of base_year
+            start_date = datetime(base_year, 1, 1).date()
+            end_date = None
     # Handle custom month selection (format: "custom-YYYY-MM")
-    if period.startswith('custom-'):
+    elif period.startswith('custom-'):
         month_str = period.replace('custom-', '')  # "2025-01"
         try:
             year, month = map(int, month_str.split('-'))
@@ -946,27 +2825,29 @@ def statistics():
     else:
         start_date = None
         end_date = None
+    return start_date, end_date
 
-    query = Expense.query
-    if start_date:
-        query = query.filter(Expense.date >= start_date)
-    if end_date:
-        query = query.filter(Expense.date < end_date)
+def compute_statistics(period, selected_year=None):
+    """Aggregate totals, category breakdown and monthly trend for a period."""
+    base_year = statistics_base_year(selected_year)
+    start_date, end_date = statistics_date_range(period, base_year)
 
-    transactions = query.all()
+    # Every total is an integer-cent SUM grouped in SQL; cents_to_dollars() runs once per figure
+    period_totals = transaction_totals(Expense.transaction_type, Expense.category_id,
+                                       start_date=start_date, end_date=end_date)
 
     # Separate income and expenses
-    income_total = sum(t.amount for t in transactions if t.transaction_type == 'income')
-    expense_total = sum(t.amount for t in transactions if t.transaction_type == 'expense')
-    net_position = income_total - expense_total
+    income_cents = sum(t.cents for t in period_totals if t.transaction_type == 'income')
+    expense_cents = sum(t.cents for t in period_totals if t.transaction_type == 'expense')
 
     # Always calculate year and month totals for dashboard cards (using selected year)
     year_start = datetime(base_year, 1, 1).date()
     year_end = datetime(base_year + 1, 1, 1).date()
-    year_transactions = Expense.query.filter(Expense.date >= year_start, Expense.date < year_end).all()
-    year_income = sum(t.amount for t in year_transactions if t.transaction_type == 'income')
-    year_expenses = sum(t.amount for t in year_transactions if t.transaction_type == 'expense')
-    year_net = year_income - year_expenses
+    month_num = db.cast(db.func.strftime('%m', Expense.date), db.Integer).label('month_num')
+    year_totals = transaction_totals(Expense.transaction_type, Expense.is_essential, month_num,
+                                     start_date=year_start, end_date=year_end)
+    year_income_cents = sum(t.cents for t in year_totals if t.transaction_type == 'income')
+    year_expense_cents = sum(t.cents for t in year_totals if t.transaction_type == 'expense')
 
     # For month, use current month if viewing current year, otherwise use December of selected year
     if base_year == datetime.now().year:
@@ -977,52 +2858,52 @@ def statistics():
         month_start = datetime(base_year, 12, 1).date()
         month_end = datetime(base_year + 1, 1, 1).date()
 
-    month_query = Expense.query.filter(Expense.date >= month_start)
-    if month_end:
-        month_query = month_query.filter(Expense.date < month_end)
-    month_transactions = month_query.all()
-    month_income = sum(t.amount for t in month_transactions if t.transaction_type == 'income')
-    month_expenses = sum(t.amount for t in month_transactions if t.transaction_type == 'expense')
-    month_net = month_income - month_expenses
+    month_totals = transaction_totals(Expense.transaction_type, start_date=month_start, end_date=month_end)
+    month_income_cents = sum(t.cents for t in month_totals if t.transaction_type == 'income')
+    month_expense_cents = sum(t.cents for t in month_totals if t.transaction_type == 'expense')
 
     # Essential vs Optional breakdown (expenses only) - ALWAYS USE YEAR DATA TO MATCH DASHBOARD
-    year_expenses_only = [t for t in year_transactions if t.transaction_type == 'expense']
-    essential_total = sum(e.amount for e in year_expenses_only if e.is_essential)
-    optional_total = sum(e.amount for e in year_expenses_only if not e.is_essential)
+    essential_cents = sum(t.cents for t in year_totals if t.transaction_type == 'expense' and t.is_essential)
+    optional_cents = sum(t.cents for t in year_totals if t.transaction_type == 'expense' and not t.is_essential)
 
     # By category
+    categories = category_lookup()
     category_stats = {}
-    for transaction in transactions:
-        cat_name = transaction.category.name if transaction.category else 'Uncategorized'
+    category_cents = {}
+    for t in period_totals:
+        cat_name, cat_color = categories.get(t.category_id, categories[None])
         if cat_name not in category_stats:
             category_stats[cat_name] = {
+                'category_id': t.category_id if t.category_id in categories else None,
                 'amount': 0,
                 'count': 0,
-                'color': transaction.category.color if transaction.category else '#95a5a6',
-                'type': transaction.transaction_type
+                'color': cat_color,
+                'type': t.transaction_type
             }
-        category_stats[cat_name]['amount'] += transaction.amount
-        category_stats[cat_name]['count'] += 1
+        category_cents[cat_name] = category_cents.get(cat_name, 0) + t.cents
+        category_stats[cat_name]['count'] += t.count
+    for cat_name, cents in category_cents.items():
+        category_stats[cat_name]['amount'] = cents_to_dollars(cents)
+
+    # Monthly trend (12 months of selected year), from the year totals already grouped by month
+    trend_cents = {month: {'income': 0, 'expenses': 0, 'essential': 0, 'optional': 0} for month in range(1, 13)}
+    for t in year_totals:
+        bucket = trend_cents[t.month_num]
+        if t.transaction_type == 'income':
+            bucket['income'] += t.cents
+        elif t.transaction_type == 'expense':
+            bucket['expenses'] += t.cents
+            bucket['essential' if t.is_essential else 'optional'] += t.cents
 
-    # Monthly trend (12 months of selected year)
     monthly_trend = []
-    for month_num in range(1, 13):
-        m_start = datetime(base_year, month_num, 1).date()
-        m_end = datetime(base_year, month_num + 1, 1).date() if month_num < 12 else datetime(base_year + 1, 1, 1).date()
-        m_transactions = Expense.query.filter(
-            Expense.date >= m_start,
-            Expense.date < m_end
-        ).all()
-        m_income = sum(t.amount for t in m_transactions if t.transaction_type == 'income')
-        m_exp = sum(t.amount for t in m_transactions if t.transaction_type == 'expense')
-        m_expenses_only = [t for t in m_transactions if t.transaction_type == 'expense']
+    for month, bucket in trend_cents.items():
         monthly_trend.append({
-            'month': m_start.strftime('%b %Y'),
-            'income': m_income,
-            'expenses': m_exp,
-            'net': m_income - m_exp,
-            'essential': sum(e.amount for e in m_expenses_only if e.is_essential),
-            'optional': sum(e.amount for e in m_expenses_only if not e.is_essential)
+            'month': datetime(base_year, month, 1).strftime('%b %Y'),
+            'income': cents_to_dollars(bucket['income']),
+            'expenses': cents_to_dollars(bucket['expenses']),
+            'net': cents_to_dollars(bucket['income'] - bucket['expenses']),
+            'essential': cents_to_dollars(bucket['essential']),
+            'optional': cents_to_dollars(bucket['optional'])
         })
 
     # Calculate month-over-month net change
@@ -1033,25 +2914,129 @@ def statistics():
         if abs(previous_month_net) > 0:
             mom_change = ((current_month_net - previous_month_net) / abs(previous_month_net)) * 100
 
-    return jsonify({
-        'income_total': income_total,
-        'expense_total': expense_total,
-        'net_position': net_position,
-        'year_income': year_income,
-        'year_expenses': year_expenses,
-        'year_net': year_net,
-        'month_income': month_income,
-        'month_expenses': month_expenses,
-        'month_net': month_net,
-        'count': len(transactions),
-        'essential_total': essential_total,
-        'optional_total': optional_total,
+    return {
+        'income_total': cents_to_dollars(income_cents),
+        'expense_total': cents_to_dollars(expense_cents),
+        'net_position': cents_to_dollars(income_cents - expense_cents),
+        'year_income': cents_to_dollars(year_income_cents),
+        'year_expenses': cents_to_dollars(year_expense_cents),
+        'year_net': cents_to_dollars(year_income_cents - year_expense_cents),
+        'month_income': cents_to_dollars(month_income_cents),
+        'month_expenses': cents_to_dollars(month_expense_cents),
+        'month_net': cents_to_dollars(month_income_cents - month_expense_cents),
+        'count': sum(t.count for t in period_totals),
+        'essential_total': cents_to_dollars(essential_cents),
+        'optional_total': cents_to_dollars(optional_cents),
         'by_category': category_stats,
         'monthly_trend': monthly_trend,
         'mom_change': mom_change
-    })
+    }
+
+CATEGORY_DRILLDOWN_DEFAULT = 20
+CATEGORY_DRILLDOWN_MAX = 200
+CATEGORY_MERCHANT_LIMIT = 10
+
+@bp.route('/api/statistics/category/<int:category_id>/transactions', methods=['GET'])
+@login_required
+def category_transactions(category_id):
+    """Top transactions and per-merchant subtotals for one category over a dashboard period.
+
+    category_id 0 means Uncategorized. Paged with the same (value, id) cursors as the
+    expense listing; `sort` is `amount` (largest first, default) or `date` (newest first).
+    """
+    try:
+        period = request.args.get('period', 'month')
+        base_year = statistics_base_year(request.args.get('year'))
+        start_date, end_date = statistics_date_range(period, base_year)
+        transaction_type = request.args.get('transaction_type', 'expense')
+        sort = request.args.get('sort', 'amount')
+        if sort not in ('amount', 'date'):
+            return jsonify({'error': f'Unknown sort: {sort}'}), 400
+        try:
+            limit = min(max(int(request.args.get('limit', CATEGORY_DRILLDOWN_DEFAULT)), 1), CATEGORY_DRILLDOWN_MAX)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+
+        if category_id and not db.session.get(Category, category_id):
+            return jsonify({'error': 'Category not found'}), 404
+
+        # Served by ix_expense_category_date: equality on category_id, range on date
+        query = Expense.query.filter(
+            Expense.category_id == category_id if category_id else Expense.category_id.is_(None),
+            counted_in_totals()
+        )
+        if start_date:
+            query = query.filter(Expense.date >= start_date)
+        if end_date:
+            query = query.filter(Expense.date < end_date)
+        if transaction_type:
+            query = query.filter(Expense.transaction_type == transaction_type)
+
+        sort_expr = Expense.amount if sort == 'amount' else Expense.date
+        page_query = query
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                value, last_id = decode_cursor(cursor)
+                if sort == 'date':
+                    value = datetime.strptime(value, '%Y-%m-%d').date()
+                else:
+                    value = float(value)
+            except (ValueError, TypeError):
+                return jsonify({'error': 'Invalid cursor'}), 400
+            last = db.tuple_(db.literal(value, sort_expr.type), db.literal(last_id))
+            page_query = page_query.filter(db.tuple_(sort_expr, Expense.id) < last)
+
+        rows = page_query.with_entities(*EXPENSE_COLUMNS) \
+            .order_by(sort_expr.desc(), Expense.id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = encode_cursor(last.amount if sort == 'amount' else last.date, last.id)
+
+        # Group identical descriptions in SQL, then merge variants (store numbers, refs)
+        # under normalize_description so each merchant is one subtotal
+        merchants = {}
+        total_cents = 0
+        total_count = 0
+        for description, cents, count in query.with_entities(
+                Expense.description, sum_cents(), db.func.count(Expense.id)
+        ).group_by(Expense.description).all():
+            total_cents += cents
+            total_count += count
+            key = normalize_description(description) or description.lower()
+            merchant = merchants.setdefault(key, {'merchant': description, 'amount': 0, 'count': 0, '_top': 0})
+            merchant['amount'] += cents
+            merchant['count'] += count
+            if count > merchant['_top']:
+                merchant['merchant'], merchant['_top'] = description, count
+
+        top_merchants = sorted(merchants.values(), key=lambda m: m['amount'], reverse=True)[:CATEGORY_MERCHANT_LIMIT]
+        for merchant in top_merchants:
+            merchant.pop('_top')
+            merchant['amount'] = cents_to_dollars(merchant['amount'])
+
+        return jsonify({
+            'category_id': category_id or None,
+            'period': period,
+            'start_date': start_date.isoformat() if start_date else None,
+            'end_date': end_date.isoformat() if end_date else None,
+            'total_amount': cents_to_dollars(total_cents),
+            'total_count': total_count,
+            'merchants': top_merchants,
+            'merchant_count': len(merchants),
+            'items': expense_records(rows),
+            'next_cursor': next_cursor,
+            'has_more': has_more,
+            'sort': sort
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-@app.route('/api/import-csv', methods=['POST'])
+@bp.route('/api/import-csv', methods=['POST'])
+@serialized_write(solo=True)
 def import_csv():
     if 'file' not in request.files:
         return jsonify({'error': 'No file provided'}), 400
@@ -1067,7 +3052,10 @@ def import_csv():
         stream = io.StringIO(file.stream.read().decode("UTF8"), newline=None)
         csv_reader = csv.DictReader(stream)
 
-        imported_count = 0
+        learned_rules = load_learned_rules()
+        categories = {c.name: c for c in Category.query}
+        category_ids = {c.id for c in categories.values()}
+        parsed = []
         errors = []
 
         # Log available columns for debugging
@@ -1243,14 +3231,14 @@ def import_csv():
                         # Default to expense if unclear
                         is_income_from_amount = is_credit and not is_debit
 
-                    amount = abs(amount_float)
+                    amount = abs(parse_amount(amount_clean))
                 else:
                     # CREDIT CARD FORMAT: amount column
                     # Expenses: positive numbers $100.00
                     # Payments to card: negative numbers -$100.00 (NOT income, skip these)
                     amount_clean = amount_str.replace('$', '').replace(',', '').strip()
                     amount_float = float(amount_clean)
-                    amount = abs(amount_float)
+                    amount = abs(parse_amount(amount_clean))
 
                     # For credit cards: positive = expense, negative = payment (skip)
                     # We'll filter out payments by treating them as neither income nor expense
@@ -1298,13 +3286,14 @@ def import_csv():
                     bpay_code = bpay_match.group(1)
 
                 # STEP 1: Check learned rules first (user corrections take priority)
-                learned_result = apply_learned_rules(description, bpay_code)
+                learned_result = apply_learned_rules(description, bpay_code, learned_rules)
+                if learned_result and learned_result[0] not in category_ids:
+                    learned_result = None  # the rule's category was deleted; categorize as usual
 
                 if learned_result:
                     # Use learned categorization
                     category_id, is_essential, transaction_type = learned_result
-                    category = Category.query.get(category_id)
-                    category_name = category.name if category else 'Other'
+                    category_name = None
                     suggested_tags = ['essential' if is_essential else 'optional']
                     if transaction_type == 'income':
                         suggested_tags.append('income')
@@ -1323,63 +3312,86 @@ def import_csv():
                         category_name = 'Income'
                         is_essential = False
                         suggested_tags = ['income']
-
-                    # Find or create category
-                    category = Category.query.filter_by(name=category_name).first()
-                    if not category:
-                        category = Category(name=category_name)
-                        db.session.add(category)
-                        db.session.flush()
-
-                # Check for duplicate (same description, amount, and date)
-                existing = Expense.query.filter_by(
-                    description=description,
-                    amount=amount,
-                    date=date_obj
-                ).first()
-
-                if existing:
-                    # Skip duplicate
-                    continue
-
-                # Create expense with auto-categorization
-                expense = Expense(
-                    description=description,
-                    amount=amount,
-                    date=date_obj,
-                    category_id=category.id,
-                    is_essential=is_essential,
-                    transaction_type=transaction_type,
-                    source_account=source_account,
-                    bpay_biller_code=bpay_code
-                )
-
-                # Add auto-generated tags (avoid duplicates) using no_autoflush
-                with db.session.no_autoflush:
-                    for tag_name in suggested_tags:
-                        tag = Tag.query.filter_by(name=tag_name).first()
-                        if not tag:
-                            tag = Tag(name=tag_name)
-                            db.session.add(tag)
-                            db.session.flush()  # Flush to get the tag ID
-
-                        # Only append if tag is not already in the expense tags
-                        if tag not in expense.tags:
-                            expense.tags.append(tag)
-
-                db.session.add(expense)
-                imported_count += 1
+                    category_id = None
+
+                parsed.append({
+                    'row_num': row_num,
+                    'description': description,
+                    'amount': amount,
+                    'date': date_obj,
+                    'category_id': category_id,
+                    'category_name': category_name,
+                    'is_essential': is_essential,
+                    'transaction_type': transaction_type,
+                    'bpay_biller_code': bpay_code,
+                    'tags': suggested_tags,
+                })
 
             except Exception as e:
-                db.session.rollback()  # Rollback on error to prevent session issues
                 errors.append(f"Row {row_num}: {str(e)}")
                 continue
 
+        # Resolve categories, tags and duplicates for the whole file with one query each,
+        # then insert them with one executemany, rather than querying (and flushing) per row
+        imported_count = 0
+        imported_dates = []
+        if parsed:
+            for name in dict.fromkeys(row['category_name'] for row in parsed):
+                if name is not None and name not in categories:
+                    categories[name] = Category(name=name)
+                    db.session.add(categories[name])
+            tag_names = dict.fromkeys(name for row in parsed for name in row['tags'])
+            tags = {t.name: t for t in Tag.query.filter(Tag.name.in_(json_values(tag_names)))}
+            for name in tag_names:
+                if name not in tags:
+                    tags[name] = Tag(name=name)
+                    db.session.add(tags[name])
+
+            # Skip duplicates (same description, amount, and date), including repeats within this file
+            dates = [row['date'] for row in parsed]
+            seen = {(description, to_cents(amount), day) for description, amount, day in db.session.query(
+                Expense.description, Expense.amount, Expense.date
+            ).filter(Expense.date.between(min(dates), max(dates)),
+                     Expense.description.in_(json_values({row['description'] for row in parsed})))}
+
+            new_rows, new_tags = [], []
+            for row in parsed:
+                key = (row['description'], to_cents(row['amount']), row['date'])
+                if key in seen:
+                    continue
+                seen.add(key)
+
+                # Expense with auto-categorization and its auto-generated tags
+                new_rows.append({
+                    'description': row['description'],
+                    'amount': row['amount'],
+                    'date': row['date'],
+                    'category_id': row['category_id'] if row['category_name'] is None else categories[row['category_name']].id,
+                    'is_essential': row['is_essential'],
+                    'transaction_type': row['transaction_type'],
+                    'source_account': source_account,
+                    'bpay_biller_code': row['bpay_biller_code'],
+                })
+                new_tags.append(dict.fromkeys(row['tags']))
+                imported_dates.append(row['date'])
+
+            db.session.flush()  # categories and tags created above get their ids
+            insert_expenses(new_rows, [[tags[name].id for name in names] for names in new_tags])
+            imported_count = len(new_rows)
+
         db.session.commit()
 
+        # Link transfers between this file and the accounts already imported
+        transfers_linked = 0
+        if imported_dates:
+            transfers_linked = match_transfers(min(imported_dates), max(imported_dates))
+            db.session.commit()
+        checkpoint_wal()  # fold the import's pages back now rather than on the next timer tick
+
         return jsonify({
             'message': f'Successfully imported {imported_count} expenses with smart categorization',
             'imported': imported_count,
+            'transfers_linked': transfers_linked,
             'errors': errors
         })
 
@@ -1391,40 +3403,6 @@ def import_csv():
 # Helper Functions for Smart Matching
 # ==========================================
 
-def normalize_description(description):
-    """
-    Normalize a transaction description for comparison.
-    Removes variable parts like dates, reference numbers, amounts, etc.
-    """
-    desc = description.lower().strip()
-
-    # Remove dates in various formats
-    desc = re.sub(r'\d{1,2}[-/]\d{1,2}[-/]\d{2,4}', '', desc)
-    desc = re.sub(r'\d{1,2}\s+(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\w*\s*\d{0,4}', '', desc, flags=re.IGNORECASE)
-
-    # Remove reference numbers, receipt numbers, transaction IDs
-    desc = re.sub(r'(ref|rcpt|receipt|txn|transaction|id|no|#)[\s:]*[a-z0-9]+', '', desc, flags=re.IGNORECASE)
-    desc = re.sub(r'\b[a-z]{2,4}\d{6,}\b', '', desc)  # Letter prefix + numbers
-    desc = re.sub(r'\b\d{6,}\b', '', desc)  # Long number sequences (6+ digits)
-
-    # Remove card numbers (last 4 digits pattern)
-    desc = re.sub(r'card\s*\d{4}', '', desc, flags=re.IGNORECASE)
-    desc = re.sub(r'x{2,}\d{4}', '', desc, flags=re.IGNORECASE)
-
-    # Remove currency amounts
-    desc = re.sub(r'\$[\d,]+\.?\d*', '', desc)
-    desc = re.sub(r'aud\s*[\d,]+\.?\d*', '', desc, flags=re.IGNORECASE)
-
-    # Remove common suffixes that vary
-    desc = re.sub(r'\s+(aus|australia|au|vic|nsw|qld|sa|wa|nt|tas|act)\s*$', '', desc, flags=re.IGNORECASE)
-    desc = re.sub(r'\s+\d{4}\s*$', '', desc)  # Trailing 4-digit numbers
-
-    # Remove extra whitespace
-    desc = re.sub(r'\s+', ' ', desc).strip()
-
-    return desc
-
-
 def get_period_label(period):
     """Get human-readable label for a period"""
     today = datetime.now().date()
@@ -1460,50 +3438,86 @@ def get_period_label(period):
 # Duplicate Detection Endpoints
 # ==========================================
 
-@app.route('/api/duplicates', methods=['GET'])
+@bp.route('/api/duplicates', methods=['GET'])
 @login_required
 def find_duplicates():
-    """Find potential duplicate transactions in the database"""
-    expenses = Expense.query.order_by(Expense.date.desc()).all()
-
-    # Group by (date, amount) - most reliable duplicate indicators
-    groups = {}
-    for exp in expenses:
-        key = (exp.date.isoformat(), str(exp.amount))
-        if key not in groups:
-            groups[key] = []
-        groups[key].append(exp)
-
-    # Find groups with 2+ transactions (potential duplicates)
+    """Find potential duplicate transactions from the duplicate candidate index.
+
+    `days` (0-7, default 0) is how far apart the dates may be, e.g. 1 for pending vs
+    posted; `similarity` (0.5-1.0, default 1.0) is the minimum description overlap.
+    """
+    try:
+        days = int(request.args.get('days', 0))
+        similarity = float(request.args.get('similarity', 1.0))
+    except ValueError:
+        return jsonify({'error': 'days and similarity must be numbers'}), 400
+    if not 0 <= days <= DUPLICATE_WINDOW_DAYS or not DUPLICATE_MIN_SIMILARITY <= similarity <= 1:
+        return jsonify({'error': f'days must be 0-{DUPLICATE_WINDOW_DAYS} and similarity '
+                                 f'{DUPLICATE_MIN_SIMILARITY}-1.0'}), 400
+    # Identical concurrent scans (several tabs, repeated clicks) share one computation
+    key = single_flight_key('duplicates', days, similarity)
+    return jsonify(single_flight().do(key, lambda: compute_duplicates(days, similarity)))
+
+
+def compute_duplicates(days=0, similarity=1.0):
+    """Group indexed duplicate pairs within the tolerance into connected groups"""
+    started = time.perf_counter()
+    pairs = db.session.query(DuplicatePair.expense_id, DuplicatePair.other_id).filter(
+        DuplicatePair.day_gap <= days, DuplicatePair.similarity >= similarity - 1e-9
+    ).all()
+
+    # Union-find: A~B and B~C put A, B and C in one group
+    parent = {}
+    def find(expense_id):
+        parent.setdefault(expense_id, expense_id)
+        while parent[expense_id] != expense_id:
+            parent[expense_id] = parent[parent[expense_id]]
+            expense_id = parent[expense_id]
+        return expense_id
+    for expense_id, other_id in pairs:
+        parent[find(expense_id)] = find(other_id)
+
+    members = {}
+    for expense_id in list(parent):
+        members.setdefault(find(expense_id), []).append(expense_id)
+
+    rows = {row.id: row for row in db.session.query(
+        Expense.id, Expense.date, Expense.amount, Expense.description,
+        Expense.source_account, Expense.category_id
+    ).filter(Expense.id.in_(json_values(parent)))}
+    categories = category_lookup()
+
     duplicates = []
-    for key, items in groups.items():
-        if len(items) >= 2:
-            # Further check: descriptions should be similar
-            desc_groups = {}
-            for item in items:
-                norm_desc = normalize_description(item.description)
-                if norm_desc not in desc_groups:
-                    desc_groups[norm_desc] = []
-                desc_groups[norm_desc].append(item)
-
-            for desc, desc_items in desc_groups.items():
-                if len(desc_items) >= 2:
-                    duplicates.append({
-                        'date': key[0],
-                        'amount': key[1],
-                        'description': desc_items[0].description,
-                        'count': len(desc_items),
-                        'items': [{'id': i.id, 'description': i.description,
-                                   'source_account': i.source_account,
-                                   'category': i.category.name if i.category else 'Uncategorized'} for i in desc_items]
-                    })
+    for ids in members.values():
+        items = sorted((rows[i] for i in ids if i in rows), key=lambda r: (r.date, r.id))
+        if len(items) < 2:
+            continue
+        duplicates.append({
+            'date': items[0].date.isoformat(),
+            'amount': str(items[0].amount),
+            'description': items[0].description,
+            'count': len(items),
+            'items': [{'id': i.id, 'date': i.date.isoformat(), 'description': i.description,
+                       'source_account': i.source_account,
+                       'category': categories.get(i.category_id, categories[None])[0]} for i in items]
+        })
 
     duplicates.sort(key=lambda x: x['date'], reverse=True)
-    return jsonify({'duplicates': duplicates, 'total_groups': len(duplicates)})
+    return {'duplicates': duplicates, 'total_groups': len(duplicates), 'days': days,
+            'similarity': similarity, 'took_ms': round((time.perf_counter() - started) * 1000, 1)}
+
+
+@bp.cli.command('rebuild-duplicate-index')
+def rebuild_duplicate_index_command():
+    """Rebuild the duplicate candidate index from every expense."""
+    started = time.perf_counter()
+    count = rebuild_duplicate_index()
+    click.echo(f'Indexed {count} candidate pairs in {time.perf_counter() - started:.2f}s')
 
 
-@app.route('/api/duplicates/remove', methods=['DELETE'])
+@bp.route('/api/duplicates/remove', methods=['DELETE'])
 @login_required
+@serialized_write(solo=True)
 def remove_duplicates():
     """Remove specified duplicate transactions"""
     try:
@@ -1513,13 +3527,7 @@ def remove_duplicates():
         if not ids_to_remove:
             return jsonify({'error': 'No IDs provided'}), 400
 
-        removed_count = 0
-        for expense_id in ids_to_remove:
-            expense = Expense.query.get(expense_id)
-            if expense:
-                db.session.delete(expense)
-                removed_count += 1
-
+        removed_count = delete_expenses(ids_to_remove)
         db.session.commit()
         return jsonify({'message': f'Successfully removed {removed_count} duplicate(s)', 'removed_count': removed_count})
     except Exception as e:
@@ -1527,12 +3535,72 @@ def remove_duplicates():
         return jsonify({'error': f'Failed to remove duplicates: {str(e)}'}), 500
 
 
+# ==========================================
+# Transfer Matching Endpoints
+# ==========================================
+
+@bp.route('/api/transfers', methods=['GET'])
+@login_required
+def list_transfers():
+    """Linked transfer pairs, newest first"""
+    counterpart = db.aliased(Expense)
+    rows = db.session.query(
+        Expense.id, Expense.date, Expense.amount, Expense.description, Expense.source_account,
+        counterpart.id.label('in_id'), counterpart.date.label('in_date'),
+        counterpart.description.label('in_description'), counterpart.source_account.label('in_account')
+    ).join(counterpart, counterpart.id == Expense.transfer_pair_id).filter(
+        Expense.transaction_type == 'expense'
+    ).order_by(Expense.date.desc(), Expense.id.desc()).all()
+
+    return jsonify({'transfers': [{
+        'amount': r.amount,
+        'from': {'id': r.id, 'date': r.date.isoformat(), 'description': r.description,
+                 'source_account': r.source_account},
+        'to': {'id': r.in_id, 'date': r.in_date.isoformat(), 'description': r.in_description,
+               'source_account': r.in_account}
+    } for r in rows], 'count': len(rows)})
+
+@bp.route('/api/transfers/match', methods=['POST'])
+@login_required
+@serialized_write(solo=True)
+def match_all_transfers():
+    """Run the transfer matcher over the whole history"""
+    try:
+        started = time.perf_counter()
+        linked = match_transfers()
+        db.session.commit()
+        return jsonify({'linked': linked, 'took_ms': round((time.perf_counter() - started) * 1000, 1)})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Failed to match transfers: {str(e)}'}), 500
+
+@bp.route('/api/transfers/<int:expense_id>', methods=['DELETE'])
+@login_required
+@serialized_write()
+def unlink_transfer(expense_id):
+    """Unlink a transfer pair; both legs count in totals again and are not re-matched"""
+    try:
+        expense = db.session.get(Expense, expense_id)
+        if not expense:
+            return jsonify({'error': 'Transaction not found'}), 404
+        if not expense.transfer_pair_id:
+            return jsonify({'error': 'Transaction is not a linked transfer'}), 400
+        ids = [expense.id, expense.transfer_pair_id]
+        update_expenses(ids, {'transfer_pair_id': NOT_A_TRANSFER})
+        db.session.commit()
+        return jsonify({'message': 'Transfer unlinked', 'ids': ids})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Failed to unlink transfer: {str(e)}'}), 500
+
+
 # ==========================================
 # Service Station Recategorization
 # ==========================================
 
-@app.route('/api/expenses/recategorize-service-stations', methods=['POST'])
+@bp.route('/api/expenses/recategorize-service-stations', methods=['POST'])
 @login_required
+@serialized_write(solo=True)
 def recategorize_service_stations():
     """Re-categorize existing service station transactions based on amount threshold"""
     try:
@@ -1591,8 +3659,9 @@ def recategorize_service_stations():
 # Enhanced Bulk Update Endpoints
 # ==========================================
 
-@app.route('/api/expenses/bulk-update-essential', methods=['POST'])
+@bp.route('/api/expenses/bulk-update-essential', methods=['POST'])
 @login_required
+@serialized_write(solo=True)
 def bulk_update_essential():
     """Update is_essential for multiple expenses by ID"""
     try:
@@ -1603,13 +3672,7 @@ def bulk_update_essential():
         if not expense_ids:
             return jsonify({'error': 'No expense IDs provided'}), 400
 
-        updated_count = 0
-        for expense_id in expense_ids:
-            expense = Expense.query.get(expense_id)
-            if expense:
-                expense.is_essential = is_essential
-                updated_count += 1
-
+        updated_count = update_expenses(expense_ids, {'is_essential': bool(is_essential)})
         db.session.commit()
         return jsonify({
             'message': f'Successfully updated {updated_count} expense(s)',
@@ -1624,8 +3687,9 @@ def bulk_update_essential():
 # Category Management Endpoints
 # ==========================================
 
-@app.route('/api/categories/<int:category_id>', methods=['PUT'])
+@bp.route('/api/categories/<int:category_id>', methods=['PUT'])
 @login_required
+@serialized_write()
 def update_category(category_id):
     """Update a category's name or color"""
     try:
@@ -1639,6 +3703,10 @@ def update_category(category_id):
                 return jsonify({'error': 'Category name already exists'}), 400
             category.name = data['name']
 
+            # Cached expense rows carry the category name; mark them changed for delta sync
+            Expense.query.filter_by(category_id=category_id).update(
+                {'row_version': sync_version()}, synchronize_session=False)
+
         if 'color' in data:
             category.color = data['color']
 
@@ -1649,18 +3717,247 @@ def update_category(category_id):
         return jsonify({'error': f'Failed to update category: {str(e)}'}), 500
 
 
+# ==========================================
+# Streaming Transaction Export
+# ==========================================
+
+EXPORT_FIELDS = ['id', 'date', 'description', 'amount', 'transaction_type', 'category',
+                 'is_essential', 'is_recurring', 'recurring_frequency', 'source_account',
+                 'bpay_biller_code', 'notes', 'tags']
+EXPORT_BATCH_SIZE = 1000
+
+def iter_export_rows(filters):
+    """Yield filtered transactions as plain dicts, newest first.
+
+    Rows come from a column projection streamed in batches of EXPORT_BATCH_SIZE, so
+    memory stays flat no matter how many transactions are exported.
+    """
+    tag_list = db.select(db.func.group_concat(Tag.name, ';')) \
+        .select_from(expense_tags.join(Tag, expense_tags.c.tag_id == Tag.id)) \
+        .where(expense_tags.c.expense_id == Expense.id) \
+        .correlate(Expense).scalar_subquery()
+
+    query = db.session.query(
+        Expense.id, Expense.date, Expense.description, Expense.amount, Expense.transaction_type,
+        db.func.coalesce(Category.name, 'Uncategorized'), Expense.is_essential, Expense.is_recurring,
+        Expense.recurring_frequency, Expense.source_account, Expense.bpay_biller_code,
+        Expense.notes, tag_list
+    ).select_from(Expense).outerjoin(Category, Expense.category_id == Category.id)
+
+    query = filter_expenses(query, filters).order_by(Expense.date.desc(), Expense.id.desc())
+    for row in query.execution_options(stream_results=True).yield_per(EXPORT_BATCH_SIZE):
+        record = dict(zip(EXPORT_FIELDS, row))
+        record['date'] = record['date'].isoformat()
+        record['is_essential'] = bool(record['is_essential'])
+        record['is_recurring'] = bool(record['is_recurring'])
+        record['tags'] = record['tags'].split(';') if record['tags'] else []
+        yield record
+
+def generate_ndjson_export(filters):
+    buffer = []
+    for record in iter_export_rows(filters):
+        buffer.append(json.dumps(record, separators=(',', ':')))
+        if len(buffer) >= EXPORT_BATCH_SIZE:
+            yield '\n'.join(buffer) + '\n'
+            buffer = []
+    if buffer:
+        yield '\n'.join(buffer) + '\n'
+
+def generate_csv_export(filters):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for count, record in enumerate(iter_export_rows(filters), start=1):
+        record['tags'] = ';'.join(record['tags'])
+        writer.writerow([record[field] for field in EXPORT_FIELDS])
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+EXPORT_FORMATS = {
+    'ndjson': (generate_ndjson_export, 'application/x-ndjson', 'ndjson'),
+    'csv': (generate_csv_export, 'text/csv', 'csv'),
+}
+
+@bp.route('/api/export/transactions', methods=['GET'])
+@login_required
+def export_transactions():
+    """Stream transactions as NDJSON or CSV, using the same filters as /api/expenses"""
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported export format: {export_format}'}), 400
+    generate, mimetype, extension = EXPORT_FORMATS[export_format]
+
+    # Validate filters up front - once streaming starts the status code can't change
+    try:
+        filter_expenses(Expense.query, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    filters = request.args.to_dict()
+    response = Response(stream_with_context(generate(filters)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = \
+        f'attachment; filename=transactions_{datetime.now().strftime("%Y-%m-%d")}.{extension}'
+    return response
+
+@bp.cli.command('export-transactions')
+@click.option('--format', 'export_format', type=click.Choice(list(EXPORT_FORMATS)), default='csv')
+@click.option('--output', type=click.File('w'), default='-', help='Output file (default: stdout)')
+@click.option('--year', help='Only export this calendar year')
+@click.option('--category', help='Only export this category name')
+@click.option('--transaction-type', type=click.Choice(['income', 'expense']))
+def export_transactions_command(export_format, output, year, category, transaction_type):
+    """Write transactions to a file for backups, e.g. flask --app app export-transactions --output backup.csv"""
+    filters = {'year': year, 'category': category, 'transaction_type': transaction_type}
+    generate = EXPORT_FORMATS[export_format][0]
+    for chunk in generate({k: v for k, v in filters.items() if v}):
+        output.write(chunk)
+
+
 # ==========================================
 # PDF Export Feature
 # ==========================================
 
-try:
-    from fpdf import FPDF
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
+# fpdf2 takes ~300 ms to import, so it is only loaded by the first export
+PDF_AVAILABLE = importlib.util.find_spec('fpdf') is not None
+
+# Report sections, and whether each is included when the request doesn't say
+PDF_SECTIONS = {'summary': True, 'essential_optional': True, 'category_breakdown': True, 'monthly_trend': False,
+                'transactions': False}
+
+def pdf_sections(requested):
+    """{section: bool} for every known section, defaults filled in"""
+    requested = requested if isinstance(requested, dict) else {}
+    return {name: bool(requested.get(name, default)) for name, default in PDF_SECTIONS.items()}
+
+class ReportCache:
+    """Finished report bytes by key, least recently used dropped past max_bytes.
 
+    Keys include the data version, so a change to the expenses makes every older
+    entry unreachable; they age out as new reports are added.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = {}  # insertion order is recency order
+        self._bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.pop(key, None)
+            if value is not None:
+                self._entries[key] = value
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            self._bytes += len(value) - (len(old) if old is not None else 0)
+            self._entries[key] = value
+            while self._bytes > self.max_bytes:
+                self._bytes -= len(self._entries.pop(next(iter(self._entries))))
+
+PDF_JOB_STALE_SECONDS = 1800      # a "running" job not finished by then is assumed dead
+PDF_JOB_MAX_AGE = 24 * 3600       # finished reports are deleted after a day
+
+class ReportJobs:
+    """PDF renders run in the background, one at a time per process.
+
+    State lives in PDF_JOB_DIR as <job id>.json (status) and <job id>.pdf (result),
+    so any gunicorn worker can answer a status poll or a download. The job id is a
+    hash of the report key, so an identical request finds the job already running
+    or finished instead of starting another.
+    """
+
+    def __init__(self, flask_app):
+        self.app = flask_app
+        self._lock = threading.Lock()
+        self._queue = None  # worker thread started by the first job
+
+    def directory(self):
+        directory = self.app.config['PDF_JOB_DIR']
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def path(self, job_id, extension):
+        return os.path.join(self.directory(), f'{job_id}.{extension}')
+
+    def status(self, job_id):
+        """The job's status dict, or None if there is no such job"""
+        if os.path.exists(self.path(job_id, 'pdf')):
+            return self._read(job_id) or {'status': 'done'}
+        state = self._read(job_id)
+        if state and state['status'] == 'running' \
+                and time.time() - os.path.getmtime(self.path(job_id, 'json')) > PDF_JOB_STALE_SECONDS:
+            state = {'status': 'failed', 'error': 'Report job stopped without finishing'}
+        return state
+
+    def submit(self, key, fn, **info):
+        """Job id for `key`; fn() (run in an app context) renders the PDF bytes"""
+        job_id = hashlib.sha256(key.encode()).hexdigest()[:16]
+        with self._lock:
+            state = self.status(job_id)
+            if state and state['status'] in ('running', 'done'):
+                return job_id
+            self._remove_expired()
+            self._write(job_id, dict(info, status='running', started=datetime.now().isoformat(timespec='seconds')))
+            if self._queue is None:
+                self._queue = queue.Queue()
+                threading.Thread(target=self._work, name='pdf-report-jobs', daemon=True).start()
+            self._queue.put((job_id, fn, info))
+        return job_id
+
+    def _work(self):
+        while True:
+            job_id, fn, info = self._queue.get()
+            started = time.perf_counter()
+            try:
+                with self.app.app_context():
+                    pdf_bytes = fn()
+                partial = self.path(job_id, 'pdf.part')
+                with open(partial, 'wb') as f:
+                    f.write(pdf_bytes)
+                os.replace(partial, self.path(job_id, 'pdf'))
+                self._write(job_id, dict(info, status='done', bytes=len(pdf_bytes),
+                                         took_ms=round((time.perf_counter() - started) * 1000)))
+            except Exception as e:
+                self.app.logger.exception('PDF report job %s failed', job_id)
+                self._write(job_id, dict(info, status='failed', error=str(e)))
+
+    def _read(self, job_id):
+        try:
+            with open(self.path(job_id, 'json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, job_id, state):
+        partial = self.path(job_id, 'json.part')
+        with open(partial, 'w') as f:
+            json.dump(state, f)
+        os.replace(partial, self.path(job_id, 'json'))
+
+    def _remove_expired(self):
+        directory = self.directory()
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            try:
+                if time.time() - os.path.getmtime(path) > PDF_JOB_MAX_AGE:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+@cache
+def pdf_report_generator():
+    """The PDFReportGenerator class, defined on first use"""
+    from fpdf import FPDF
 
-if PDF_AVAILABLE:
     class PDFReportGenerator(FPDF):
         """Professional PDF financial report generator"""
 
@@ -1817,8 +4114,70 @@ if PDF_AVAILABLE:
 
             self.ln(3)
 
+        # Ledger columns: (heading, width, align); 170 mm fills the page between margins
+        LEDGER_COLUMNS = [('Date', 22, 'L'), ('Description', 70, 'L'), ('Category', 34, 'L'),
+                          ('Income', 22, 'R'), ('Expense', 22, 'R')]
+        LEDGER_ROW_HEIGHT = 5
+
+        def ledger_row(self, values, fill=False, bold=False):
+            self.set_font('Helvetica', 'B' if bold else '', 8)
+            for (_, width, align), value in zip(self.LEDGER_COLUMNS, values):
+                # Core fonts are latin-1 only; anything else prints as '?'
+                text = str(value).encode('latin-1', 'replace').decode('latin-1')
+                self.cell(width, self.LEDGER_ROW_HEIGHT, text, border=1, fill=fill, align=align)
+            self.ln()
+
+        def ledger_subtotal(self, label, income_cents, expense_cents):
+            self.set_fill_color(*self.LIGHT_GRAY)
+            self.ledger_row(['', label, '', self.format_currency(cents_to_dollars(income_cents)),
+                             self.format_currency(cents_to_dollars(expense_cents))], fill=True, bold=True)
+
+        def add_transactions_ledger(self, rows):
+            """Itemized ledger from an iterable of (date, description, category,
+            transaction_type, cents) rows, written as they arrive.
+
+            Every page ends with that page's subtotals and the last one with the
+            totals, so rows are never collected in memory.
+            """
+            self.section_header('TRANSACTIONS')
+            self.set_fill_color(*self.LIGHT_GRAY)
+            self.ledger_row([heading for heading, _, _ in self.LEDGER_COLUMNS], fill=True, bold=True)
+
+            page_cents = {'income': 0, 'expense': 0}
+            total_cents = {'income': 0, 'expense': 0}
+            count = 0
+            for day, description, category, transaction_type, cents in rows:
+                # Leave room for the page subtotal under the last row
+                if self.get_y() + 2 * self.LEDGER_ROW_HEIGHT > self.page_break_trigger:
+                    self.ledger_subtotal('Page subtotal', page_cents['income'], page_cents['expense'])
+                    self.add_page()
+                    self.set_fill_color(*self.LIGHT_GRAY)
+                    self.ledger_row([heading for heading, _, _ in self.LEDGER_COLUMNS], fill=True, bold=True)
+                    page_cents = {'income': 0, 'expense': 0}
+
+                amount = self.format_currency(cents_to_dollars(cents))
+                is_income = transaction_type == 'income'
+                self.ledger_row([day.strftime('%d/%m/%Y'), description[:44], category[:20],
+                                 amount if is_income else '', '' if is_income else amount])
+                side = 'income' if is_income else 'expense'
+                page_cents[side] += cents
+                total_cents[side] += cents
+                count += 1
+
+            if count == 0:
+                self.set_font('Helvetica', '', 10)
+                self.cell(0, 7, 'No transactions in this period', ln=True)
+                return
+            self.ledger_subtotal('Page subtotal', page_cents['income'], page_cents['expense'])
+            if self.get_y() + self.LEDGER_ROW_HEIGHT > self.page_break_trigger:
+                self.add_page()
+            self.ledger_subtotal(f'Total ({count} transactions)', total_cents['income'], total_cents['expense'])
+            self.ln(3)
+
+    return PDFReportGenerator
 
-@app.route('/api/export/pdf', methods=['POST'])
+
+@bp.route('/api/export/pdf', methods=['POST'])
 @login_required
 def export_pdf():
     """Generate PDF report based on selected sections and period"""
@@ -1828,142 +4187,241 @@ def export_pdf():
     try:
         data = request.json or {}
         period = data.get('period', 'year')
-        sections = data.get('sections', {
-            'summary': True,
-            'essential_optional': True,
-            'category_breakdown': True,
-            'monthly_trend': False
-        })
+        sections = pdf_sections(data.get('sections'))
         custom_title = data.get('title', 'Financial Report')
 
-        # Get period label
-        period_label = get_period_label(period)
+        # Reports are cached until the data changes. Relative periods and the header's
+        # "Generated" line also depend on today's date.
+        key = single_flight_key('export_pdf', period, sections, custom_title,
+                                current_sync_version(), datetime.now().date())
+
+        # A long ledger renders in the background; the client polls the job
+        if sections['transactions']:
+            start_date, end_date = statistics_date_range(period, statistics_base_year(None))
+            rows = transaction_query(db.func.count(Expense.id), start_date=start_date, end_date=end_date).scalar()
+            if data.get('background') or rows > current_app.config['PDF_LEDGER_BACKGROUND_ROWS']:
+                jobs = current_app.extensions['balance_sheet']['report_jobs']
+                job_id = jobs.submit(key, lambda: build_pdf_report(period, sections, custom_title),
+                                     period=period, rows=rows)
+                response = jsonify(dict(jobs.status(job_id), job_id=job_id,
+                                        status_url=url_for('balance_sheet.pdf_job_status', job_id=job_id),
+                                        download_url=url_for('balance_sheet.pdf_job_download', job_id=job_id)))
+                response.status_code = 202
+                response.headers['Location'] = response.json['status_url']
+                return response
+
+        cache = current_app.extensions['balance_sheet']['pdf_cache']
+        pdf_bytes = cache.get(key)
+        cache_status = 'HIT'
+        if pdf_bytes is None:
+            # Repeated clicks or several tabs exporting the same report share one render
+            pdf_bytes = single_flight().do(key, lambda: build_pdf_report(period, sections, custom_title))
+            cache.put(key, pdf_bytes)
+            cache_status = 'MISS'
 
-        # Calculate date range
-        today = datetime.now().date()
+        from flask import send_file
+        response = send_file(
+            io.BytesIO(pdf_bytes),
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=f'balance_sheet_report_{datetime.now().strftime("%Y-%m-%d")}.pdf'
+        )
+        response.headers['X-Report-Cache'] = cache_status
+        return response
 
-        if period.startswith('range-'):
-            range_str = period.replace('range-', '')
-            try:
-                start_str, end_str = range_str.split('_')
-                start_date = datetime.strptime(start_str, '%Y-%m-%d').date()
-                end_date = datetime.strptime(end_str, '%Y-%m-%d').date() + timedelta(days=1)
-            except:
-                start_date = today.replace(month=1, day=1)
-                end_date = None
-        elif period.startswith('custom-'):
-            month_str = period.replace('custom-', '')
-            try:
-                year, month = map(int, month_str.split('-'))
-                start_date = datetime(year, month, 1).date()
-                if month == 12:
-                    end_date = datetime(year + 1, 1, 1).date()
-                else:
-                    end_date = datetime(year, month + 1, 1).date()
-            except:
-                start_date = today.replace(day=1)
-                end_date = None
-        elif period == 'month':
-            start_date = today.replace(day=1)
-            end_date = None
-        elif period == 'last3months':
-            start_date = (today - relativedelta(months=3))
-            end_date = None
-        elif period == 'last12months':
-            start_date = (today - relativedelta(months=12))
-            end_date = None
-        elif period == 'year':
-            start_date = today.replace(month=1, day=1)
-            end_date = None
-        else:
-            start_date = None
-            end_date = None
+    except Exception as e:
+        return jsonify({'error': f'Failed to generate PDF: {str(e)}'}), 500
 
-        # Query transactions
-        query = Expense.query
-        if start_date:
-            query = query.filter(Expense.date >= start_date)
-        if end_date:
-            query = query.filter(Expense.date < end_date)
 
-        transactions = query.all()
-
-        # Calculate statistics
-        income_total = sum(t.amount for t in transactions if t.transaction_type == 'income')
-        expense_total = sum(t.amount for t in transactions if t.transaction_type == 'expense')
-        net_position = income_total - expense_total
-
-        expenses_only = [t for t in transactions if t.transaction_type == 'expense']
-        essential_total = sum(e.amount for e in expenses_only if e.is_essential)
-        optional_total = sum(e.amount for e in expenses_only if not e.is_essential)
-
-        # By category
-        by_category = {}
-        for t in transactions:
-            cat_name = t.category.name if t.category else 'Uncategorized'
-            if cat_name not in by_category:
-                by_category[cat_name] = {'amount': 0, 'count': 0, 'type': t.transaction_type}
-            by_category[cat_name]['amount'] += t.amount
-            by_category[cat_name]['count'] += 1
-
-        # Monthly trend
-        monthly_trend = []
-        for i in range(11, -1, -1):
-            month_start = (today.replace(day=1) - relativedelta(months=i))
-            month_end = month_start + relativedelta(months=1)
-            month_transactions = Expense.query.filter(
-                Expense.date >= month_start,
-                Expense.date < month_end
-            ).all()
-            month_income = sum(t.amount for t in month_transactions if t.transaction_type == 'income')
-            month_exp = sum(t.amount for t in month_transactions if t.transaction_type == 'expense')
+def pdf_job(job_id):
+    """(jobs, status) for a job id from a URL, status None if unknown"""
+    jobs = current_app.extensions['balance_sheet']['report_jobs']
+    if not re.fullmatch(r'[0-9a-f]{16}', job_id):
+        return jobs, None
+    return jobs, jobs.status(job_id)
+
+@bp.route('/api/export/pdf/jobs/<job_id>', methods=['GET'])
+@login_required
+def pdf_job_status(job_id):
+    """Status of a background PDF report: running, done or failed"""
+    jobs, state = pdf_job(job_id)
+    if state is None:
+        return jsonify({'error': 'Report job not found'}), 404
+    return jsonify(dict(state, job_id=job_id,
+                        status_url=url_for('balance_sheet.pdf_job_status', job_id=job_id),
+                        download_url=url_for('balance_sheet.pdf_job_download', job_id=job_id)))
+
+@bp.route('/api/export/pdf/jobs/<job_id>/download', methods=['GET'])
+@login_required
+def pdf_job_download(job_id):
+    """The finished PDF of a background report"""
+    jobs, state = pdf_job(job_id)
+    if state is None:
+        return jsonify({'error': 'Report job not found'}), 404
+    if state['status'] != 'done':
+        return jsonify(dict(state, job_id=job_id, error=state.get('error', 'Report is not ready yet'))), 409
+
+    from flask import send_file
+    return send_file(
+        jobs.path(job_id, 'pdf'),
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=f'balance_sheet_report_{datetime.now().strftime("%Y-%m-%d")}.pdf'
+    )
+
+
+def iter_ledger_rows(start_date=None, end_date=None):
+    """(date, description, category, transaction_type, cents) for the PDF ledger, oldest first.
+
+    Streamed in batches of EXPORT_BATCH_SIZE like the transaction export. Linked
+    transfers are left out, so the ledger adds up to the report's totals.
+    """
+    query = transaction_query(
+        Expense.date, Expense.description, db.func.coalesce(Category.name, 'Uncategorized'),
+        Expense.transaction_type, db.type_coerce(Expense.amount, db.Integer),
+        start_date=start_date, end_date=end_date
+    ).outerjoin(Category, Expense.category_id == Category.id).order_by(Expense.date, Expense.id)
+    yield from query.execution_options(stream_results=True).yield_per(EXPORT_BATCH_SIZE)
+
+def build_pdf_report(period, sections, custom_title):
+    """Render the PDF report for a period and return the document bytes.
+
+    `sections` comes from pdf_sections().
+    """
+    # Get period label
+    period_label = get_period_label(period)
+
+    today = datetime.now().date()
+    start_date, end_date = statistics_date_range(period, statistics_base_year(None))
+
+    # Only the requested sections are computed. The first three share one
+    # integer-cent GROUP BY over the period.
+    stats, by_category, monthly_trend = {}, {}, []
+    if sections.get('summary') or sections.get('essential_optional') or sections.get('category_breakdown'):
+        totals = transaction_totals(Expense.transaction_type, Expense.is_essential, Expense.category_id,
+                                    start_date=start_date, end_date=end_date)
+
+        income_cents = sum(t.cents for t in totals if t.transaction_type == 'income')
+        expense_cents = sum(t.cents for t in totals if t.transaction_type == 'expense')
+        essential_cents = sum(t.cents for t in totals if t.transaction_type == 'expense' and t.is_essential)
+        optional_cents = sum(t.cents for t in totals if t.transaction_type == 'expense' and not t.is_essential)
+        stats = {
+            'income_total': cents_to_dollars(income_cents),
+            'expense_total': cents_to_dollars(expense_cents),
+            'net_position': cents_to_dollars(income_cents - expense_cents),
+            'essential_total': cents_to_dollars(essential_cents),
+            'optional_total': cents_to_dollars(optional_cents)
+        }
+
+        if sections.get('category_breakdown'):
+            categories = category_lookup()
+            for t in totals:
+                cat_name = categories.get(t.category_id, categories[None])[0]
+                if cat_name not in by_category:
+                    by_category[cat_name] = {'amount': 0, 'count': 0, 'type': t.transaction_type}
+                by_category[cat_name]['amount'] += t.cents
+                by_category[cat_name]['count'] += t.count
+            for data in by_category.values():
+                data['amount'] = cents_to_dollars(data['amount'])
+
+    if sections.get('monthly_trend'):
+        # Last 12 months in one query grouped by month, instead of a query per month
+        first_month = today.replace(day=1) - relativedelta(months=11)
+        month = db.func.strftime('%Y-%m', Expense.date).label('month')
+        month_cents = {(t.month, t.transaction_type): t.cents for t in transaction_totals(
+            month, Expense.transaction_type,
+            start_date=first_month, end_date=today.replace(day=1) + relativedelta(months=1))}
+        for i in range(12):
+            month_start = first_month + relativedelta(months=i)
+            month_income = month_cents.get((month_start.strftime('%Y-%m'), 'income'), 0)
+            month_exp = month_cents.get((month_start.strftime('%Y-%m'), 'expense'), 0)
             monthly_trend.append({
                 'month': month_start.strftime('%b %Y'),
-                'income': month_income,
-                'expenses': month_exp,
-                'net': month_income - month_exp
+                'income': cents_to_dollars(month_income),
+                'expenses': cents_to_dollars(month_exp),
+                'net': cents_to_dollars(month_income - month_exp)
             })
 
-        stats = {
-            'income_total': income_total,
-            'expense_total': expense_total,
-            'net_position': net_position,
-            'essential_total': essential_total,
-            'optional_total': optional_total
-        }
+    # Generate PDF
+    pdf = pdf_report_generator()(title=custom_title, period_label=period_label)
+    pdf.add_page()
 
-        # Generate PDF
-        pdf = PDFReportGenerator(title=custom_title, period_label=period_label)
-        pdf.add_page()
+    if sections.get('summary'):
+        pdf.add_summary_section(stats)
 
-        if sections.get('summary', True):
-            pdf.add_summary_section(stats)
+    if sections.get('essential_optional'):
+        pdf.add_essential_optional_section(stats)
 
-        if sections.get('essential_optional', True):
-            pdf.add_essential_optional_section(stats)
+    if sections.get('category_breakdown'):
+        pdf.add_category_breakdown(by_category)
 
-        if sections.get('category_breakdown', True):
-            pdf.add_category_breakdown(by_category)
+    if sections.get('monthly_trend'):
+        pdf.add_monthly_trend(monthly_trend)
 
-        if sections.get('monthly_trend', False):
-            pdf.add_monthly_trend(monthly_trend)
+    if sections.get('transactions'):
+        pdf.add_transactions_ledger(iter_ledger_rows(start_date, end_date))
 
-        # Output to BytesIO
-        pdf_output = io.BytesIO()
-        pdf.output(pdf_output)
-        pdf_output.seek(0)
+    # Output to BytesIO
+    pdf_output = io.BytesIO()
+    pdf.output(pdf_output)
+    return pdf_output.getvalue()
 
-        from flask import send_file
-        return send_file(
-            pdf_output,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f'balance_sheet_report_{datetime.now().strftime("%Y-%m-%d")}.pdf'
-        )
 
-    except Exception as e:
-        return jsonify({'error': f'Failed to generate PDF: {str(e)}'}), 500
+# ==========================================
+# Application Factory
+# ==========================================
+
+def create_app(config=None):
+    """Build a configured app without touching the database.
+
+    Schema creation, migrations and seeding live in init_db() (`flask init-db`), so
+    importing the module or creating an app costs no I/O. Flask's CLI finds this
+    factory by name when FLASK_APP=app.
+    """
+    started = time.perf_counter()
+    flask_app = Flask(__name__)
+    flask_app.config.from_mapping(DEFAULT_CONFIG)
+    if config:
+        flask_app.config.update(config)
+    if flask_app.config['PROFILING']:
+        options = flask_app.config['SQLALCHEMY_ENGINE_OPTIONS']
+        flask_app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(
+            options, connect_args=dict(options.get('connect_args', {}), factory=ProfiledConnection))
+
+    if flask_app.config['SLOW_QUERY_MS'] > 0:
+        configure_slow_query_log(flask_app.config['SLOW_QUERY_LOG'])
+
+    db.init_app(flask_app)
+    flask_app.register_blueprint(bp)
+    flask_app.extensions['balance_sheet'] = {
+        'write_queue': WriteQueue(flask_app),
+        'wal_checkpointer': None,   # started by the first request
+        'search_available': None,   # looked up on first search
+        'metrics': RequestMetrics(),
+        'lock': threading.Lock(),
+        'startup_ms': None,
+        'pdf_cache': ReportCache(int(flask_app.config['PDF_CACHE_MB'] * 1024 * 1024)),
+        'report_jobs': ReportJobs(flask_app),
+        'single_flight': SingleFlight(),
+    }
+    flask_app.extensions['balance_sheet']['startup_ms'] = (time.perf_counter() - started) * 1000
+    return flask_app
+
+
+def warm_caches():
+    """Build the process-wide rule index and load the lazy imports.
+
+    wsgi.py calls this in the server's master process so forked workers share the
+    result instead of each paying for it on their first import or PDF export.
+    """
+    categorization_index()
+    relativedelta()
+    if PDF_AVAILABLE:
+        pdf_report_generator()
 
 
 if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        init_db()
     app.run(debug=True, host='0.0.0.0', port=8080)
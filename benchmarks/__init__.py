@@ -0,0 +1,9 @@
+"""Benchmarks for the balance sheet app. Run them from the repository root:
+
+    python -m benchmarks.suite --rows 100000     # import + dashboard timings, saved as JSON
+    python -m benchmarks.compare OLD.json NEW.json
+    python -m benchmarks.datagen --rows 10000 --out DIR
+    python -m benchmarks.concurrent_reads
+    python -m benchmarks.concurrent_writes
+    python -m benchmarks.startup
+"""
@@ -0,0 +1,50 @@
+"""Compare two benchmarks.suite result files.
+
+    python -m benchmarks.compare benchmarks/results/suite-100000-abc1234.json benchmarks/results/suite-100000-def5678.json
+
+Prints the median of each benchmark in both runs and the change. A change larger
+than --threshold percent is marked "slower" or "faster". With --fail-on-regression
+the exit status is 1 if anything got slower, so the script can gate CI.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('base', help='results from the baseline run')
+    parser.add_argument('head', help='results from the run being checked')
+    parser.add_argument('--threshold', type=float, default=10, help='percent change treated as significant')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    base, head = load(args.base), load(args.head)
+    for key in ('rows', 'seed', 'import_rows'):
+        if base['meta'].get(key) != head['meta'].get(key):
+            print(f'warning: {key} differs ({base["meta"].get(key)} vs {head["meta"].get(key)})', file=sys.stderr)
+
+    print(f'{"benchmark":<24}{base["meta"]["commit"]:>12}{head["meta"]["commit"]:>12}{"change":>10}')
+    regressions = 0
+    for name in list(base['results']) + [n for n in head['results'] if n not in base['results']]:
+        old, new = base['results'].get(name), head['results'].get(name)
+        if old is None or new is None:
+            print(f'{name:<24}{"-" if old is None else old["median_ms"]:>12}{"-" if new is None else new["median_ms"]:>12}')
+            continue
+        change = (new['median_ms'] - old['median_ms']) / old['median_ms'] * 100 if old['median_ms'] else 0.0
+        verdict = ''
+        if change > args.threshold:
+            verdict, regressions = 'slower', regressions + 1
+        elif change < -args.threshold:
+            verdict = 'faster'
+        print(f'{name:<24}{old["median_ms"]:>12.1f}{new["median_ms"]:>12.1f}{change:>+9.1f}%  {verdict}')
+    return 1 if args.fail_on_regression and regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""Dashboard read latency while a CSV import is writing.
+
+Each connection profile runs in its own subprocess against a scratch database:
+
+    python -m benchmarks.concurrent_reads --rows 50000 --import-rows 5000
+
+`sqlite-defaults` is the engine before SQLITE_PRAGMAS existed (rollback journal,
+2 MB page cache, 5 s busy timeout); `tuned` is the app's configuration. Reader
+processes poll /api/statistics and /api/expenses, pausing READ_INTERVAL between
+requests like a dashboard would, for as long as the import runs. They are separate
+processes, like separate server workers, so the numbers show SQLite locking rather
+than GIL contention. The table reports their latency and any failed requests.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MERCHANTS = ['WOOLWORTHS 1234 PRAHRAN VIC', 'COLES EXPRESS', 'BPAY ORIGIN ENERGY 123456',
+             'NETFLIX.COM', 'UBER *TRIP', 'DAN MURPHYS', 'SALARY ACME PTY LTD']
+READ_PATHS = ['/api/statistics?period=year', '/api/expenses?limit=200']
+READ_INTERVAL = 0.05  # seconds
+PROFILES = {
+    'sqlite-defaults': (('journal_mode', 'DELETE'), ('cache_size', -2000), ('busy_timeout', 5000)),
+    'tuned': None,  # app.SQLITE_PRAGMAS as shipped
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0
+
+
+def seed(m, flask_app, rows):
+    rng = random.Random(7)
+    with flask_app.app_context():
+        m.init_db()
+        categories = [c.id for c in m.Category.query.all()]
+        m.db.session.execute(m.Expense.__table__.insert(), [{
+            'description': f'{rng.choice(MERCHANTS)} REF{rng.randint(100000, 999999)}',
+            'amount': round(rng.uniform(2, 400), 2),
+            'date': date(2022, 1, 1) + timedelta(days=rng.randint(0, 1400)),
+            'category_id': rng.choice(categories),
+            'is_essential': rng.random() < 0.5,
+            'transaction_type': 'income' if rng.random() < 0.1 else 'expense',
+            'source_account': rng.choice(['Everyday', 'Amex', 'Offset']),
+            'is_recurring': False,
+            'row_version': 0,
+        } for _ in range(rows)])
+        m.db.session.commit()
+
+
+def import_csv(rows):
+    lines = ['Date,Description,Debits and Credits']
+    for i in range(rows):
+        day = date(2026, 1, 1) + timedelta(days=i % 300)
+        lines.append(f'{day:%d/%m/%Y},IMPORTED MERCHANT {i},(${10 + i % 97}.{i % 100:02d})')
+    return '\n'.join(lines).encode()
+
+
+def load_app(profile):
+    import app as m
+
+    if PROFILES[profile] is not None:
+        # Set before the app's engine opens its first connection
+        m.SQLITE_PRAGMAS = PROFILES[profile]
+    return m, m.create_app()
+
+
+def client(flask_app):
+    c = flask_app.test_client()
+    with c.session_transaction() as session:
+        session['logged_in'] = True
+    return c
+
+
+def run_reader(args):
+    """Reader process: poll the dashboard endpoints while the flag file exists"""
+    m, flask_app = load_app(args.profile)
+
+    c = client(flask_app)
+    latencies, errors = [], []
+    print('ready', flush=True)
+    while not os.path.exists(args.flag):
+        time.sleep(0.01)
+    n = args.reader
+    while os.path.exists(args.flag):
+        started = time.perf_counter()
+        try:
+            status = c.get(READ_PATHS[n % len(READ_PATHS)]).status_code
+        except Exception as e:  # "database is locked" surfaces here or as a 500
+            status = repr(e)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if status != 200:
+            errors.append(str(status))
+        n += 1
+        time.sleep(READ_INTERVAL)
+    print(json.dumps({'latencies': latencies, 'errors': errors}), flush=True)
+
+
+def run_mode(args):
+    """Writer process: seed, start the readers, then import while they poll"""
+    m, flask_app = load_app(args.profile)
+
+    seed(m, flask_app, args.rows)
+    flag = os.environ['DATABASE_URL'].split('///', 1)[1] + '.importing'
+    readers = [subprocess.Popen([sys.executable, '-m', 'benchmarks.concurrent_reads', '--reader', str(n), '--flag', flag,
+                                 '--profile', args.profile],
+                                cwd=ROOT, stdout=subprocess.PIPE, text=True)
+               for n in range(args.readers)]
+    for reader in readers:
+        while reader.stdout.readline().strip() != 'ready':  # the app is imported
+            pass
+
+    open(flag, 'w').close()
+    started = time.perf_counter()
+    response = client(flask_app).post('/api/import-csv', data={
+        'file': (io.BytesIO(import_csv(args.import_rows)), 'Everyday.csv')
+    }, content_type='multipart/form-data')
+    import_seconds = time.perf_counter() - started
+    os.remove(flag)
+
+    latencies, errors = [], []
+    for reader in readers:
+        result = json.loads(reader.stdout.read().strip().splitlines()[-1])
+        reader.wait()
+        latencies += result['latencies']
+        errors += result['errors']
+
+    print(json.dumps({
+        'profile': args.profile,
+        'import_status': response.status_code,
+        'imported': (response.get_json() or {}).get('imported'),
+        'import_s': round(import_seconds, 2),
+        'reads': len(latencies),
+        'errors': len(errors),
+        'p50_ms': round(percentile(latencies, 0.5), 1),
+        'p95_ms': round(percentile(latencies, 0.95), 1),
+        'max_ms': round(max(latencies, default=0), 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000, help='existing transactions')
+    parser.add_argument('--import-rows', type=int, default=5000, help='rows in the imported CSV')
+    parser.add_argument('--readers', type=int, default=2, help='concurrent reader processes')
+    parser.add_argument('--profiles', default=','.join(PROFILES), help='connection profiles to compare')
+    parser.add_argument('--profile', default='tuned', help=argparse.SUPPRESS)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--reader', type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--flag', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child or args.reader is not None:
+        return run_reader(args) if args.reader is not None else run_mode(args)
+
+    results = []
+    for profile in args.profiles.split(','):
+        with tempfile.TemporaryDirectory() as scratch:
+            # Journal mode goes through the environment so no process ever opens the file in WAL
+            journal_mode = dict(PROFILES[profile] or ()).get('journal_mode', 'WAL')
+            env = dict(os.environ, WAL_CHECKPOINT_INTERVAL='0', SQLITE_JOURNAL_MODE=journal_mode,
+                       DATABASE_URL=f'sqlite:///{os.path.join(scratch, "bench.db")}')
+            out = subprocess.run([sys.executable, '-m', 'benchmarks.concurrent_reads', '--child', '--profile', profile,
+                                  '--rows', str(args.rows),
+                                  '--import-rows', str(args.import_rows), '--readers', str(args.readers)],
+                                 env=env, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+
+    columns = ['profile', 'import_s', 'reads', 'errors', 'p50_ms', 'p95_ms', 'max_ms']
+    print('  '.join(f'{c:>15}' for c in columns))
+    for result in results:
+        print('  '.join(f'{result[c]:>15}' for c in columns))
+
+
+if __name__ == '__main__':
+    main()
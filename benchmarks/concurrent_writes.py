@@ -0,0 +1,104 @@
+"""Small-write throughput with and without the single-writer queue.
+
+Each setting runs in its own subprocess against a scratch database:
+
+    python -m benchmarks.concurrent_writes --threads 8 --writes 50
+
+Request threads mix category edits, learned-rule creates and expense note edits, which
+are the small writes that two open tabs produce. With the queue enabled they share
+group commits on the writer thread (WRITE_QUEUE=1). Disabled (WRITE_QUEUE=0), every
+request commits for itself and waits on SQLite's lock.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from benchmarks.concurrent_reads import ROOT, client, percentile, seed
+
+
+def run_setting(args):
+    """Child process: seed, then hammer the write endpoints from request threads"""
+    import app as m
+
+    flask_app = m.create_app()
+    seed(m, flask_app, args.rows)
+    with flask_app.app_context():
+        categories = [c.id for c in m.Category.query.all()]
+        expense_ids = [r.id for r in m.db.session.query(m.Expense.id).limit(500)]
+
+    statuses, latencies = Counter(), []
+    lock = threading.Lock()
+
+    def writer(n):
+        c = client(flask_app)
+        for i in range(args.writes):
+            k = n * args.writes + i
+            started = time.perf_counter()
+            if k % 3 == 0:
+                response = c.put(f'/api/categories/{categories[k % len(categories)]}',
+                                 json={'color': f'#{k % 0xffffff:06x}'})
+            elif k % 3 == 1:
+                response = c.post('/api/learned-rules',
+                                  json={'description_pattern': f'BENCH RULE {k}', 'category_id': categories[0]})
+            else:
+                response = c.put(f'/api/expenses/{expense_ids[k % len(expense_ids)]}', json={'notes': f'bench {k}'})
+            with lock:
+                statuses[response.status_code] += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    total = sum(statuses.values())
+    enabled = flask_app.config['WRITE_QUEUE']
+    print(json.dumps({
+        'write_queue': enabled,
+        'writes': total,
+        'failed': total - statuses[200] - statuses[201],
+        'writes_per_s': round(total / elapsed, 1),
+        'commits': flask_app.extensions['balance_sheet']['write_queue'].stats['commits'] if enabled else total,
+        'p50_ms': round(percentile(latencies, 0.5), 1),
+        'p95_ms': round(percentile(latencies, 0.95), 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000, help='existing transactions')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent request threads')
+    parser.add_argument('--writes', type=int, default=50, help='writes per thread')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_setting(args)
+
+    results = []
+    for enabled in ('0', '1'):
+        with tempfile.TemporaryDirectory() as scratch:
+            env = dict(os.environ, WRITE_QUEUE=enabled, WAL_CHECKPOINT_INTERVAL='0',
+                       DATABASE_URL=f'sqlite:///{os.path.join(scratch, "bench.db")}')
+            out = subprocess.run([sys.executable, '-m', 'benchmarks.concurrent_writes', '--child', '--rows', str(args.rows),
+                                  '--threads', str(args.threads), '--writes', str(args.writes)],
+                                 env=env, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+
+    columns = ['write_queue', 'writes', 'failed', 'writes_per_s', 'commits', 'p50_ms', 'p95_ms']
+    print('  '.join(f'{c:>12}' for c in columns))
+    for result in results:
+        print('  '.join(f'{str(result[c]):>12}' for c in columns))
+
+
+if __name__ == '__main__':
+    main()
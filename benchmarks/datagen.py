@@ -0,0 +1,234 @@
+"""Deterministic synthetic statements in the formats import_csv() parses.
+
+    python -m benchmarks.datagen --rows 100000 --out /tmp/statements
+
+Writes one CSV per account, named the way the app derives source_account from the
+upload's filename:
+
+- Everyday.csv and Savings.csv: bank format ("Date,Description,Debits and Credits").
+  Debits are in parentheses. Credits are plain and recognised by their keywords.
+- Amex.csv: credit card format ("Date,Description,Amount"). Purchases are positive
+  and card payments are negative. The importer skips the payments.
+- Mortgage.csv: bank format with "LOAN PAYMENT" credits and the interest rows the
+  importer skips. Its dates are written as "15 Jan 2024".
+
+The mix includes salary, BPAY bills with biller codes, transfers between Everyday
+and Savings (both legs, for match_transfers), exact re-exported duplicates, and
+near duplicates (pending vs posted) for the duplicate index. Everything comes from
+random.Random(seed). Dates are laid out backwards from `end`, so the same seed
+always gives the same rows relative to the end date.
+"""
+import argparse
+import csv
+import io
+import os
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+DEFAULT_SEED = 20240101
+SPAN_DAYS = 4 * 365
+
+# Share of generated rows per account file
+ACCOUNT_SHARES = {'Everyday.csv': 0.45, 'Amex.csv': 0.40, 'Savings.csv': 0.10, 'Mortgage.csv': 0.05}
+ACCOUNT_FORMATS = {'Everyday.csv': 'bank', 'Savings.csv': 'bank', 'Amex.csv': 'amex', 'Mortgage.csv': 'mortgage'}
+
+# Row kinds import_csv() drops before inserting anything
+IMPORT_SKIPPED_KINDS = {'card_payment', 'cc_payment', 'interest'}
+# Debits exported without parentheses, which sends them through the importer's keyword checks
+PLAIN_DEBIT_KINDS = {'cc_payment'}
+# transaction_type import_csv() assigns to each kind that it keeps
+INCOME_KINDS = {'salary', 'refund', 'transfer_in', 'deposit'}
+
+# (description template, low, high) - templates hit CATEGORIZATION_RULES keywords, or miss on purpose
+PURCHASES = [
+    ('WOOLWORTHS {store} PRAHRAN VIC', 8, 260), ('COLES {store} MALVERN', 6, 240), ('ALDI STORES {store}', 10, 180),
+    ('UBER *EATS HELP.UBER.COM', 18, 75), ('STARBUCKS {store} MELBOURNE', 5, 14), ('MARKET LANE COFFEE', 4, 12),
+    ('BP CONNECT {store}', 30, 120), ('SHELL COLES EXPRESS {store}', 30, 110), ('UBER *TRIP {ref}', 9, 65),
+    ('MYKI TOP UP {ref}', 10, 50), ('CHEMIST WAREHOUSE {store}', 8, 90), ('PRICELINE PHARMACY', 6, 60),
+    ('NETFLIX.COM', 17, 23), ('SPOTIFY P{ref}', 12, 24), ('DISNEY PLUS', 14, 14),
+    ('BUNNINGS {store} HAWTHORN', 12, 400), ('JB HI-FI {store}', 25, 1500), ('KMART {store}', 5, 150),
+    ('DAN MURPHYS {store}', 20, 200), ('VINTAGE CELLARS', 25, 120), ('PETBARN {store}', 20, 140),
+    ('VILLAGE CINEMAS JAM FACTORY', 18, 60), ('GOODLIFE HEALTH CLUBS', 20, 70), ('READINGS BOOKS CARLTON', 15, 80),
+    ('SQ *FARMERS MARKET {ref}', 8, 60), ('PAYPAL *EBAY {ref}', 10, 300), ('AMAZON MKTPLC AU', 9, 250),
+]
+BILLERS = [('ORIGIN ENERGY', '123456', 120, 420), ('TELSTRA', '23796', 60, 140), ('YARRA VALLEY WATER', '376',
+           80, 260), ('CITY OF STONNINGTON RATES', '431247', 400, 900), ('AAMI INSURANCE', '30361', 90, 240)]
+SALARY = ('SALARY ACME PTY LTD {ref}', 4200, 4800)
+REFUNDS = ('REFUND {merchant}', 10, 120)
+
+
+@dataclass
+class Transaction:
+    date: date
+    description: str
+    cents: int
+    credit: bool      # money into the account
+    kind: str
+
+
+def cents(rng, low, high):
+    return rng.randint(low * 100, high * 100)
+
+
+def account_rows(rows):
+    """Split a total row count across the account files, largest first, summing to `rows`"""
+    counts = {name: int(rows * share) for name, share in ACCOUNT_SHARES.items()}
+    counts['Everyday.csv'] += rows - sum(counts.values())
+    return counts
+
+
+def purchase(rng, day):
+    template, low, high = rng.choice(PURCHASES)
+    description = template.format(store=rng.randint(1000, 9999), ref=rng.randint(100000, 999999))
+    return Transaction(day, description, cents(rng, low, high), False, 'purchase')
+
+
+def near_duplicate(rng, txn):
+    """The pending/posted pair banks export: same amount, a day apart, lightly reworded"""
+    words = txn.description.split()
+    description = ' '.join(words[:-1]) if len(words) > 2 else txn.description + ' PENDING'
+    return Transaction(txn.date + timedelta(days=rng.choice((0, 1))), description, txn.cents, txn.credit, txn.kind)
+
+
+def everyday(rng, count, end):
+    txns, transfers = [], []
+    for i in range(count):
+        day = end - timedelta(days=rng.randrange(SPAN_DAYS))
+        roll = rng.random()
+        if roll < 0.03:
+            txns.append(Transaction(day, SALARY[0].format(ref=rng.randint(1000, 9999)), cents(rng, *SALARY[1:]), True, 'salary'))
+        elif roll < 0.09:
+            name, code, low, high = rng.choice(BILLERS)
+            txns.append(Transaction(day, f'BPAY {name} {code}', cents(rng, low, high), False, 'bpay'))
+        elif roll < 0.13:
+            txn = Transaction(day, f'TRANSFER TO SAVINGS ACCOUNT REF{rng.randint(100000, 999999)}',
+                              cents(rng, 50, 2000), False, 'transfer_out')
+            txns.append(txn)
+            transfers.append(txn)
+        elif roll < 0.15:
+            txns.append(Transaction(day, 'DIRECT DEBIT TO AMERICAN EXPRESS', cents(rng, 200, 4000), False, 'cc_payment'))
+        elif roll < 0.16:
+            merchant = rng.choice(PURCHASES)[0].split()[0]
+            txns.append(Transaction(day, REFUNDS[0].format(merchant=merchant), cents(rng, *REFUNDS[1:]), True, 'refund'))
+        else:
+            txns.append(purchase(rng, day))
+    return txns, transfers
+
+
+def savings(rng, count, end, transfers):
+    """Interest and deposits, plus the incoming leg of Everyday's transfers (up to 3 days later)"""
+    txns = []
+    for txn in transfers[:count]:
+        day = txn.date + timedelta(days=rng.randint(0, 3))
+        txns.append(Transaction(day, f'TRANSFER FROM EVERYDAY ACCOUNT {txn.description[-9:]}', txn.cents, True, 'transfer_in'))
+    while len(txns) < count:
+        day = end - timedelta(days=rng.randrange(SPAN_DAYS))
+        if rng.random() < 0.5:
+            txns.append(Transaction(day, 'DEPOSIT INTEREST', cents(rng, 1, 60), True, 'deposit'))
+        else:
+            txns.append(Transaction(day, f'DEPOSIT BRANCH {rng.randint(100, 999)}', cents(rng, 100, 3000), True, 'deposit'))
+    return txns
+
+
+def amex(rng, count, end):
+    txns = []
+    for _ in range(count):
+        day = end - timedelta(days=rng.randrange(SPAN_DAYS))
+        if rng.random() < 0.04:
+            txns.append(Transaction(day, 'PAYMENT RECEIVED - THANK YOU', cents(rng, 200, 4000), True, 'card_payment'))
+        else:
+            txns.append(purchase(rng, day))
+    return txns
+
+
+def mortgage(rng, count, end):
+    """A repayment and an interest charge per cycle, cycles spread over the span"""
+    txns = []
+    while len(txns) < count:
+        day = end - timedelta(days=rng.randrange(SPAN_DAYS))
+        txns.append(Transaction(day, 'LOAN PAYMENT', cents(rng, 2800, 3200), True, 'loan_payment'))
+        if len(txns) < count:
+            description = rng.choice(('INTEREST', 'Loan Interest'))
+            txns.append(Transaction(day, description, cents(rng, 1500, 1900), False, 'interest'))
+    return txns
+
+
+def add_duplicates(rng, txns, exact=0.01, near=0.02):
+    """Replace a few rows with re-exports (exact) and pending/posted pairs (near) of other rows"""
+    for i in range(len(txns)):
+        roll = rng.random()
+        if roll < exact + near and i > 0:
+            original = txns[rng.randrange(i)]
+            if original.kind in IMPORT_SKIPPED_KINDS or original.kind.startswith('transfer'):
+                continue
+            txns[i] = original if roll < exact else near_duplicate(rng, original)
+    return txns
+
+
+def generate(rows, seed=DEFAULT_SEED, end=None):
+    """{filename: [Transaction, ...]} in date order, `rows` in total"""
+    rng = random.Random(seed)
+    end = end or date.today()
+    counts = account_rows(rows)
+    everyday_txns, transfers = everyday(rng, counts['Everyday.csv'], end)
+    files = {
+        'Everyday.csv': add_duplicates(rng, everyday_txns),
+        'Savings.csv': savings(rng, counts['Savings.csv'], end, transfers),
+        'Amex.csv': add_duplicates(rng, amex(rng, counts['Amex.csv'], end)),
+        'Mortgage.csv': mortgage(rng, counts['Mortgage.csv'], end),
+    }
+    for txns in files.values():
+        txns.sort(key=lambda txn: txn.date)
+    return files
+
+
+def format_money(amount_cents):
+    return f'${amount_cents // 100:,}.{amount_cents % 100:02d}'
+
+
+def to_csv(filename, txns):
+    """Render one account's transactions the way its bank exports them"""
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n')
+    kind = ACCOUNT_FORMATS[filename]
+    if kind == 'amex':
+        writer.writerow(['Date', 'Description', 'Amount'])
+        for txn in txns:
+            sign = '-' if txn.credit else ''
+            writer.writerow([f'{txn.date:%d/%m/%Y}', txn.description, sign + format_money(txn.cents)])
+    else:
+        date_format = '%d %b %Y' if kind == 'mortgage' else '%d/%m/%Y'
+        writer.writerow(['Date', 'Description', 'Debits and Credits'])
+        for txn in txns:
+            amount = format_money(txn.cents)
+            writer.writerow([txn.date.strftime(date_format), txn.description,
+                             amount if txn.credit or txn.kind in PLAIN_DEBIT_KINDS else f'({amount})'])
+    return out.getvalue()
+
+
+def write_csvs(files, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for filename, txns in files.items():
+        path = os.path.join(out_dir, filename)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(to_csv(filename, txns))
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000, help='total rows across all files')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--end', type=date.fromisoformat, default=None, help='last statement date (default: today)')
+    parser.add_argument('--out', required=True, help='directory for the CSV files')
+    args = parser.parse_args()
+
+    for path in write_csvs(generate(args.rows, args.seed, args.end), args.out):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
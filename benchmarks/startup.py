@@ -0,0 +1,77 @@
+"""Cold start time of `import app` + create_app(), checked against a budget.
+
+Each run is a fresh interpreter pointed at a database path that does not exist:
+
+    python -m benchmarks.startup --runs 5 --budget-ms 1000
+
+Startup must stay side-effect free, so a run fails if it creates the database file
+or imports one of the LAZY_MODULES (fpdf2 alone costs ~300 ms and is only needed
+by PDF export). The exit status is non-zero when the median exceeds the budget,
+which makes the script usable as a CI gate.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ['fpdf', 'dateutil']
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+flask_app = app.create_app()
+created = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'lazy_loaded': [name for name in %r if name in sys.modules],
+}))
+''' % LAZY_MODULES
+
+
+def median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to time')
+    parser.add_argument('--budget-ms', type=float, default=1000, help='median import + create_app budget')
+    args = parser.parse_args()
+
+    runs, problems = [], []
+    with tempfile.TemporaryDirectory() as scratch:
+        database = os.path.join(scratch, 'startup.db')
+        env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}')
+        # Warm the bytecode cache so every timed run measures the same thing
+        subprocess.run([sys.executable, '-c', 'import app'], env=env, cwd=ROOT, check=True)
+        for _ in range(args.runs):
+            out = subprocess.run([sys.executable, '-c', CHILD], env=env, cwd=ROOT,
+                                 capture_output=True, text=True, check=True).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            runs.append(result)
+            if result['lazy_loaded']:
+                problems.append(f"imported at startup: {', '.join(result['lazy_loaded'])}")
+        if os.path.exists(database):
+            problems.append('startup touched the database')
+
+    import_ms = median([r['import_ms'] for r in runs])
+    create_app_ms = median([r['create_app_ms'] for r in runs])
+    total_ms = median([r['import_ms'] + r['create_app_ms'] for r in runs])
+    print(f'{"import_ms":>12}  {"create_app_ms":>14}  {"total_ms":>10}  {"budget_ms":>10}')
+    print(f'{import_ms:>12.1f}  {create_app_ms:>14.1f}  {total_ms:>10.1f}  {args.budget_ms:>10.0f}')
+
+    if total_ms > args.budget_ms:
+        problems.append(f'median startup {total_ms:.0f} ms is over the {args.budget_ms:.0f} ms budget')
+    for problem in sorted(set(problems)):
+        print(f'FAIL: {problem}')
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""End-to-end timings of import and the dashboard endpoints on synthetic statements.
+
+    python -m benchmarks.suite --rows 10000          # also 100000, 1000000
+    python -m benchmarks.compare benchmarks/results/suite-10000-<old>.json benchmarks/results/suite-10000-<new>.json
+
+The statements come from benchmarks.datagen. The most recent --import-rows rows are
+posted to /api/import-csv, one file per account, like a monthly import. All older
+rows are bulk-loaded first, with the same categorization, type and dedupe rules the
+importer applies, so the import runs against a full history. Then every dashboard
+endpoint is timed through the Flask test client (--repeat runs each, median
+reported):
+
+- /api/statistics for each period
+- /api/duplicates
+- the fuzzy match preview
+- /api/expenses: a page, a search, the full list and the columnar format
+- the PDF export
+
+Results go to benchmarks/results/suite-<rows>-<commit>.json.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import re
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+from benchmarks.datagen import (DEFAULT_SEED, IMPORT_SKIPPED_KINDS, INCOME_KINDS, account_rows, generate,
+                                to_csv, write_csvs)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+STATISTICS_PERIODS = ['month', 'last3months', 'last12months', 'year', 'all']
+FUZZY_DESCRIPTIONS = ['WOOLWORTHS 1234 PRAHRAN VIC', 'BPAY ORIGIN ENERGY 123456', 'UBER *TRIP 123456']
+PDF_SECTIONS = {'summary': True, 'essential_optional': True, 'category_breakdown': True, 'monthly_trend': True}
+LOAD_CHUNK = 5000
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def bulk_load(m, files):
+    """Insert rows the way import_csv() would store them, without going through HTTP"""
+    categories = {c.name: c.id for c in m.Category.query.all()}
+    tags = {}
+
+    def tag_id(name):
+        if name not in tags:
+            tag = m.Tag.query.filter_by(name=name).first() or m.Tag(name=name)
+            m.db.session.add(tag)
+            m.db.session.flush()
+            tags[name] = tag.id
+        return tags[name]
+
+    seen = set()
+    pending = []
+
+    def flush():
+        first_id = (m.db.session.query(m.db.func.max(m.Expense.id)).scalar() or 0) + 1
+        m.db.session.execute(m.Expense.__table__.insert(), [row for row, _ in pending])
+        links = [{'expense_id': first_id + i, 'tag_id': tag_id(name)}
+                 for i, (_, names) in enumerate(pending) for name in names]
+        m.db.session.execute(m.expense_tags.insert(), links)
+        pending.clear()
+
+    for filename, txns in files.items():
+        source_account = filename.rsplit('.', 1)[0]
+        for txn in txns:
+            key = (txn.description, txn.cents, txn.date)
+            if txn.kind in IMPORT_SKIPPED_KINDS or key in seen:
+                continue
+            seen.add(key)
+            if txn.kind in INCOME_KINDS:
+                category_name, is_essential, names = 'Income', False, ['income']
+                transaction_type = 'income'
+            else:
+                category_name, is_essential, names = m.smart_categorize(txn.description)
+                transaction_type = 'expense'
+            bpay = re.search(r'bpay.*?(\d{4,6})', txn.description.lower())
+            pending.append(({
+                'description': txn.description,
+                'amount': txn.cents / 100,
+                'date': txn.date,
+                'category_id': categories[category_name],
+                'is_essential': is_essential,
+                'transaction_type': transaction_type,
+                'source_account': source_account,
+                'bpay_biller_code': bpay.group(1) if bpay else None,
+                'is_recurring': False,
+                'row_version': 0,
+            }, names))
+            if len(pending) >= LOAD_CHUNK:
+                flush()
+    if pending:
+        flush()
+    m.db.session.commit()
+    m.match_transfers()
+    m.db.session.commit()
+    m.rebuild_duplicate_index()
+    m.db.session.execute(m.db.text('ANALYZE'))
+    m.db.session.commit()
+    return len(seen)
+
+
+def split_recent(files, import_rows):
+    """(history, recent): the newest rows of each file are kept back for the timed import"""
+    counts = account_rows(import_rows)
+    history, recent = {}, {}
+    for filename, txns in files.items():
+        cut = len(txns) - min(counts[filename], len(txns))
+        history[filename], recent[filename] = txns[:cut], txns[cut:]
+    return history, recent
+
+
+def timed(call, repeat):
+    """Run `call` `repeat` times; it returns the response, which must be a success"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = call()
+        samples.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(f'HTTP {response.status_code}: {response.get_data(as_text=True)[:200]}')
+    return {'median_ms': round(statistics.median(samples), 2), 'min_ms': round(min(samples), 2),
+            'max_ms': round(max(samples), 2), 'runs': repeat}
+
+
+def run_suite(args):
+    import app as m
+    from benchmarks.concurrent_reads import client
+
+    files = generate(args.rows, args.seed, args.end)
+    if args.csv_dir:
+        write_csvs(files, args.csv_dir)
+    history, recent = split_recent(files, args.import_rows)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        database = os.path.join(scratch, 'suite.db')
+        flask_app = m.create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}',
+                                  'WAL_CHECKPOINT_INTERVAL': 0, 'SLOW_QUERY_MS': 0})
+        c = client(flask_app)
+        results = {}
+
+        started = time.perf_counter()
+        with flask_app.app_context():
+            m.init_db()
+            loaded = bulk_load(m, history)
+        load_seconds = time.perf_counter() - started
+        print(f'loaded {loaded} rows of history in {load_seconds:.1f}s', file=sys.stderr)
+
+        for filename, txns in recent.items():
+            body = to_csv(filename, txns).encode()
+            started = time.perf_counter()
+            response = c.post('/api/import-csv', data={'file': (io.BytesIO(body), filename)},
+                              content_type='multipart/form-data')
+            elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                raise RuntimeError(f'import {filename}: HTTP {response.status_code} {response.get_json()}')
+            name = 'import_' + filename.rsplit('.', 1)[0].lower()
+            results[name] = {'median_ms': round(elapsed * 1000, 2), 'runs': 1, 'rows': len(txns),
+                             'imported': response.get_json()['imported'],
+                             'rows_per_s': round(len(txns) / elapsed, 1)}
+
+        for period in STATISTICS_PERIODS:
+            results[f'statistics_{period}'] = timed(lambda: c.get(f'/api/statistics?period={period}'), args.repeat)
+        results['duplicates'] = timed(lambda: c.get('/api/duplicates'), args.repeat)
+        for i, description in enumerate(FUZZY_DESCRIPTIONS):
+            results[f'fuzzy_preview_{i}'] = timed(lambda: c.post('/api/expenses/fuzzy-match-preview',
+                                                                 json={'description': description}), args.repeat)
+        results['expenses_page'] = timed(lambda: c.get('/api/expenses?limit=200'), args.repeat)
+        results['expenses_search'] = timed(lambda: c.get('/api/expenses?limit=200&q=woolworths'), args.repeat)
+        results['expenses_all'] = timed(lambda: c.get('/api/expenses'), args.repeat)
+        results['expenses_columnar'] = timed(lambda: c.get('/api/expenses?format=columnar'), args.repeat)
+        if m.PDF_AVAILABLE:
+            results['export_pdf'] = timed(lambda: c.post('/api/export/pdf', json={
+                'period': 'all', 'sections': PDF_SECTIONS}), args.repeat)
+
+        database_bytes = os.path.getsize(database)
+
+    return {
+        'meta': {
+            'rows': args.rows,
+            'import_rows': args.import_rows,
+            'seed': args.seed,
+            'end': (args.end or date.today()).isoformat(),
+            'repeat': args.repeat,
+            'commit': git_commit(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'history_rows': loaded,
+            'load_s': round(load_seconds, 2),
+            'database_bytes': database_bytes,
+        },
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000, help='generated rows, e.g. 10000, 100000 or 1000000')
+    parser.add_argument('--import-rows', type=int, default=2000, help='newest rows imported through /api/import-csv')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per endpoint')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--end', type=date.fromisoformat, default=None, help='last statement date (default: today)')
+    parser.add_argument('--csv-dir', help='also write the generated CSVs here')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/suite-<rows>-<commit>.json)')
+    args = parser.parse_args()
+
+    report = run_suite(args)
+    output = args.output or os.path.join(RESULTS_DIR, f'suite-{args.rows}-{report["meta"]["commit"]}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f'{"benchmark":<24}{"median_ms":>12}{"min_ms":>12}{"max_ms":>12}')
+    for name, result in report['results'].items():
+        print(f'{name:<24}{result["median_ms"]:>12.1f}{result.get("min_ms", result["median_ms"]):>12.1f}'
+              f'{result.get("max_ms", result["median_ms"]):>12.1f}')
+    print(f'wrote {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""Gunicorn settings for the production run mode (`--workers` in the start script).
+
+Every setting can be overridden from the environment or the gunicorn command line.
+Send HUP to the master (`kill -HUP $(cat balance-sheet/gunicorn.pid)`) to replace
+the workers gracefully. In-flight requests get graceful_timeout to finish.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:8080')
+workers = int(os.environ.get('WEB_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = 'gthread'
+
+# Initialize the database and warm caches once, before forking (see wsgi.py)
+preload_app = True
+
+# CSV imports and PDF reports can run for a while; gthread workers heartbeat
+# independently of their requests, so this only catches hung workers
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+pidfile = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'balance-sheet', 'gunicorn.pid')
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """Give each worker its own SQLite connections instead of the master's"""
+    from app import db
+    from wsgi import app
+
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -14,6 +14,9 @@ let sortState = {}; // keyed by month or table name, e.g. { '2025-01': { column:
 // Track currently active month tab so it persists across reloads
 let activeMonthTab = null;
 
+// In-flight statistics request, aborted when a newer period/year is selected
+let statisticsController = null;
+
 // Initialize on page load
 document.addEventListener('DOMContentLoaded', function() {
     // Set default date to today
@@ -109,37 +112,6 @@ function toggleSort(tableKey, column, renderFn) {
     renderFn();
 }
 
-function sortExpenses(expenses, tableKey) {
-    const state = sortState[tableKey];
-    if (!state) return expenses;
-
-    const sorted = [...expenses];
-    const dir = state.direction === 'asc' ? 1 : -1;
-
-    sorted.sort((a, b) => {
-        let valA, valB;
-        switch (state.column) {
-            case 'date':
-                return dir * a.date.localeCompare(b.date);
-            case 'description':
-                return dir * (a.description || '').localeCompare(b.description || '');
-            case 'account':
-                return dir * (a.source_account || '').localeCompare(b.source_account || '');
-            case 'category':
-                return dir * (a.category || '').localeCompare(b.category || '');
-            case 'type':
-                valA = a.is_essential ? 'essential' : 'optional';
-                valB = b.is_essential ? 'essential' : 'optional';
-                return dir * valA.localeCompare(valB);
-            case 'amount':
-                return dir * (a.amount - b.amount);
-            default:
-                return 0;
-        }
-    });
-    return sorted;
-}
-
 function setupEventListeners() {
     // Expense form
     const expenseForm = document.getElementById('expense-form');
@@ -184,7 +156,7 @@ function setupEventListeners() {
     // Filter listeners
     const searchInput = document.getElementById('search-expenses');
     if (searchInput) {
-        searchInput.addEventListener('input', filterAndDisplayExpenses);
+        searchInput.addEventListener('input', debouncedFilterExpenses);
     }
 
     const filterYear = document.getElementById('filter-year');
@@ -209,12 +181,12 @@ function setupEventListeners() {
 
     const filterAmountMin = document.getElementById('filter-amount-min');
     if (filterAmountMin) {
-        filterAmountMin.addEventListener('input', filterAndDisplayExpenses);
+        filterAmountMin.addEventListener('input', debouncedFilterExpenses);
     }
 
     const filterAmountMax = document.getElementById('filter-amount-max');
     if (filterAmountMax) {
-        filterAmountMax.addEventListener('input', filterAndDisplayExpenses);
+        filterAmountMax.addEventListener('input', debouncedFilterExpenses);
     }
 }
 
@@ -288,83 +260,261 @@ async function deleteCategory(id, name) {
 }
 
 // ============ EXPENSES ============
+// Server data version that allExpenses reflects (null until the first full load)
+let expensesVersion = null;
+
 async function loadExpenses() {
     try {
-        const response = await fetch('/api/expenses');
-        allExpenses = await response.json();
-        filterAndDisplayExpenses();
+        // Restore the local cache on first load, then apply only what changed since
+        if (expensesVersion === null) {
+            const cached = await readExpenseCache();
+            if (cached) {
+                setAllExpenses(cached.expenses);
+                expensesVersion = cached.version;
+            }
+        }
+
+        if (expensesVersion !== null) {
+            const changes = await syncExpenseChanges();
+            if (changes) {
+                if (!monthGroups) {
+                    await filterAndDisplayExpenses();
+                } else if (changes.upserted.length || changes.deleted.length) {
+                    // Edits to rows already on screen are patched in place
+                    const onlyEdits = changes.deleted.length === 0 &&
+                        changes.upserted.every(e => changes.previousIds.has(e.id));
+                    await filterAndDisplayExpenses(onlyEdits ? changes.upserted : null);
+                }
+                return;
+            }
+        }
+
+        await loadAllExpenses();
+        await filterAndDisplayExpenses();
     } catch (error) {
         console.error('Error loading expenses:', error);
     }
 }
 
-function filterAndDisplayExpenses() {
-    const searchTerm = (document.getElementById('search-expenses')?.value || '').toLowerCase();
-    const yearFilter = document.getElementById('filter-year')?.value || '';
-    const categoryFilter = document.getElementById('filter-category')?.value || '';
-    const typeFilter = document.getElementById('filter-type')?.value || '';
-    const transactionTypeFilter = document.getElementById('filter-transaction-type')?.value || '';
-    const amountMinStr = document.getElementById('filter-amount-min')?.value || '';
-    const amountMaxStr = document.getElementById('filter-amount-max')?.value || '';
-    const amountMin = amountMinStr ? parseFloat(amountMinStr) : null;
-    const amountMax = amountMaxStr ? parseFloat(amountMaxStr) : null;
+async function loadAllExpenses() {
+    const response = await fetch('/api/expenses?format=columnar');
+    setAllExpenses(decodeColumnarExpenses(await response.json()));
+    expensesVersion = parseInt(response.headers.get('X-Data-Version') || '0');
+    writeExpenseCache(expensesVersion, allExpenses, [], true);
+}
 
-    let filtered = allExpenses.filter(expense => {
-        // Search filter
-        if (searchTerm && !expense.description.toLowerCase().includes(searchTerm)) {
-            return false;
-        }
+function setAllExpenses(expenses) {
+    allExpenses = expenses;
+    expenseById = new Map(allExpenses.map(e => [e.id, e]));
+    expenseWorker.postMessage({ type: 'load', expenses: allExpenses });
+}
 
-        // Year filter
-        if (yearFilter) {
-            const expenseYear = expense.date.substring(0, 4);
-            if (expenseYear !== yearFilter) return false;
-        }
+// Fetch rows changed since expensesVersion and merge them in; null means a full reload is needed
+async function syncExpenseChanges() {
+    const response = await fetch(`/api/expenses/changes?since=${expensesVersion}`);
+    if (!response.ok) return null;
+    const changes = await response.json();
+    if (changes.full_reload) return null;
 
-        // Category filter
-        if (categoryFilter && expense.category !== categoryFilter) {
-            return false;
+    changes.previousIds = new Set();
+    if (changes.upserted.length || changes.deleted.length) {
+        changes.upserted.forEach(e => {
+            if (expenseById.has(e.id)) changes.previousIds.add(e.id);
+        });
+        changes.deleted.forEach(id => expenseById.delete(id));
+        changes.upserted.forEach(e => expenseById.set(e.id, e));
+        allExpenses = Array.from(expenseById.values());
+        expenseWorker.postMessage({ type: 'patch', upserted: changes.upserted, deleted: changes.deleted });
+        writeExpenseCache(changes.version, changes.upserted, changes.deleted, false);
+    }
+    expensesVersion = changes.version;
+    return changes;
+}
+
+// Rebuild row objects from the format=columnar payload (see expenses_columnar in app.py)
+function decodeColumnarExpenses(payload) {
+    const cols = payload.columns;
+    const dict = payload.dictionaries;
+    const sparse = payload.sparse;
+    const baseMs = Date.parse(payload.date_base + 'T00:00:00Z');
+    const dayMs = 86400000;
+    const isoDates = new Map();  // day offset -> 'YYYY-MM-DD', most rows share a few hundred dates
+
+    const expenses = new Array(payload.count);
+    for (let i = 0; i < payload.count; i++) {
+        const offset = cols.date[i];
+        let date = isoDates.get(offset);
+        if (date === undefined) {
+            date = new Date(baseMs + offset * dayMs).toISOString().substring(0, 10);
+            isoDates.set(offset, date);
         }
+        const [categoryId, categoryName] = dict.category[cols.category[i]];
+        expenses[i] = {
+            id: cols.id[i],
+            description: cols.description[i],
+            amount: cols.amount[i],
+            date: date,
+            category: categoryName,
+            category_id: categoryId,
+            is_recurring: cols.is_recurring[i] === 1,
+            recurring_frequency: dict.recurring_frequency[cols.recurring_frequency[i]],
+            is_essential: cols.is_essential[i] === 1,
+            transaction_type: dict.transaction_type[cols.transaction_type[i]],
+            notes: sparse.notes[i] ?? null,
+            source_account: dict.source_account[cols.source_account[i]],
+            bpay_biller_code: sparse.bpay_biller_code[i] ?? null,
+            transfer_pair_id: sparse.transfer_pair_id[i] ?? null,
+            tags: cols.tags[i].map(t => dict.tags[t]),
+            row_version: cols.row_version[i]
+        };
+    }
+    return expenses;
+}
+
+// ============ LOCAL EXPENSE CACHE (IndexedDB) ============
+const EXPENSE_CACHE_DB = 'balance-sheet-cache';
+
+function openExpenseCache() {
+    return new Promise((resolve, reject) => {
+        if (!window.indexedDB) return reject(new Error('IndexedDB unavailable'));
+        const request = indexedDB.open(EXPENSE_CACHE_DB, 1);
+        request.onupgradeneeded = () => {
+            const db = request.result;
+            db.createObjectStore('expenses', { keyPath: 'id' });
+            db.createObjectStore('meta');
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
 
-        // Essential/Optional filter
-        if (typeFilter === 'essential' && !expense.is_essential) return false;
-        if (typeFilter === 'optional' && expense.is_essential) return false;
+async function readExpenseCache() {
+    try {
+        const db = await openExpenseCache();
+        return await new Promise((resolve, reject) => {
+            const tx = db.transaction(['expenses', 'meta'], 'readonly');
+            const versionRequest = tx.objectStore('meta').get('version');
+            const expensesRequest = tx.objectStore('expenses').getAll();
+            tx.oncomplete = () => {
+                if (versionRequest.result === undefined) return resolve(null);
+                const expenses = expensesRequest.result.sort((a, b) => b.date.localeCompare(a.date) || b.id - a.id);
+                resolve({ version: versionRequest.result, expenses });
+            };
+            tx.onerror = () => reject(tx.error);
+        });
+    } catch (error) {
+        console.warn('Expense cache unavailable:', error);
+        return null;
+    }
+}
 
-        // Transaction type filter (income/expense)
-        if (transactionTypeFilter && expense.transaction_type !== transactionTypeFilter) {
-            return false;
-        }
+async function writeExpenseCache(version, upserted, deletedIds, replaceAll) {
+    try {
+        const db = await openExpenseCache();
+        const tx = db.transaction(['expenses', 'meta'], 'readwrite');
+        const store = tx.objectStore('expenses');
+        if (replaceAll) store.clear();
+        deletedIds.forEach(id => store.delete(id));
+        upserted.forEach(expense => store.put(expense));
+        tx.objectStore('meta').put(version, 'version');
+    } catch (error) {
+        console.warn('Could not update expense cache:', error);
+    }
+}
 
-        // Amount range filter
-        if (amountMin !== null && expense.amount < amountMin) return false;
-        if (amountMax !== null && expense.amount > amountMax) return false;
+function getExpenseFilters() {
+    const amountMinStr = document.getElementById('filter-amount-min')?.value || '';
+    const amountMaxStr = document.getElementById('filter-amount-max')?.value || '';
+    return {
+        searchTerm: (document.getElementById('search-expenses')?.value || '').toLowerCase(),
+        year: document.getElementById('filter-year')?.value || '',
+        category: document.getElementById('filter-category')?.value || '',
+        type: document.getElementById('filter-type')?.value || '',
+        transactionType: document.getElementById('filter-transaction-type')?.value || '',
+        amountMin: amountMinStr ? parseFloat(amountMinStr) : null,
+        amountMax: amountMaxStr ? parseFloat(amountMaxStr) : null
+    };
+}
 
-        return true;
+// ============ FILTER/SORT WORKER ============
+// static/js/expense-worker.js keeps a copy of allExpenses with month/category/type indexes
+// and answers filter and sort requests with id lists; the main thread only renders.
+const expenseWorker = new Worker('/static/js/expense-worker.js');
+const workerRequests = new Map();
+let workerRequestId = 0;
+let expenseById = new Map();
+let filterGeneration = 0;   // bumped per filter run so stale worker answers are dropped
+const FILTER_DEBOUNCE_MS = 150;
+
+expenseWorker.onmessage = function(event) {
+    const { requestId, result } = event.data;
+    const resolve = workerRequests.get(requestId);
+    if (resolve) {
+        workerRequests.delete(requestId);
+        resolve(result);
+    }
+};
+
+function askExpenseWorker(message) {
+    const requestId = ++workerRequestId;
+    return new Promise(resolve => {
+        workerRequests.set(requestId, resolve);
+        expenseWorker.postMessage({ ...message, requestId });
     });
+}
 
-    displayExpensesByMonth(filtered);
+function debounce(fn, wait) {
+    let timer = null;
+    return function(...args) {
+        clearTimeout(timer);
+        timer = setTimeout(() => fn.apply(this, args), wait);
+    };
 }
 
-function displayExpensesByMonth(expenses) {
+const debouncedFilterExpenses = debounce(() => filterAndDisplayExpenses(), FILTER_DEBOUNCE_MS);
+
+// updatedRows: rows just edited by a delta sync, patched in place when nothing moved
+async function filterAndDisplayExpenses(updatedRows = null) {
+    const generation = ++filterGeneration;
+    const result = await askExpenseWorker({
+        type: 'query',
+        filters: getExpenseFilters(),
+        sortState
+    });
+    if (generation !== filterGeneration) return;
+
+    if (Array.isArray(updatedRows) && applyExpenseUpdatesInPlace(result, updatedRows)) return;
+    displayExpensesByMonth(result);
+}
+
+// ============ MONTH TABLES (lazy tabs + windowed rows) ============
+// Only the active month tab is rendered, and within it only the rows scrolled into
+// view (plus a buffer) are in the DOM; spacer rows stand in for the rest.
+const VIRTUAL_BUFFER_ROWS = 15;
+let virtualRowHeight = 49;          // px, re-measured from the first rendered row
+let monthGroups = null;             // month -> { income, expenses, count } from the last query
+let monthRows = {};                 // month -> expenses in current sort order
+let renderedMonth = null;           // month whose pane currently holds a table
+let scrollFramePending = false;
+
+function displayExpensesByMonth(result) {
     const monthlyTabs = document.getElementById('monthly-tabs');
     const monthlyContent = document.getElementById('monthly-tab-content');
 
     if (!monthlyTabs || !monthlyContent) return;
 
-    // Group expenses by month
-    const expensesByMonth = {};
-    expenses.forEach(expense => {
-        const monthKey = expense.date.substring(0, 7); // YYYY-MM
-        if (!expensesByMonth[monthKey]) {
-            expensesByMonth[monthKey] = [];
-        }
-        expensesByMonth[monthKey].push(expense);
+    monthGroups = {};
+    monthRows = {};
+    result.months.forEach(group => {
+        monthGroups[group.month] = { income: group.income, expenses: group.expenses, count: group.ids.length };
+        monthRows[group.month] = group.ids.map(id => expenseById.get(id)).filter(Boolean);
     });
 
-    // Sort months descending
-    const months = Object.keys(expensesByMonth).sort().reverse();
+    // Months arrive newest first
+    const months = result.months.map(group => group.month);
 
     if (months.length === 0) {
+        renderedMonth = null;
         monthlyTabs.innerHTML = '<li class="nav-item"><span class="nav-link text-muted">No transactions</span></li>';
         monthlyContent.innerHTML = '<p class="text-muted text-center">Import some transactions to get started!</p>';
         return;
@@ -384,53 +534,109 @@ function displayExpensesByMonth(expenses) {
                         data-bs-toggle="pill"
                         data-bs-target="#month-${month}"
                         type="button"
-                        onclick="activeMonthTab='${month}'">
+                        onclick="showMonthTab('${month}')">
                     ${label}
                 </button>
             </li>
         `;
     }).join('');
 
-    // Store grouped expenses for sorting re-renders
-    window._expensesByMonth = expensesByMonth;
+    // Empty panes for every month; only the active one gets a table
+    monthlyContent.innerHTML = months.map(month =>
+        `<div class="tab-pane fade ${month === targetMonth ? 'show active' : ''}" id="month-${month}"></div>`
+    ).join('');
 
-    // Create content
-    monthlyContent.innerHTML = months.map((month, index) => {
-        const monthExpenses = expensesByMonth[month];
-        const monthTotal = monthExpenses.filter(e => e.transaction_type === 'expense').reduce((sum, e) => sum + e.amount, 0);
-        const monthIncome = monthExpenses.filter(e => e.transaction_type === 'income').reduce((sum, e) => sum + e.amount, 0);
+    renderedMonth = null;
+    renderMonthPane(targetMonth);
+}
 
-        return `
-            <div class="tab-pane fade ${month === targetMonth ? 'show active' : ''}" id="month-${month}">
-                <div class="d-flex justify-content-between align-items-center mb-3">
-                    <div>
-                        <span class="badge bg-success me-2">Income: $${monthIncome.toLocaleString('en-US', {minimumFractionDigits: 2})}</span>
-                        <span class="badge bg-danger">Expenses: $${monthTotal.toLocaleString('en-US', {minimumFractionDigits: 2})}</span>
-                    </div>
-                    <span class="text-muted">${monthExpenses.length} transactions</span>
-                </div>
-                <div class="table-responsive">
-                    <table class="table table-hover">
-                        <thead>
-                            <tr>
-                                <th style="width: 30px;"></th>
-                                ${renderSortableHeader('month-' + month, 'date', 'Date')}
-                                ${renderSortableHeader('month-' + month, 'description', 'Description')}
-                                ${renderSortableHeader('month-' + month, 'account', 'Account')}
-                                ${renderSortableHeader('month-' + month, 'category', 'Category')}
-                                ${renderSortableHeader('month-' + month, 'type', 'Type')}
-                                ${renderSortableHeader('month-' + month, 'amount', 'Amount', 'text-end')}
-                                <th>Actions</th>
-                            </tr>
-                        </thead>
-                        <tbody id="month-tbody-${month}">
-                            ${sortExpenses(monthExpenses, 'month-' + month).map(expense => createExpenseRow(expense)).join('')}
-                        </tbody>
-                    </table>
-                </div>
-            </div>
-        `;
-    }).join('');
+function showMonthTab(month) {
+    activeMonthTab = month;
+    renderMonthPane(month);
+}
+
+function renderMonthPane(month) {
+    const pane = document.getElementById('month-' + month);
+    if (!pane || !monthGroups || !monthGroups[month]) return;
+
+    // Drop the previous tab's table so hidden months hold no rows
+    if (renderedMonth && renderedMonth !== month) {
+        const previous = document.getElementById('month-' + renderedMonth);
+        if (previous) previous.innerHTML = '';
+    }
+    renderedMonth = month;
+
+    const tableKey = 'month-' + month;
+    pane.innerHTML = `
+        <div class="d-flex justify-content-between align-items-center mb-3" id="month-summary-${month}">
+            ${renderMonthSummary(month)}
+        </div>
+        <div class="table-responsive virtual-scroll" id="month-scroll-${month}" onscroll="scheduleVisibleRows('${month}')">
+            <table class="table table-hover">
+                <thead>
+                    <tr>${renderMonthTableHeader(tableKey)}</tr>
+                </thead>
+                <tbody id="month-tbody-${month}"></tbody>
+            </table>
+        </div>
+    `;
+    renderVisibleRows(month);
+}
+
+function renderMonthSummary(month) {
+    const totals = monthGroups[month];
+    return `
+        <div>
+            <span class="badge bg-success me-2">Income: $${totals.income.toLocaleString('en-US', {minimumFractionDigits: 2})}</span>
+            <span class="badge bg-danger">Expenses: $${totals.expenses.toLocaleString('en-US', {minimumFractionDigits: 2})}</span>
+        </div>
+        <span class="text-muted">${totals.count} transactions</span>
+    `;
+}
+
+function renderMonthTableHeader(tableKey) {
+    return `
+        <th style="width: 30px;"></th>
+        ${renderSortableHeader(tableKey, 'date', 'Date')}
+        ${renderSortableHeader(tableKey, 'description', 'Description')}
+        ${renderSortableHeader(tableKey, 'account', 'Account')}
+        ${renderSortableHeader(tableKey, 'category', 'Category')}
+        ${renderSortableHeader(tableKey, 'type', 'Type')}
+        ${renderSortableHeader(tableKey, 'amount', 'Amount', 'text-end')}
+        <th>Actions</th>
+    `;
+}
+
+function scheduleVisibleRows(month) {
+    if (scrollFramePending) return;
+    scrollFramePending = true;
+    requestAnimationFrame(() => {
+        scrollFramePending = false;
+        renderVisibleRows(month);
+    });
+}
+
+function renderVisibleRows(month) {
+    const container = document.getElementById('month-scroll-' + month);
+    const tbody = document.getElementById('month-tbody-' + month);
+    if (!container || !tbody) return;
+
+    const rows = monthRows[month] || [];
+    const viewportRows = Math.ceil((container.clientHeight || 600) / virtualRowHeight);
+    const first = Math.max(0, Math.floor(container.scrollTop / virtualRowHeight) - VIRTUAL_BUFFER_ROWS);
+    const last = Math.min(rows.length, first + viewportRows + VIRTUAL_BUFFER_ROWS * 2);
+
+    const spacer = height => height > 0 ? `<tr class="virtual-spacer" style="height: ${height}px;"><td colspan="8"></td></tr>` : '';
+    tbody.innerHTML = spacer(first * virtualRowHeight) +
+        rows.slice(first, last).map(expense => createExpenseRow(expense)).join('') +
+        spacer((rows.length - last) * virtualRowHeight);
+
+    // Calibrate the row height estimate once real rows are on screen
+    const sample = tbody.querySelector('tr[data-expense-id]');
+    if (sample && sample.offsetHeight && Math.abs(sample.offsetHeight - virtualRowHeight) > 1) {
+        virtualRowHeight = sample.offsetHeight;
+        renderVisibleRows(month);
+    }
 }
 
 function renderSortableHeader(tableKey, column, label, extraClass) {
@@ -438,34 +644,56 @@ function renderSortableHeader(tableKey, column, label, extraClass) {
     return `<th${cls} style="cursor: pointer; user-select: none;" onclick="toggleSort('${tableKey}', '${column}', function() { rerenderMonthTable('${tableKey}'); })">${label} ${getSortIcon(tableKey, column)}</th>`;
 }
 
-function rerenderMonthTable(tableKey) {
+async function rerenderMonthTable(tableKey) {
     const month = tableKey.replace('month-', '');
-    const expenses = window._expensesByMonth && window._expensesByMonth[month];
-    if (!expenses) return;
+    if (!monthGroups || !monthGroups[month]) return;
+
+    // The worker re-sorts this month's ids; redraw only the visible window and header icons
+    const generation = filterGeneration;
+    const result = await askExpenseWorker({ type: 'sort', month, sort: sortState[tableKey] });
+    if (generation !== filterGeneration) return;
+    monthRows[month] = result.ids.map(id => expenseById.get(id)).filter(Boolean);
+    renderVisibleRows(month);
 
-    // Re-render the tbody
     const tbody = document.getElementById('month-tbody-' + month);
-    if (tbody) {
-        tbody.innerHTML = sortExpenses(expenses, tableKey).map(expense => createExpenseRow(expense)).join('');
-    }
-
-    // Re-render the thead to update sort icons
-    const table = tbody.closest('table');
-    if (table) {
-        const thead = table.querySelector('thead tr');
-        if (thead) {
-            thead.innerHTML = `
-                <th style="width: 30px;"></th>
-                ${renderSortableHeader(tableKey, 'date', 'Date')}
-                ${renderSortableHeader(tableKey, 'description', 'Description')}
-                ${renderSortableHeader(tableKey, 'account', 'Account')}
-                ${renderSortableHeader(tableKey, 'category', 'Category')}
-                ${renderSortableHeader(tableKey, 'type', 'Type')}
-                ${renderSortableHeader(tableKey, 'amount', 'Amount', 'text-end')}
-                <th>Actions</th>
-            `;
+    const thead = tbody && tbody.closest('table').querySelector('thead tr');
+    if (thead) thead.innerHTML = renderMonthTableHeader(tableKey);
+}
+
+// Apply edited rows without rebuilding the tables. Returns false when the edits moved
+// rows between months or in/out of the current filters, which needs a full re-render.
+function applyExpenseUpdatesInPlace(result, updated) {
+    if (!monthGroups) return false;
+    const months = Object.keys(monthGroups);
+    if (months.length !== result.months.length) return false;
+    for (const group of result.months) {
+        const current = monthRows[group.month];
+        if (!current || current.length !== group.ids.length) return false;
+        const currentIds = new Set(current.map(e => e.id));
+        if (!group.ids.every(id => currentIds.has(id))) return false;
+    }
+
+    const updatedIds = new Set(updated.map(e => e.id));
+    result.months.forEach(group => {
+        const previousOrder = monthRows[group.month].map(e => e.id).join(',');
+        monthGroups[group.month] = { income: group.income, expenses: group.expenses, count: group.ids.length };
+        monthRows[group.month] = group.ids.map(id => expenseById.get(id));
+
+        if (group.month !== renderedMonth) return;
+        const summary = document.getElementById('month-summary-' + group.month);
+        if (summary) summary.innerHTML = renderMonthSummary(group.month);
+
+        // An edit to the sorted column can reorder rows; otherwise swap just the edited <tr>s
+        if (group.ids.join(',') !== previousOrder) {
+            renderVisibleRows(group.month);
+            return;
         }
-    }
+        updatedIds.forEach(id => {
+            const row = document.querySelector(`tr[data-expense-id="${id}"]`);
+            if (row) row.outerHTML = createExpenseRow(expenseById.get(id));
+        });
+    });
+    return true;
 }
 
 function createExpenseRow(expense) {
@@ -489,6 +717,7 @@ function createExpenseRow(expense) {
             <td>
                 <span title="${expense.description}">${truncateText(expense.description, 40)}</span>
                 ${expense.notes ? '<i class="bi bi-sticky-fill text-warning ms-1" style="font-size: 0.7em; cursor: help;" title="' + escapeHtml(expense.notes) + '"></i>' : ''}
+                ${expense.transfer_pair_id ? `<span class="badge bg-warning text-dark ms-1" style="font-size: 0.65rem; cursor: pointer;" title="Transfer between your accounts, excluded from totals. Click to unlink." onclick="unlinkTransfer(${expense.id})"><i class="bi bi-arrow-left-right"></i> Transfer</span>` : ''}
             </td>
             <td>
                 ${expense.source_account ? `<span class="badge bg-info" style="font-size: 0.75rem;">${expense.source_account}</span>` : ''}
@@ -539,7 +768,7 @@ function updateSelectionTally() {
     // Calculate total
     let total = 0;
     selectedExpenses.forEach(id => {
-        const expense = allExpenses.find(e => e.id === id);
+        const expense = expenseById.get(id);
         if (expense) total += expense.amount;
     });
 
@@ -869,9 +1098,15 @@ async function loadStatistics(period = 'month') {
     // Use statsYear for the statistics cards (set by toggle)
     const selectedYear = statsYear;
 
+    // Cancel the previous request so rapid period clicks don't pile up on the server
+    if (statisticsController) statisticsController.abort();
+    const controller = new AbortController();
+    statisticsController = controller;
+
     try {
-        const response = await fetch(`/api/statistics?period=${period}&year=${selectedYear}`);
+        const response = await fetch(`/api/statistics?period=${period}&year=${selectedYear}`, { signal: controller.signal });
         const stats = await response.json();
+        if (controller !== statisticsController) return;  // superseded while parsing
 
         // Update dashboard cards (year totals)
         const totalIncome = document.getElementById('total-income');
@@ -911,6 +1146,7 @@ async function loadStatistics(period = 'month') {
         updateCategoryBreakdown(stats.by_category);
 
     } catch (error) {
+        if (error.name === 'AbortError') return;
         console.error('Error loading statistics:', error);
     }
 }
@@ -1061,7 +1297,7 @@ function updateCategoryBreakdown(categoryData) {
     container.innerHTML = sortedCategories.map(([name, data]) => {
         const percentage = total > 0 ? ((data.amount / total) * 100).toFixed(1) : 0;
         return `
-            <div class="category-breakdown-item" onclick="toggleCategoryBreakdown(this, '${escapeHtml(name)}')">
+            <div class="category-breakdown-item" onclick="toggleCategoryBreakdown(this, ${data.category_id || 0})">
                 <div class="category-breakdown-header">
                     <div class="category-info">
                         <span class="category-color-dot" style="background-color: ${data.color}"></span>
@@ -1086,7 +1322,7 @@ function updateCategoryBreakdown(categoryData) {
     }).join('');
 }
 
-async function toggleCategoryBreakdown(element, categoryName) {
+async function toggleCategoryBreakdown(element, categoryId) {
     const isExpanded = element.classList.contains('expanded');
 
     // Collapse all other items
@@ -1097,44 +1333,85 @@ async function toggleCategoryBreakdown(element, categoryName) {
     // Toggle this item
     element.classList.toggle('expanded');
 
-    // If expanding and not yet loaded, load the transactions
+    // If expanding, load the category's top transactions for the dashboard's period
     if (!isExpanded) {
         const transactionsDiv = element.querySelector('.category-transactions');
+        await loadCategoryTransactions(transactionsDiv, categoryId, null);
+    }
+}
 
-        // Filter expenses for this category from allExpenses
-        const categoryExpenses = allExpenses.filter(exp =>
-            exp.category === categoryName &&
-            exp.transaction_type === 'expense'
-        ).slice(0, 20); // Limit to 20 for performance
+async function loadCategoryTransactions(transactionsDiv, categoryId, cursor) {
+    const params = new URLSearchParams({ period: currentPeriod, year: statsYear, limit: 20 });
+    if (cursor) params.set('cursor', cursor);
 
-        if (categoryExpenses.length === 0) {
-            transactionsDiv.innerHTML = '<p class="text-muted text-center py-2">No transactions</p>';
-            return;
-        }
+    let page;
+    try {
+        const response = await fetch(`/api/statistics/category/${categoryId}/transactions?${params}`);
+        page = await response.json();
+        if (!response.ok) throw new Error(page.error || 'Request failed');
+    } catch (error) {
+        console.error('Error loading category transactions:', error);
+        transactionsDiv.innerHTML = '<p class="text-muted text-center py-2">Could not load transactions</p>';
+        return;
+    }
 
-        transactionsDiv.innerHTML = categoryExpenses.map(exp => `
-            <div class="category-transaction-row" data-expense-id="${exp.id}">
-                <div style="flex: 1; min-width: 0;">
-                    <span class="text-muted">${formatDate(exp.date)}</span>
-                    <span class="ms-2">${truncateText(exp.description, 35)}</span>
-                    ${exp.notes ? '<i class="bi bi-sticky-fill text-warning ms-1" style="font-size: 0.65em; cursor: help;" title="' + escapeHtml(exp.notes || '') + '"></i>' : ''}
-                </div>
-                <div style="display: flex; align-items: center; gap: 0.5rem; flex-shrink: 0;">
-                    <strong class="text-danger">-$${exp.amount.toLocaleString('en-US', {minimumFractionDigits: 2})}</strong>
-                    <button class="btn btn-sm btn-outline-secondary" style="padding: 0.1rem 0.4rem; font-size: 0.75rem;"
-                            onclick="event.stopPropagation(); showCategoryEditor(${exp.id}, '${escapeHtml(exp.description)}', ${exp.category_id || 'null'}, ${exp.is_essential}, '${escapeHtml(exp.notes || '')}')"
-                            title="Edit Category">
-                        <i class="bi bi-tag"></i>
-                    </button>
-                    <button class="btn btn-sm btn-outline-danger" style="padding: 0.1rem 0.4rem; font-size: 0.75rem;"
-                            onclick="event.stopPropagation(); deleteExpense(${exp.id})"
-                            title="Delete">
-                        <i class="bi bi-trash"></i>
-                    </button>
-                </div>
+    if (!cursor && page.items.length === 0) {
+        transactionsDiv.innerHTML = '<p class="text-muted text-center py-2">No transactions</p>';
+        return;
+    }
+
+    const rowsHtml = page.items.map(exp => `
+        <div class="category-transaction-row" data-expense-id="${exp.id}">
+            <div style="flex: 1; min-width: 0;">
+                <span class="text-muted">${formatDate(exp.date)}</span>
+                <span class="ms-2">${truncateText(exp.description, 35)}</span>
+                ${exp.notes ? '<i class="bi bi-sticky-fill text-warning ms-1" style="font-size: 0.65em; cursor: help;" title="' + escapeHtml(exp.notes || '') + '"></i>' : ''}
             </div>
-        `).join('');
+            <div style="display: flex; align-items: center; gap: 0.5rem; flex-shrink: 0;">
+                <strong class="text-danger">-$${exp.amount.toLocaleString('en-US', {minimumFractionDigits: 2})}</strong>
+                <button class="btn btn-sm btn-outline-secondary" style="padding: 0.1rem 0.4rem; font-size: 0.75rem;"
+                        onclick="event.stopPropagation(); showCategoryEditor(${exp.id}, '${escapeHtml(exp.description)}', ${exp.category_id || 'null'}, ${exp.is_essential}, '${escapeHtml(exp.notes || '')}')"
+                        title="Edit Category">
+                    <i class="bi bi-tag"></i>
+                </button>
+                <button class="btn btn-sm btn-outline-danger" style="padding: 0.1rem 0.4rem; font-size: 0.75rem;"
+                        onclick="event.stopPropagation(); deleteExpense(${exp.id})"
+                        title="Delete">
+                    <i class="bi bi-trash"></i>
+                </button>
+            </div>
+        </div>
+    `).join('');
+
+    const moreHtml = page.has_more ? `
+        <button class="btn btn-sm btn-outline-secondary w-100 mt-2 category-load-more"
+                onclick="event.stopPropagation(); const container = this.parentElement; this.remove(); loadCategoryTransactions(container, ${categoryId}, '${page.next_cursor}')">
+            Show more
+        </button>
+    ` : '';
+
+    if (cursor) {
+        transactionsDiv.querySelector('.category-transaction-list').insertAdjacentHTML('beforeend', rowsHtml);
+        transactionsDiv.insertAdjacentHTML('beforeend', moreHtml);
+        return;
     }
+
+    const merchantsHtml = page.merchants.map(m => `
+        <div class="category-merchant-row">
+            <span>${escapeHtml(truncateText(m.merchant, 35))} <small class="text-muted">&times;${m.count}</small></span>
+            <strong>$${m.amount.toLocaleString('en-US', {minimumFractionDigits: 2})}</strong>
+        </div>
+    `).join('');
+
+    transactionsDiv.innerHTML = `
+        <div class="category-merchants">
+            <small class="text-muted d-block mb-1">Top merchants (${page.merchant_count})</small>
+            ${merchantsHtml}
+        </div>
+        <small class="text-muted d-block mt-2 mb-1">Largest transactions</small>
+        <div class="category-transaction-list">${rowsHtml}</div>
+        ${moreHtml}
+    `;
 }
 
 // ============ CASH POSITION & RUNWAY ============
@@ -1426,6 +1703,7 @@ async function handleImportSubmit(e) {
     resultDiv.innerHTML = '<div class="alert alert-info">Importing...</div>';
 
     let totalImported = 0;
+    let totalTransfers = 0;
     let allErrors = [];
 
     for (const file of files) {
@@ -1442,6 +1720,7 @@ async function handleImportSubmit(e) {
 
             if (response.ok) {
                 totalImported += result.imported;
+                totalTransfers += result.transfers_linked || 0;
                 if (result.errors && result.errors.length > 0) {
                     allErrors = allErrors.concat(result.errors.map(e => `${file.name}: ${e}`));
                 }
@@ -1454,7 +1733,11 @@ async function handleImportSubmit(e) {
     }
 
     // Show results
-    let message = `<div class="alert alert-success">Successfully imported ${totalImported} transactions from ${files.length} file(s)</div>`;
+    let message = `<div class="alert alert-success">Successfully imported ${totalImported} transactions from ${files.length} file(s)`;
+    if (totalTransfers > 0) {
+        message += ` and linked ${totalTransfers} transfer(s) between your accounts`;
+    }
+    message += '</div>';
 
     if (allErrors.length > 0) {
         message += '<div class="alert alert-warning"><strong>Warnings/Errors:</strong><ul>';
@@ -1532,6 +1815,43 @@ function populateMonthSelector() {
         months.map(m => `<option value="${m.value}">${m.label}</option>`).join('');
 }
 
+// ============ TRANSFER MATCHING ============
+async function unlinkTransfer(expenseId) {
+    if (!confirm('This is not a transfer between your accounts? Both sides will count in totals again.')) return;
+
+    try {
+        const response = await fetch(`/api/transfers/${expenseId}`, { method: 'DELETE' });
+        const result = await response.json();
+        if (response.ok) {
+            showToast('Transfer unlinked', 'success');
+            await loadExpenses();
+            loadStatistics(currentPeriod);
+        } else {
+            showToast(result.error || 'Failed to unlink transfer', 'danger');
+        }
+    } catch (error) {
+        console.error('Error unlinking transfer:', error);
+        showToast('Error unlinking transfer', 'danger');
+    }
+}
+
+async function matchTransfers() {
+    try {
+        const response = await fetch('/api/transfers/match', { method: 'POST' });
+        const result = await response.json();
+        if (response.ok) {
+            showToast(`Linked ${result.linked} transfer(s) between your accounts`, 'success');
+            await loadExpenses();
+            loadStatistics(currentPeriod);
+        } else {
+            showToast(result.error || 'Failed to match transfers', 'danger');
+        }
+    } catch (error) {
+        console.error('Error matching transfers:', error);
+        showToast('Error matching transfers', 'danger');
+    }
+}
+
 // ============ FILTER BY TRANSACTION TYPE (from dashboard cards) ============
 function filterByTransactionType(type) {
     const filter = document.getElementById('filter-transaction-type');
@@ -1745,7 +2065,8 @@ async function generatePDFExport() {
         summary: document.getElementById('export-summary').checked,
         essential_optional: document.getElementById('export-essential').checked,
         category_breakdown: document.getElementById('export-categories').checked,
-        monthly_trend: document.getElementById('export-trend').checked
+        monthly_trend: document.getElementById('export-trend').checked,
+        transactions: document.getElementById('export-transactions').checked
     };
 
     // Validate at least one section selected
@@ -1767,7 +2088,22 @@ async function generatePDFExport() {
             body: JSON.stringify(payload)
         });
 
-        if (response.ok) {
+        if (response.status === 202) {
+            // Long ledgers render in the background; poll until the file is ready
+            let job = await response.json();
+            while (job.status === 'running') {
+                statusDiv.innerHTML = `<div class="alert alert-info"><i class="bi bi-hourglass-split me-2"></i>Generating PDF with ${job.rows.toLocaleString()} transactions...</div>`;
+                await new Promise(resolve => setTimeout(resolve, 1000));
+                job = await (await fetch(job.status_url)).json();
+            }
+            if (job.status !== 'done') {
+                statusDiv.innerHTML = `<div class="alert alert-danger">Error: ${job.error || 'Failed to generate PDF'}</div>`;
+                return;
+            }
+            window.location.href = job.download_url;
+            statusDiv.innerHTML = '<div class="alert alert-success"><i class="bi bi-check-circle me-2"></i>PDF downloaded successfully!</div>';
+            setTimeout(() => { statusDiv.innerHTML = ''; }, 3000);
+        } else if (response.ok) {
             const blob = await response.blob();
             const url = window.URL.createObjectURL(blob);
             const a = document.createElement('a');
@@ -1794,14 +2130,26 @@ async function generatePDFExport() {
 // Duplicate Detection Functions
 // ==========================================
 
+let duplicatesController = null;
+
 async function scanForDuplicates() {
     const resultsDiv = document.getElementById('duplicates-results');
     resultsDiv.style.display = 'block';
     resultsDiv.innerHTML = '<div class="d-flex align-items-center"><div class="spinner-border spinner-border-sm me-2"></div> Scanning for duplicates...</div>';
 
+    // A re-scan replaces any scan still in flight
+    if (duplicatesController) duplicatesController.abort();
+    const controller = new AbortController();
+    duplicatesController = controller;
+
     try {
-        const response = await fetch('/api/duplicates');
+        const params = new URLSearchParams({
+            days: document.getElementById('duplicate-days')?.value || '0',
+            similarity: document.getElementById('duplicate-similarity')?.value || '1'
+        });
+        const response = await fetch(`/api/duplicates?${params}`, { signal: controller.signal });
         const data = await response.json();
+        if (controller !== duplicatesController) return;
 
         if (data.duplicates.length === 0) {
             resultsDiv.innerHTML = '<div class="alert alert-success mb-0"><i class="bi bi-check-circle me-2"></i>No duplicates found! Your data is clean.</div>';
@@ -1835,7 +2183,7 @@ async function scanForDuplicates() {
                         <input class="form-check-input duplicate-checkbox" type="checkbox" value="${item.id}" id="dup-${item.id}">
                         <label class="form-check-label" for="dup-${item.id}">
                             ${item.description.substring(0, 50)}${item.description.length > 50 ? '...' : ''}
-                            <span class="text-muted">(${item.source_account || 'Unknown source'}, ${item.category})</span>
+                            <span class="text-muted">(${item.date !== group.date ? formatDate(item.date) + ', ' : ''}${item.source_account || 'Unknown source'}, ${item.category})</span>
                         </label>
                     </div>
                 `;
@@ -1855,6 +2203,7 @@ async function scanForDuplicates() {
 
         resultsDiv.innerHTML = html;
     } catch (error) {
+        if (error.name === 'AbortError') return;
         console.error('Error scanning for duplicates:', error);
         resultsDiv.innerHTML = '<div class="alert alert-danger">Error scanning for duplicates. Please try again.</div>';
     }
@@ -1985,12 +2334,12 @@ async function applyBulkCategory() {
     const ids = Array.from(selectedExpenses);
 
     try {
-        const response = await fetch('/api/expenses/bulk-update-category', {
+        const response = await fetch('/api/expenses/batch', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
-                expense_ids: ids,
-                category_id: categoryId ? parseInt(categoryId) : null
+                ids: ids,
+                set: { category_id: categoryId ? parseInt(categoryId) : null }
             })
         });
 
@@ -2000,7 +2349,7 @@ async function applyBulkCategory() {
             const modal = bootstrap.Modal.getInstance(document.getElementById('bulkCategoryModal'));
             modal.hide();
 
-            showToast(`Updated category for ${result.updated_count || ids.length} transaction(s)`, 'success');
+            showToast(`Updated category for ${result.updated} transaction(s)`, 'success');
 
             clearSelection();
             await loadExpenses();
@@ -2056,12 +2405,12 @@ async function applyBulkEssential(isEssential) {
     const ids = Array.from(selectedExpenses);
 
     try {
-        const response = await fetch('/api/expenses/bulk-update-essential', {
+        const response = await fetch('/api/expenses/batch', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
-                expense_ids: ids,
-                is_essential: isEssential
+                ids: ids,
+                set: { is_essential: isEssential }
             })
         });
 
@@ -2071,7 +2420,7 @@ async function applyBulkEssential(isEssential) {
             const modal = bootstrap.Modal.getInstance(document.getElementById('bulkEssentialModal'));
             modal.hide();
 
-            showToast(`Updated ${result.updated_count} transaction(s) as ${isEssential ? 'essential' : 'optional'}`, 'success');
+            showToast(`Updated ${result.updated} transaction(s) as ${isEssential ? 'essential' : 'optional'}`, 'success');
 
             clearSelection();
             await loadExpenses();
@@ -2094,16 +2443,25 @@ function bulkDeleteSelected() {
     if (!confirm(`Delete ${selectedExpenses.size} selected transaction(s)? This cannot be undone.`)) return;
 
     const ids = Array.from(selectedExpenses);
-    let deleted = 0;
 
-    Promise.all(ids.map(id =>
-        fetch(`/api/expenses/${id}`, { method: 'DELETE' })
-            .then(res => { if (res.ok) deleted++; })
-    )).then(async () => {
-        showToast(`Deleted ${deleted} transaction(s)`, 'success');
+    // One request and one transaction for the whole selection
+    fetch('/api/expenses/batch', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ ids: ids, delete: true })
+    }).then(async response => {
+        const result = await response.json();
+        if (!response.ok) {
+            showToast(result.error || 'Failed to delete', 'danger');
+            return;
+        }
+        showToast(`Deleted ${result.deleted} transaction(s)`, 'success');
         clearSelection();
         await loadExpenses();
         loadStatistics(currentPeriod);
+    }).catch(error => {
+        console.error('Error deleting transactions:', error);
+        showToast('Error deleting transactions', 'danger');
     });
 }
 
@@ -0,0 +1,163 @@
+// Expense Tracker - filter/sort worker
+// Holds the transaction list off the main thread so typing in the filters never blocks
+// rendering. The page sends the dataset ('load' / 'patch') and asks questions
+// ('query', 'sort'); answers come back as id lists.
+
+let rows = [];              // newest first: date desc, id desc
+let byId = new Map();
+let byMonth = new Map();    // 'YYYY-MM' -> rows
+let byCategory = new Map(); // category name -> rows
+let byType = new Map();     // transaction_type -> rows
+let lastGroups = new Map(); // month -> ids of the latest query, for re-sorting one month
+
+function compareNewestFirst(a, b) {
+    return b.date.localeCompare(a.date) || b.id - a.id;
+}
+
+function indexRow(expense) {
+    // Lowercased once here instead of on every keystroke
+    expense._search = (expense.description || '').toLowerCase();
+    return expense;
+}
+
+function addToIndex(index, key, expense) {
+    let list = index.get(key);
+    if (!list) {
+        list = [];
+        index.set(key, list);
+    }
+    list.push(expense);
+}
+
+function rebuildIndexes() {
+    rows.sort(compareNewestFirst);
+    byMonth = new Map();
+    byCategory = new Map();
+    byType = new Map();
+    rows.forEach(expense => {
+        addToIndex(byMonth, expense.date.substring(0, 7), expense);
+        addToIndex(byCategory, expense.category, expense);
+        addToIndex(byType, expense.transaction_type, expense);
+    });
+}
+
+function load(expenses) {
+    rows = expenses.map(indexRow);
+    byId = new Map(rows.map(e => [e.id, e]));
+    rebuildIndexes();
+}
+
+function patch(upserted, deleted) {
+    deleted.forEach(id => byId.delete(id));
+    upserted.forEach(e => byId.set(e.id, indexRow(e)));
+    rows = Array.from(byId.values());
+    rebuildIndexes();
+}
+
+function matches(expense, filters) {
+    if (filters.searchTerm && !expense._search.includes(filters.searchTerm)) return false;
+    if (filters.year && expense.date.substring(0, 4) !== filters.year) return false;
+    if (filters.category && expense.category !== filters.category) return false;
+    if (filters.type === 'essential' && !expense.is_essential) return false;
+    if (filters.type === 'optional' && expense.is_essential) return false;
+    if (filters.transactionType && expense.transaction_type !== filters.transactionType) return false;
+    if (filters.amountMin !== null && expense.amount < filters.amountMin) return false;
+    if (filters.amountMax !== null && expense.amount > filters.amountMax) return false;
+    return true;
+}
+
+// Start from the smallest index the filters allow instead of scanning every row
+function candidates(filters) {
+    const options = [rows];
+    if (filters.year) {
+        const months = [];
+        byMonth.forEach((list, month) => {
+            if (month.startsWith(filters.year + '-')) months.push(list);
+        });
+        options.push([].concat(...months));
+    }
+    if (filters.category) options.push(byCategory.get(filters.category) || []);
+    if (filters.transactionType) options.push(byType.get(filters.transactionType) || []);
+    return options.reduce((best, list) => list.length < best.length ? list : best);
+}
+
+function sortRows(list, state) {
+    if (!state) return list;
+    const dir = state.direction === 'asc' ? 1 : -1;
+    const sorted = [...list];
+    sorted.sort((a, b) => {
+        switch (state.column) {
+            case 'date':
+                return dir * a.date.localeCompare(b.date);
+            case 'description':
+                return dir * (a.description || '').localeCompare(b.description || '');
+            case 'account':
+                return dir * (a.source_account || '').localeCompare(b.source_account || '');
+            case 'category':
+                return dir * (a.category || '').localeCompare(b.category || '');
+            case 'type':
+                return dir * (a.is_essential ? 'essential' : 'optional').localeCompare(b.is_essential ? 'essential' : 'optional');
+            case 'amount':
+                return dir * (a.amount - b.amount);
+            default:
+                return 0;
+        }
+    });
+    return sorted;
+}
+
+// Filtered ids grouped by month (newest month first), each month in its table's sort order
+function query(filters, sortState) {
+    const groups = new Map();
+    candidates(filters).forEach(expense => {
+        if (matches(expense, filters)) addToIndex(groups, expense.date.substring(0, 7), expense);
+    });
+
+    const months = Array.from(groups.keys()).sort().reverse();
+    lastGroups = new Map();
+    return {
+        months: months.map(month => {
+            const list = groups.get(month);
+            lastGroups.set(month, list);
+            // Sum whole cents, like the server, so month totals don't drift
+            let income = 0, expenses = 0;
+            list.forEach(e => {
+                const cents = Math.round(e.amount * 100);
+                if (e.transaction_type === 'income') income += cents;
+                else if (e.transaction_type === 'expense') expenses += cents;
+            });
+            return {
+                month,
+                ids: sortRows(list, sortState['month-' + month]).map(e => e.id),
+                income: income / 100,
+                expenses: expenses / 100
+            };
+        })
+    };
+}
+
+function sortMonth(month, state) {
+    return { month, ids: sortRows(lastGroups.get(month) || [], state).map(e => e.id) };
+}
+
+self.onmessage = function(event) {
+    const message = event.data;
+    let result = null;
+    switch (message.type) {
+        case 'load':
+            load(message.expenses);
+            break;
+        case 'patch':
+            patch(message.upserted, message.deleted);
+            break;
+        case 'query':
+            result = query(message.filters, message.sortState);
+            break;
+        case 'sort':
+            result = sortMonth(message.month, message.sort);
+            break;
+    }
+    if (message.requestId !== undefined) {
+        self.postMessage({ requestId: message.requestId, result });
+    }
+};
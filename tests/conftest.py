@@ -0,0 +1,98 @@
+"""Shared fixtures: apps on seeded scratch databases and a per-request SQL statement counter."""
+import os
+import shutil
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as balance_sheet  # noqa: E402
+from benchmarks.datagen import generate  # noqa: E402
+from benchmarks.suite import bulk_load  # noqa: E402
+
+# Two history sizes; a route's statement count must be the same on both
+SIZES = {'small': 100, 'large': 1500}
+DATA_END = date(2026, 6, 30)
+
+
+def make_app(database):
+    return balance_sheet.create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}',
+        'WAL_CHECKPOINT_INTERVAL': 0,
+        'SLOW_QUERY_MS': 0,
+        'PDF_JOB_DIR': os.path.join(os.path.dirname(database), 'reports'),
+        'TESTING': True,
+    })
+
+
+@pytest.fixture(scope='session')
+def seeded_databases(tmp_path_factory):
+    """One database file per size, built once and copied for each test"""
+    databases = {}
+    for size, rows in SIZES.items():
+        database = str(tmp_path_factory.mktemp('seed') / f'{size}.db')
+        flask_app = make_app(database)
+        with flask_app.app_context():
+            balance_sheet.init_db()
+            bulk_load(balance_sheet, generate(rows, end=DATA_END))
+            balance_sheet.db.engine.dispose()
+        databases[size] = database
+    return databases
+
+
+class Site:
+    """A logged-in test client on a fresh copy of a seeded database"""
+
+    def __init__(self, database):
+        self.app = make_app(database)
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session['logged_in'] = True
+
+    def count_statements(self, call):
+        """(response, number of SQL statements executed while `call` ran)"""
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with self.app.app_context():
+            engine = balance_sheet.db.engine
+        balance_sheet.db.event.listen(engine, 'after_cursor_execute', record)
+        try:
+            response = call(self.client)
+        finally:
+            balance_sheet.db.event.remove(engine, 'after_cursor_execute', record)
+        return response, statements
+
+    def query(self, fn):
+        """Run fn() inside the app context, e.g. to look up ids for a request"""
+        with self.app.app_context():
+            return fn()
+
+
+@pytest.fixture
+def sites(seeded_databases, tmp_path):
+    """{'small': Site, 'large': Site}, each on its own copy of the seeded database"""
+    result = {}
+    for size, database in seeded_databases.items():
+        copy = str(tmp_path / f'{size}.db')
+        shutil.copyfile(database, copy)
+        result[size] = Site(copy)
+    yield result
+    for site in result.values():
+        with site.app.app_context():
+            balance_sheet.db.engine.dispose()
+
+
+@pytest.fixture
+def site(seeded_databases, tmp_path):
+    """A Site on a copy of the large seeded database, for behavior tests"""
+    copy = str(tmp_path / 'site.db')
+    shutil.copyfile(seeded_databases['large'], copy)
+    result = Site(copy)
+    yield result
+    with result.app.app_context():
+        balance_sheet.db.engine.dispose()
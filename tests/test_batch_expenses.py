@@ -0,0 +1,78 @@
+"""Behavior of POST /api/expenses/batch: which rows a request touches, and which it refuses."""
+import pytest
+
+import app as m
+
+
+def count(site, *criteria):
+    return site.query(lambda: m.Expense.query.filter(*criteria).count())
+
+
+@pytest.mark.parametrize('body', [
+    {'filter': {'search': 'woolworths'}, 'delete': True},
+    {'filter': {'bogus': 1}, 'delete': True},
+    {'filter': {'q': 'woolworths', 'bogus': 1}, 'delete': True},
+    {'filter': {}, 'delete': True},
+    {'filter': {'q': ''}, 'delete': True},
+    {'filter': {'q': '  ', 'year': None}, 'delete': True},
+    {'filter': {'type': 'all'}, 'delete': True},
+    {'filter': [], 'delete': True},
+    {'filter': {'year': 0}, 'delete': True},
+    {'filter': {'amount_min': 0}, 'delete': True},
+    {'filter': {'amount_max': 0.0}, 'delete': True},
+    {'filter': {'category_id': 0}, 'delete': True},
+    {'filter': {'q': False}, 'delete': True},
+    {'filter': {'q': True}, 'delete': True},
+    {'filter': {'category': '', 'transaction_type': ''}, 'delete': True},
+    {'filter': {'q': ''}, 'set': {'is_essential': True}},
+])
+def test_filter_that_would_match_everything_is_refused(site, body):
+    before = count(site)
+    response = site.client.post('/api/expenses/batch', json=body)
+    assert response.status_code == 400, response.get_json()
+    assert count(site) == before
+
+
+def test_delete_by_filter_removes_only_matching_rows(site):
+    matching = m.Expense.description.ilike('%woolworths%')
+    before, matched = count(site), count(site, matching)
+    assert 0 < matched < before
+
+    response = site.client.post('/api/expenses/batch', json={'filter': {'q': 'woolworths'}, 'delete': True})
+    assert response.status_code == 200
+    assert response.get_json()['deleted'] == matched
+    assert count(site, matching) == 0
+    assert count(site) == before - matched
+
+
+def test_update_by_ids_changes_only_those_rows(site):
+    ids = site.query(lambda: [row.id for row in m.db.session.query(m.Expense.id)
+                              .filter(m.Expense.is_essential.is_(False)).limit(5)])
+    untouched = count(site, m.Expense.is_essential.is_(False)) - len(ids)
+
+    response = site.client.post('/api/expenses/batch', json={'ids': ids, 'set': {'is_essential': True}})
+    assert response.status_code == 200
+    assert response.get_json()['updated'] == len(ids)
+    assert count(site, m.Expense.id.in_(ids), m.Expense.is_essential.is_(True)) == len(ids)
+    assert count(site, m.Expense.is_essential.is_(False)) == untouched
+
+
+def test_filter_combines_keys(site):
+    matching = (m.Expense.description.ilike('%woolworths%'), m.Expense.transaction_type == 'expense',
+                m.Expense.amount >= 100)
+    matched = count(site, *matching)
+    response = site.client.post('/api/expenses/batch', json={
+        'filter': {'q': 'woolworths', 'transaction_type': 'expense', 'amount_min': '100'},
+        'set': {'notes': 'big shop'}})
+    assert response.status_code == 200
+    assert response.get_json()['matched'] == matched
+    assert count(site, m.Expense.notes == 'big shop') == matched
+
+
+@pytest.mark.parametrize('value', ['false', 'true', 0, 1, None])
+def test_boolean_fields_take_only_json_booleans(site, value):
+    ids = site.query(lambda: [row.id for row in m.db.session.query(m.Expense.id).limit(5)])
+    before = count(site, m.Expense.is_essential.is_(True))
+    response = site.client.post('/api/expenses/batch', json={'ids': ids, 'set': {'is_essential': value}})
+    assert response.status_code == 400, response.get_json()
+    assert count(site, m.Expense.is_essential.is_(True)) == before
@@ -0,0 +1,62 @@
+"""Duplicate candidates pair like with like: never income with expense, never a transfer leg."""
+from datetime import date
+
+import app as m
+
+LOOSE = '/api/duplicates?days=7&similarity=0.5'
+
+
+def add(site, *rows):
+    def insert():
+        expenses = [m.Expense(amount=amount, date=day, description=description, transaction_type=kind,
+                              source_account=account) for description, amount, day, kind, account in rows]
+        m.db.session.add_all(expenses)
+        m.db.session.commit()
+        return [expense.id for expense in expenses]
+    return site.query(insert)
+
+
+def grouped_ids(site, ids):
+    """The duplicate groups that contain any of `ids`, as sets of ids"""
+    groups = site.client.get(LOOSE).get_json()['duplicates']
+    return [{item['id'] for item in group['items']} for group in groups
+            if {item['id'] for item in group['items']} & set(ids)]
+
+
+def indexed_pairs(site):
+    return site.query(lambda: {(p.expense_id, p.other_id) for p in m.DuplicatePair.query})
+
+
+def test_income_and_expense_of_same_amount_are_not_duplicates(site):
+    day = date(2026, 7, 10)
+    ids = add(site, ('REFUND ACME STORE', 123.45, day, 'expense', 'Everyday'),
+              ('REFUND ACME STORE', 123.45, day, 'income', 'Everyday'),
+              ('REFUND ACME STORE', 123.45, day, 'expense', 'Amex'))
+    assert grouped_ids(site, ids) == [{ids[0], ids[2]}]
+
+
+def test_linked_transfer_legs_leave_duplicate_groups(site):
+    day = date(2026, 7, 12)
+    out_a, out_b, incoming = add(site, ('TRANSFER TO SAVINGS', 777.77, day, 'expense', 'Everyday'),
+                                 ('TRANSFER TO SAVINGS', 777.77, day, 'expense', 'Everyday'),
+                                 ('TRANSFER FROM EVERYDAY', 777.77, day, 'income', 'Savings'))
+    assert grouped_ids(site, [out_a, out_b]) == [{out_a, out_b}]
+
+    assert site.client.post('/api/transfers/match').status_code == 200
+    linked = site.query(lambda: m.db.session.get(m.Expense, incoming).transfer_pair_id)
+    assert linked in (out_a, out_b)
+    assert grouped_ids(site, [out_a, out_b, incoming]) == []
+
+    # Unlinking makes the expense leg a candidate again
+    assert site.client.delete(f'/api/transfers/{incoming}').status_code == 200
+    assert grouped_ids(site, [out_a, out_b]) == [{out_a, out_b}]
+
+
+def test_rebuild_matches_incremental_index(site):
+    add(site, ('REFUND ACME STORE', 50.0, date(2026, 7, 1), 'expense', 'Everyday'),
+        ('REFUND ACME STORE', 50.0, date(2026, 7, 2), 'income', 'Everyday'),
+        ('REFUND ACME STORE', 50.0, date(2026, 7, 3), 'expense', 'Amex'))
+    site.client.post('/api/transfers/match')
+    incremental = indexed_pairs(site)
+    site.query(m.rebuild_duplicate_index)
+    assert indexed_pairs(site) == incremental
@@ -0,0 +1,24 @@
+"""Keyset pages of GET /api/expenses come back in the order the client sorts the same rows."""
+import pytest
+
+import app as m
+
+
+def all_pages(client, **params):
+    query = '&'.join(f'{key}={value}' for key, value in params.items())
+    items, cursor = [], None
+    while True:
+        page = client.get(f'/api/expenses?limit=500&{query}' + (f'&cursor={cursor}' if cursor else '')).get_json()
+        items += page['items']
+        if not page['has_more']:
+            return items
+        cursor = page['next_cursor']
+
+
+@pytest.mark.parametrize('direction', ['asc', 'desc'])
+def test_type_sort_matches_client_labels(site, direction):
+    items = all_pages(site.client, sort='type', direction=direction)
+    labels = ['essential' if item['is_essential'] else 'optional' for item in items]
+    assert labels == sorted(labels, reverse=direction == 'desc')
+    assert {'essential', 'optional'} <= set(labels)
+    assert len({item['id'] for item in items}) == len(items) == site.query(lambda: m.Expense.query.count())
@@ -0,0 +1,50 @@
+"""Categorization during CSV import: learned rules first, smart categorization otherwise."""
+import io
+
+import pytest
+
+import app as m
+
+DESCRIPTION = 'ZZTEST STREAMING SERVICE 0412'
+
+
+def import_amex(site, *rows):
+    body = 'Date,Description,Amount\n' + ''.join(f'{day},{description},{amount}\n' for day, description, amount in rows)
+    return site.client.post('/api/import-csv', data={'file': (io.BytesIO(body.encode()), 'Amex.csv')},
+                            content_type='multipart/form-data').get_json()
+
+
+def imported_category(site):
+    return site.query(lambda: m.Expense.query.filter_by(description=DESCRIPTION).one().category_id)
+
+
+@pytest.fixture
+def rule_category(site):
+    """A category with a learned rule for DESCRIPTION"""
+    def add():
+        category = m.Category(name='Learned Test', color='#123456')
+        m.db.session.add(category)
+        m.db.session.flush()
+        m.db.session.add(m.LearnedRule(description_pattern=DESCRIPTION, category_id=category.id,
+                                       match_type='exact', is_essential=True, transaction_type='expense'))
+        m.db.session.commit()
+        return category.id
+    return site.query(add)
+
+
+def test_learned_rule_sets_category(site, rule_category):
+    result = import_amex(site, ('02/07/2026', DESCRIPTION, '15.99'))
+    assert (result['imported'], result['errors']) == (1, [])
+    assert imported_category(site) == rule_category
+
+
+def test_rule_for_deleted_category_falls_back_to_smart_categorization(site, rule_category):
+    def drop_category():  # e.g. removed by hand; SQLite does not enforce the rule's foreign key
+        m.db.session.execute(m.Category.__table__.delete().where(m.Category.id == rule_category))
+        m.db.session.commit()
+    site.query(drop_category)
+    result = import_amex(site, ('02/07/2026', DESCRIPTION, '15.99'), ('03/07/2026', 'WOOLWORTHS 1234 PRAHRAN', '40.00'))
+    assert (result['imported'], result['errors']) == (2, [])
+
+    expected = m.smart_categorize(DESCRIPTION)[0]
+    assert imported_category(site) == site.query(lambda: m.Category.query.filter_by(name=expected).one().id)
@@ -0,0 +1,186 @@
+"""SQL statement budgets per route.
+
+Each case runs the same request against a small and a large history (see SIZES in
+conftest.py). The request's inputs scale with the history too: bulk operations get
+every id, and the imported file grows with the database. A route passes when it
+executes the same number of statements on both sizes and stays within its budget.
+A loop that issues a query per row, id or lazy relationship fails the equality
+check before any timing would show it.
+
+Streaming exports fetch rows in EXPORT_BATCH_SIZE batches (yield_per with stream_results).
+Their budget is per batch.
+"""
+import io
+import math
+import time
+from datetime import date
+
+import pytest
+
+import app as balance_sheet
+from benchmarks.datagen import generate, to_csv
+from conftest import DATA_END, SIZES
+
+m = balance_sheet
+
+
+def all_ids(site):
+    return site.query(lambda: [row.id for row in m.db.session.query(m.Expense.id)])
+
+
+def category_id(site, name):
+    return site.query(lambda: m.Category.query.filter_by(name=name).one().id)
+
+
+def first_expense(site, **filters):
+    return site.query(lambda: m.Expense.query.filter_by(**filters).order_by(m.Expense.id).first().id)
+
+
+def scale(site, per_size):
+    """A count proportional to the site's history, e.g. rules or positions to seed"""
+    return max(1, site.rows // per_size)
+
+
+def seed_learned_rules(site):
+    def add():
+        categories = [c.id for c in m.Category.query.all()]
+        for i in range(scale(site, 20)):
+            m.db.session.add(m.LearnedRule(description_pattern=f'MERCHANT {i}', category_id=categories[i % len(categories)],
+                                           match_type='contains' if i % 2 else 'exact', priority=10 + i % 3))
+        m.db.session.commit()
+    site.query(add)
+
+
+def seed_cash_positions(site):
+    def add():
+        for i in range(scale(site, 20)):
+            m.db.session.add(m.CashPosition(date=date(2024, 1, 1 + i % 28), amount=1000 + i, notes=f'position {i}'))
+        m.db.session.commit()
+    site.query(add)
+
+
+def import_file(site):
+    rows = scale(site, 4)
+    body = to_csv('Everyday.csv', generate(rows * 2, seed=7, end=DATA_END)['Everyday.csv'][:rows]).encode()
+    return lambda c: c.post('/api/import-csv', data={'file': (io.BytesIO(body), 'Everyday.csv')},
+                            content_type='multipart/form-data')
+
+
+def get(path):
+    return lambda site: (lambda c: c.get(path))
+
+
+# (name, budget, setup) - setup(site) prepares data and returns the request to count
+CASES = [
+    *[(f'statistics {period}', 5, get(f'/api/statistics?period={period}'))
+      for period in ('month', 'last3months', 'last12months', 'year', 'all')],
+    ('category drill-down', 6, lambda site: (lambda c, cid=category_id(site, 'Food & Dining'):
+                                             c.get(f'/api/statistics/category/{cid}/transactions?period=all'))),
+    ('expenses all', 5, get('/api/expenses')),
+    ('expenses page', 7, get('/api/expenses?limit=200')),
+    ('expenses page search', 7, get('/api/expenses?limit=50&q=woolworths')),
+    ('expenses columnar', 6, get('/api/expenses?format=columnar')),
+    ('expense changes', 6, get('/api/expenses/changes?since=0')),
+    ('search', 6, get('/api/expenses/search?q=woolworths')),
+    ('categories', 2, get('/api/categories')),
+    ('tags', 2, get('/api/tags')),
+    ('learned rules', 2, lambda site: (seed_learned_rules(site), get('/api/learned-rules')(site))[1]),
+    ('cash positions', 2, lambda site: (seed_cash_positions(site), get('/api/cash-position')(site))[1]),
+    ('cash runway', 3, lambda site: (seed_cash_positions(site), get('/api/cash-position/runway')(site))[1]),
+    ('duplicates', 4, get('/api/duplicates')),
+    ('transfers', 2, get('/api/transfers')),
+    ('fuzzy preview', 3, lambda site: (lambda c: c.post('/api/expenses/fuzzy-match-preview',
+                                                        json={'description': 'WOOLWORTHS 1234 PRAHRAN VIC'}))),
+    ('export pdf', 5, lambda site: (lambda c: c.post('/api/export/pdf', json={'period': 'all', 'sections': {
+        'summary': True, 'essential_optional': True, 'category_breakdown': True, 'monthly_trend': True}}))),
+
+    ('export pdf ledger', 6, lambda site: (lambda c: c.post('/api/export/pdf', json={'period': 'all', 'sections': {
+        'summary': True, 'transactions': True}}))),
+
+    ('create expense', 12, lambda site: (lambda c: c.post('/api/expenses', json={
+        'description': 'NEW EXPENSE', 'amount': '12.50', 'date': '2026-01-02', 'tags': ['essential', 'new']}))),
+    ('update expense', 15, lambda site: (lambda c, eid=first_expense(site, transaction_type='expense'): c.put(
+        f'/api/expenses/{eid}', json={'notes': 'checked', 'tags': ['optional', 'checked'],
+                                      'category_id': category_id(site, 'Shopping'), 'save_rule': True}))),
+    ('delete expense', 9, lambda site: (lambda c, eid=first_expense(site): c.delete(f'/api/expenses/{eid}'))),
+    ('batch update ids', 4, lambda site: (lambda c, ids=all_ids(site): c.post('/api/expenses/batch', json={
+        'ids': ids, 'set': {'is_essential': True}}))),
+    ('batch delete filter', 13, lambda site: (lambda c: c.post('/api/expenses/batch', json={
+        'filter': {'transaction_type': 'expense'}, 'delete': True}))),
+    ('bulk update category', 11, lambda site: (lambda c: c.post('/api/expenses/bulk-update-category', json={
+        'description': 'NETFLIX.COM', 'category_id': category_id(site, 'Subscriptions'), 'is_essential': False}))),
+    ('bulk update essential', 4, lambda site: (lambda c, ids=all_ids(site): c.post(
+        '/api/expenses/bulk-update-essential', json={'expense_ids': ids, 'is_essential': False}))),
+    ('remove duplicates', 8, lambda site: (lambda c, ids=site.query(lambda: [
+        p.other_id for p in m.DuplicatePair.query]): c.delete('/api/duplicates/remove', json={'ids': ids}))),
+    ('match transfers', 2, lambda site: (lambda c: c.post('/api/transfers/match'))),
+    ('unlink transfer', 10, lambda site: (lambda c, eid=site.query(lambda: m.Expense.query.filter(
+        m.Expense.transfer_pair_id > 0).first().id): c.delete(f'/api/transfers/{eid}'))),
+    ('recategorize service stations', 8, lambda site: (lambda c: c.post('/api/expenses/recategorize-service-stations'))),
+    ('rename category', 8, lambda site: (lambda c, cid=category_id(site, 'Food & Dining'): c.put(
+        f'/api/categories/{cid}', json={'name': 'Food', 'color': '#ffffff'}))),
+    ('delete category', 8, lambda site: (lambda c, cid=category_id(site, 'Shopping'): c.delete(
+        f'/api/categories/{cid}'))),
+    ('create learned rule', 4, lambda site: (lambda c: c.post('/api/learned-rules', json={
+        'description_pattern': 'NEW RULE', 'category_id': category_id(site, 'Shopping')}))),
+    ('import csv', 16, import_file),
+    ('delete all', 8, lambda site: (lambda c: c.post('/api/expenses/delete-all'))),
+]
+
+
+@pytest.mark.parametrize('name,budget,setup', CASES, ids=[case[0] for case in CASES])
+def test_statement_budget(sites, name, budget, setup):
+    counts = {}
+    for size, site in sites.items():
+        site.rows = SIZES[size]
+        response, statements = site.count_statements(setup(site))
+        assert response.status_code < 400, f'{size}: HTTP {response.status_code} {response.get_data(as_text=True)[:300]}'
+        counts[size] = len(statements)
+    assert counts['small'] == counts['large'], f'{name}: statement count grows with data {counts}'
+    assert counts['large'] <= budget, f'{name}: {counts["large"]} statements, budget {budget}'
+
+
+@pytest.mark.skipif(not m.PDF_AVAILABLE, reason='fpdf2 is not installed')
+def test_pdf_export_cached_until_data_changes(sites):
+    site = sites['large']
+    export = lambda c: c.post('/api/export/pdf', json={'period': 'all', 'sections': {'monthly_trend': True}})
+    first, _ = site.count_statements(export)
+    repeat, statements = site.count_statements(export)
+    assert (first.headers['X-Report-Cache'], repeat.headers['X-Report-Cache']) == ('MISS', 'HIT')
+    assert repeat.data == first.data
+    assert len(statements) <= 2, statements  # the data version lookup
+
+    site.client.post('/api/expenses', json={'description': 'NEW EXPENSE', 'amount': '12.50', 'date': '2026-01-02'})
+    changed, _ = site.count_statements(export)
+    assert changed.headers['X-Report-Cache'] == 'MISS'
+
+
+@pytest.mark.skipif(not m.PDF_AVAILABLE, reason='fpdf2 is not installed')
+def test_pdf_ledger_renders_in_background(sites):
+    site = sites['large']
+    site.app.config['PDF_LEDGER_BACKGROUND_ROWS'] = 100
+    export = lambda c: c.post('/api/export/pdf', json={'period': 'all', 'sections': {'transactions': True}})
+    response, statements = site.count_statements(export)
+    assert response.status_code == 202
+    assert len(statements) <= 3  # version, ledger row count
+    job = response.get_json()
+
+    deadline = time.monotonic() + 60
+    while job['status'] == 'running' and time.monotonic() < deadline:
+        time.sleep(0.1)
+        job = site.client.get(job['status_url']).get_json()
+    assert job['status'] == 'done', job
+    download = site.client.get(job['download_url'])
+    assert download.data.startswith(b'%PDF')
+    assert export(site.client).get_json()['job_id'] == job['job_id']  # same report, same job
+
+
+@pytest.mark.parametrize('export_format', ['csv', 'ndjson'])
+def test_export_statements_per_batch(sites, export_format):
+    for size, site in sites.items():
+        response, statements = site.count_statements(
+            lambda c: c.get(f'/api/export/transactions?format={export_format}'))
+        response.get_data()  # drain the stream so every batch runs
+        rows = site.query(lambda: m.Expense.query.count())
+        batches = math.ceil(rows / m.EXPORT_BATCH_SIZE) + 1  # the final, empty batch ends the stream
+        assert len(statements) <= 2 * batches + 2, f'{size}: {len(statements)} statements for {batches} batches'
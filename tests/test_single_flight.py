@@ -0,0 +1,32 @@
+"""Request coalescing is per app: identical keys in two apps never share a result."""
+import threading
+import time
+
+import app as m
+
+
+def coalescer(site):
+    return site.query(m.single_flight)
+
+
+def test_apps_do_not_share_in_flight_calls(sites):
+    small, large = coalescer(sites['small']), coalescer(sites['large'])
+    assert small is not large
+
+    key = m.single_flight_key('statistics', 'all', None)
+    release = threading.Event()
+    leader = threading.Thread(target=small.do, args=(key, lambda: release.wait() and 'small'))
+    leader.start()
+    try:
+        deadline = time.monotonic() + 5
+        while key not in small._calls and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        result = []
+        other = threading.Thread(target=lambda: result.append(large.do(key, lambda: 'large')))
+        other.start()
+        other.join(timeout=5)
+        assert result == ['large']  # ran its own computation instead of waiting on the other app
+    finally:
+        release.set()
+        leader.join(timeout=5)
@@ -0,0 +1,56 @@
+"""Group commits on the writer thread: what one job leaves behind stays out of the others' commit."""
+import threading
+
+import app as m
+
+
+def run_group(site, *jobs):
+    """Hold the writer on a solo job so `jobs` queue up and run as one group"""
+    write_queue = site.app.extensions['balance_sheet']['write_queue']
+    release = threading.Event()
+    blocker = write_queue.submit(release.wait, solo=True)
+    futures = [write_queue.submit(job) for job in jobs]
+    release.set()
+    blocker.result(timeout=10)
+    return [future.result(timeout=10) for future in futures]
+
+
+def add_category(name, commit):
+    def job():
+        m.db.session.add(m.Category(name=name, color='#000000'))
+        if commit:
+            m.db.session.commit()
+        return name
+    return job
+
+
+def category_names(site):
+    return site.query(lambda: {c.name for c in m.Category.query})
+
+
+def test_group_commits_only_committed_jobs(site):
+    stats = site.app.extensions['balance_sheet']['write_queue'].stats
+    reruns = stats['reruns']
+    run_group(site, add_category('Committed A', True), add_category('Abandoned', False),
+              add_category('Committed B', True))
+    names = category_names(site)
+    assert {'Committed A', 'Committed B'} <= names
+    assert 'Abandoned' not in names
+    assert stats['reruns'] == reruns + 1
+
+
+def test_group_discards_flushed_but_uncommitted_rows(site):
+    def flush_only():
+        m.db.session.add(m.Category(name='Flushed', color='#000000'))
+        m.db.session.flush()
+    run_group(site, add_category('Committed', True), flush_only)
+    names = category_names(site)
+    assert 'Committed' in names and 'Flushed' not in names
+
+
+def test_clean_group_commits_once(site):
+    stats = site.app.extensions['balance_sheet']['write_queue'].stats
+    before = dict(stats)
+    run_group(site, add_category('One', True), add_category('Two', True), lambda: None)
+    assert {'One', 'Two'} <= category_names(site)
+    assert (stats['groups'], stats['reruns']) == (before['groups'] + 1, before['reruns'])
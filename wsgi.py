@@ -0,0 +1,14 @@
+"""WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With preload_app (see gunicorn.conf.py) this module runs once in the master
+process: the database is initialized and the rule index and lazy imports are
+built before the workers fork, so every worker starts warm.
+"""
+from app import create_app, init_db, warm_caches
+
+app = create_app()
+with app.app_context():
+    init_db()
+warm_caches()